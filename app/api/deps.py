@@ -10,6 +10,7 @@ from app.core import security
 from app.models.user import User, UserRole
 from app.schemas.token import TokenData
 from app.crud import user as user_crud
+from app.crud import principal as principal_crud
 
 import logging
 
@@ -21,6 +22,21 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if settings.AUTH_CLAIMS_FAST_PATH:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            raise credentials_exception
+        if "uid" in payload and "ver" in payload:
+            user = principal_crud.user_from_claims(db, payload)
+            if user is None:
+                raise credentials_exception
+            return user
+
+    user = principal_crud.get_cached_principal(db, token)
+    if user is not None:
+        return user
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
@@ -30,9 +46,11 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     except JWTError:
         raise credentials_exception
     
+    version = principal_crud.principal_version(token_data.username)
     user = user_crud.user.get_by_username(db, username=token_data.username)
     if user is None:
         raise credentials_exception
+    principal_crud.cache_principal(token, user, version=version, expires_at=payload.get("exp"))
     return user
 
 def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
@@ -96,10 +114,7 @@ def get_user_as_subordinate(
         return user_to_view
 
     if current_user.role == UserRole.DEPT_HEAD:
-        subordinate_ids = {
-            user.id for user in user_crud.user.get_subordinates(db, user_id=current_user.id)
-        }
-        if user_id in subordinate_ids:
+        if user_crud.user.is_subordinate(db, manager=current_user, user=user_to_view):
             return user_to_view
 
     raise HTTPException(
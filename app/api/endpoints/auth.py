@@ -1,30 +1,79 @@
-
+import time
 from datetime import timedelta
+from typing import Any, Dict
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.config import settings
 from app.core import security
-from app.schemas.token import Token
+from app.core.password_verification import PasswordVerifierSaturated, password_verifier
+from app.schemas.token import AccountActivation, Token
 from app.crud import user as user_crud
+from app.crud import principal as principal_crud
+from app.api import deps
+from app.models.user import User as UserModel
 
 router = APIRouter()
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
-    user = user_crud.user.authenticate(db, username=form_data.username, password=form_data.password)
-    if not user:
+async def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+    """
+    Issue an access token.
+    - The password check runs on a dedicated, bounded pool. When that pool
+      is saturated the request is rejected with 503 and `Retry-After`.
+    """
+    started = time.perf_counter()
+    outcome = "failure"
+    try:
+        user = await run_in_threadpool(user_crud.user.get_by_username, db, username=form_data.username)
+        verified, new_hash = False, None
+        if user:
+            verified, new_hash = await password_verifier.verify_and_update(form_data.password, user.hashed_password)
+        if not verified:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect username or password",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if new_hash:
+            await run_in_threadpool(user_crud.user.upgrade_password_hash, db, user=user, hashed_password=new_hash)
+        outcome = "success"
+    except PasswordVerifierSaturated:
+        outcome = "rejected"
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent logins. Please retry shortly.",
+            headers={"Retry-After": str(settings.LOGIN_RETRY_AFTER_SECONDS)},
         )
+    finally:
+        password_verifier.metrics.observe(outcome, time.perf_counter() - started)
+
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": user.username, "role": user.role.value},
+        data=principal_crud.create_token_claims(user),
         expires_delta=access_token_expires,
     )
     return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.post("/activate", status_code=status.HTTP_204_NO_CONTENT)
+def activate_account(*, db: Session = Depends(get_db), activation_in: AccountActivation):
+    """
+    Set the password of a provisioned account with its single-use activation token.
+    """
+    if not user_crud.user.activate(db, token=activation_in.token, password=activation_in.password):
+        raise HTTPException(status_code=400, detail="Invalid or expired activation token")
+    return None
+
+
+@router.get("/login-metrics", response_model=Dict[str, Any])
+def read_login_metrics(current_user: UserModel = Depends(deps.get_current_admin_user)):
+    """
+    Login counters by outcome, recent login and password-check latency
+    percentiles, and the current depth of the password-check queue. (Admin only)
+    """
+    return password_verifier.snapshot()
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from typing import List, Any, Optional
 from app import crud, models, schemas
 from app.api import deps
+from app.core.config import settings
 import datetime
 from app.schemas.evaluation import (
     EvaluationWeight,
@@ -18,12 +19,16 @@ from app.schemas.evaluation import (
     DepartmentGradeRatio,
     DepartmentGradeRatioCreate,
     GradeAdjustmentRequest,
+    GradeQuota,
+    GradeAssignmentRequest,
+    GradeAssignmentResult,
     DepartmentEvaluationCreate,
     DepartmentEvaluation,
 )
 from app.models.user import User as UserModel, UserRole
 from app.crud import grade_adjustment, crud_report
 from app.crud.evaluation import department_evaluation
+from app.services.scoring_kernel import ScoreWeights
 from app.exceptions import GradeAdjustmentError, GradeTOExceededError
 
 router = APIRouter()
@@ -45,7 +50,7 @@ def upsert_department_evaluation(
         )
     
     # Additional check: Ensure the user is the head of the department's parent (center)
-    department = crud.organization.organization.get(db, id=eval_in.department_id)
+    department = crud.organization.get_organization(db, org_id=eval_in.department_id)
     if not department or department.parent_id != current_user.organization_id:
          raise HTTPException(
             status_code=403,
@@ -125,6 +130,62 @@ def adjust_grades(
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
 
 
+@router.post("/assign-grades", response_model=GradeAssignmentResult)
+def assign_grades(
+    *,
+    db: Session = Depends(deps.get_db),
+    assignment_in: GradeAssignmentRequest,
+    current_user: UserModel = Depends(deps.get_current_admin_user),
+) -> Any:
+    """
+    Generate starting grades for every graded department in a period from
+    the final scores and the department grade ratios. (Admin only)
+    - Department heads get their department's grade.
+    - Other members get S/A by score within the TO, the rest B (or an equal
+      number of B+/B- with `b_split_ratio`). Ties go to the lower user id.
+    - With `dry_run`, the resulting distribution is returned without saving it.
+    """
+    try:
+        return grade_adjustment.assign_grades_for_period(
+            db,
+            evaluation_period_id=assignment_in.evaluation_period_id,
+            b_split_ratio=assignment_in.b_split_ratio,
+            dry_run=assignment_in.dry_run,
+        )
+    except GradeAdjustmentError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/grade-quotas", response_model=List[GradeQuota])
+def read_grade_quotas(
+    *,
+    db: Session = Depends(deps.get_db),
+    evaluation_period_id: int,
+    current_user: UserModel = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Preview the S/A TO and the current grade usage of departments in a period.
+    - Admins and center heads see every department graded in the period.
+    - Department heads see only their own department.
+    """
+    if current_user.role in [UserRole.ADMIN, UserRole.CENTER_HEAD]:
+        department_ids = None
+    elif current_user.role == UserRole.DEPT_HEAD:
+        department_ids = [current_user.organization_id] if current_user.organization_id else []
+    else:
+        raise HTTPException(
+            status_code=403,
+            detail="The user doesn't have enough privileges for this operation",
+        )
+
+    try:
+        return grade_adjustment.get_grade_quotas(
+            db, evaluation_period_id=evaluation_period_id, department_ids=department_ids
+        )
+    except GradeAdjustmentError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.post("/", response_model=schemas.EvaluationWeight)
 def create_evaluation_weight(
     *,
@@ -187,6 +248,7 @@ def create_or_update_peer_evaluations(
         evaluations=evaluations_in.evaluations,
         evaluator_id=current_user.id,
         evaluation_period=active_period.name,
+        recalculate_scores=settings.RECALCULATE_SCORES_ON_SUBMIT,
     )
 
 @router.post("/pm-evaluations/", response_model=List[schemas.PmEvaluation])
@@ -231,6 +293,7 @@ def create_or_update_pm_evaluations(
         evaluations=evaluations_in.evaluations,
         evaluator_id=current_user.id,
         evaluation_period=active_period.name,
+        recalculate_scores=settings.RECALCULATE_SCORES_ON_SUBMIT,
     )
 
 
@@ -316,7 +379,7 @@ def create_or_update_qualitative_evaluations(
         )
 
     # Get all users in the evaluator's organization and sub-organizations
-    subordinate_ids = {user.id for user in crud.user.user.get_subordinates(db, user_id=current_user.id)}
+    subordinate_ids = crud.user.user.get_subordinate_ids(db, user_id=current_user.id)
 
     for evaluation in evaluations_in.evaluations:
         # Check if the evaluatee is a subordinate of the evaluator
@@ -331,6 +394,7 @@ def create_or_update_qualitative_evaluations(
         evaluations=evaluations_in.evaluations,
         evaluator_id=current_user.id,
         evaluation_period=active_period.name,
+        recalculate_scores=settings.RECALCULATE_SCORES_ON_SUBMIT,
     )
 
 
@@ -859,7 +923,7 @@ def read_detailed_evaluation_result(
     if current_user.role == UserRole.ADMIN:
         pass  # Admin can view anyone
     elif current_user.role == UserRole.DEPT_HEAD:
-        subordinate_ids = {user.id for user in crud.user.user.get_subordinates(db, user_id=current_user.id)}
+        subordinate_ids = crud.user.user.get_subordinate_ids(db, user_id=current_user.id)
         if user_id not in subordinate_ids:
             raise HTTPException(status_code=403, detail="Not enough privileges to view this user's evaluation")
     else:
@@ -887,7 +951,7 @@ def calculate_final_scores_for_period(
     Manually trigger the calculation of final scores for all users in a specific evaluation period.
     (Admin only)
     """
-    period = crud.evaluation_period.get(db, id=evaluation_period_id)
+    period = crud.evaluation_period.get_snapshot(db, id=evaluation_period_id)
     if not period:
         raise HTTPException(status_code=404, detail="Evaluation period not found.")
 
@@ -903,3 +967,71 @@ def calculate_final_scores_for_period(
     return {
         "message": "Final score calculation for the evaluation period has been successfully completed."
     }
+
+
+@router.post(
+    "/evaluation-periods/{evaluation_period_id}/recalculate",
+    response_model=List[FinalEvaluation],
+)
+def recalculate_pending_final_scores(
+    *,
+    db: Session = Depends(deps.get_db),
+    evaluation_period_id: int,
+    current_user: models.User = Depends(deps.get_current_admin_user),
+) -> Any:
+    """
+    Refresh only the final scores marked stale by evaluation submissions since
+    the last calculation, and return the refreshed records.
+    (Admin only)
+    """
+    period = crud.evaluation_period.get_snapshot(db, id=evaluation_period_id)
+    if not period:
+        raise HTTPException(status_code=404, detail="Evaluation period not found.")
+
+    return crud.evaluation_calculator.recalculate_pending_scores(
+        db, evaluation_period=period.name
+    )
+
+
+@router.post(
+    "/evaluation-periods/{evaluation_period_id}/simulate",
+    response_model=schemas.ScoreSimulationResult,
+)
+def simulate_final_scores_for_period(
+    *,
+    db: Session = Depends(deps.get_db),
+    evaluation_period_id: int,
+    simulation_in: schemas.ScoreSimulationRequest,
+    current_user: models.User = Depends(deps.get_current_admin_user),
+) -> Any:
+    """
+    Compute the period's final score distribution under alternative weight sets
+    without storing anything. Returns per-user deltas and S/A boundary shifts
+    relative to the current formula.
+    (Admin only)
+    """
+    period = crud.evaluation_period.get_snapshot(db, id=evaluation_period_id)
+    if not period:
+        raise HTTPException(status_code=404, detail="Evaluation period not found.")
+    if simulation_in.s_ratio + simulation_in.a_ratio > 100:
+        raise HTTPException(status_code=400, detail="The sum of s_ratio and a_ratio cannot exceed 100.")
+
+    weight_sets = [
+        (
+            weight_set.name,
+            ScoreWeights(
+                peer_weight=weight_set.peer_weight,
+                pm_weight=weight_set.pm_weight,
+                project_ratio=weight_set.project_ratio,
+                qualitative_ratio=weight_set.qualitative_ratio,
+            ),
+        )
+        for weight_set in simulation_in.weight_sets
+    ]
+    return crud.evaluation_calculator.simulate_final_scores(
+        db,
+        evaluation_period=period.name,
+        weight_sets=weight_sets,
+        s_ratio=simulation_in.s_ratio,
+        a_ratio=simulation_in.a_ratio,
+    )
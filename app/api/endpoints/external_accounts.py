@@ -1,4 +1,4 @@
-from typing import Any, List
+from typing import Any, Dict, List
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
@@ -36,6 +36,18 @@ def read_external_accounts(
     accounts = crud.external_account.get_multi_by_owner(db=db, owner_id=current_user.id)
     return accounts
 
+@router.post("/rotate-credentials", response_model=Dict[str, int])
+def rotate_external_account_credentials(
+    *,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_admin_user),
+) -> Any:
+    """
+    Re-encrypt the credentials of every external account with the primary
+    encryption key, in batches. (Admin only)
+    """
+    return crud.external_account.rotate_credentials(db)
+
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_external_account(
     *,
@@ -1,14 +1,17 @@
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.models.user import User as UserModel
-from app.schemas.organization import Organization, OrganizationCreate, OrganizationUpdate, OrganizationGradeUpdate
+from app.schemas.organization import Organization, OrganizationCreate, OrganizationUpdate, OrganizationGradeUpdate, OrganizationTreeNode
 from app.crud import organization as org_crud
 from app.api import deps
+from app.api.pagination import paginated_response
+from app.crud.pagination import MAX_PAGE_SIZE
+from app.models.organization import Organization as OrganizationModel
 
 
 router = APIRouter()
@@ -27,13 +30,48 @@ def create_organization(
 
 @router.get("/", response_model=List[Organization])
 def read_organizations(
+    response: Response,
     db: Session = Depends(get_db),
+    root_id: Optional[int] = Query(None, description="Only this organization and those below it."),
+    level: Optional[int] = Query(None),
+    name_prefix: Optional[str] = Query(None, min_length=1),
+    cursor: Optional[str] = Query(None, description="`X-Next-Cursor` of the previous page."),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     current_user: UserModel = Depends(deps.get_current_user)
 ):
     """
-    Retrieve all organizations.
+    Retrieve organizations, ordered by name.
+    - Filters: `root_id` subtree, `level` and `name_prefix`.
+    - Pass `limit` (and then `cursor`) to page through the result; otherwise
+      everything is returned. `X-Total-Count` carries the total on the first page.
     """
-    return org_crud.get_organizations(db)
+    filters = dict(root_id=root_id, level=level, name_prefix=name_prefix)
+    return paginated_response(
+        response,
+        org_crud.organizations_query(db, **filters),
+        [OrganizationModel.name, OrganizationModel.id],
+        schema=Organization,
+        cursor=cursor,
+        limit=limit,
+        count=lambda: org_crud.count_organizations(db, **filters),
+    )
+
+@router.get("/tree", response_model=List[OrganizationTreeNode])
+def read_organization_tree(
+    db: Session = Depends(get_db),
+    root_id: Optional[int] = Query(None, description="Return only this organization's subtree."),
+    depth: Optional[int] = Query(None, ge=0, description="Levels to include below the top nodes."),
+    current_user: UserModel = Depends(deps.get_current_user)
+):
+    """
+    Retrieve the organization chart as a nested tree with member counts.
+    - Without `root_id`, the top-level organizations are returned.
+    - `depth` cuts the tree off; nodes keep `child_count`, so a client can
+      expand one later with `root_id=<id>&depth=1`.
+    """
+    if root_id is not None and not org_crud.get_organization(db, org_id=root_id):
+        raise HTTPException(status_code=404, detail="Organization not found")
+    return org_crud.get_organization_tree(db, root_id=root_id, max_depth=depth)
 
 @router.post("/upload", response_model=Dict[str, Any])
 def upload_organizations(
@@ -43,12 +81,13 @@ def upload_organizations(
     current_user: UserModel = Depends(deps.get_current_admin_user)
 ):
     """
-    Upload a file (JSON or CSV) to sync organizations. (Admin only)
-    - The file should contain a list of organization data.
+    Upload a file (JSON, CSV or NDJSON) to sync organizations. (Admin only)
+    - The file should contain organization rows (name, level, parent_name).
     - It will create, update, or delete organizations based on the file content.
+    - Invalid rows are skipped and listed in `errors`.
     """
-    if not file.filename.endswith((".json", ".csv")):
-        raise HTTPException(status_code=400, detail="Invalid file type. Only JSON or CSV are supported.")
+    if not file.filename.endswith((".json", ".csv", ".ndjson", ".jsonl")):
+        raise HTTPException(status_code=400, detail="Invalid file type. Only JSON, CSV or NDJSON are supported.")
 
     try:
         result = org_crud.sync_organizations_from_file(db, file=file)
@@ -92,7 +131,10 @@ def update_organization(
     db_org = org_crud.get_organization(db, org_id=org_id)
     if not db_org:
         raise HTTPException(status_code=404, detail="Organization not found")
-    return org_crud.update_organization(db, db_org=db_org, org_in=org_in)
+    try:
+        return org_crud.update_organization(db, db_org=db_org, org_in=org_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.put("/{org_id}/grade", response_model=Organization)
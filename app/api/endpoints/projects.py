@@ -30,7 +30,7 @@ def create_project(
     Create new project. (Dept Head or Admin only)
     """
     # Check if evaluation period exists
-    eval_period = crud_evaluation_period.get(db, id=project_in.evaluation_period_id)
+    eval_period = crud_evaluation_period.get_snapshot(db, id=project_in.evaluation_period_id)
     if not eval_period:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -46,10 +46,7 @@ def create_project(
         )
 
     if current_user.role == "dept_head":
-        subordinate_ids = {
-            user.id for user in crud_user.user.get_subordinates(db, user_id=current_user.id)
-        }
-        subordinate_ids.add(current_user.id)
+        subordinate_ids = crud_user.user.get_subordinate_ids(db, user_id=current_user.id, include_self=True)
         if pm_user.id not in subordinate_ids:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -121,10 +118,7 @@ def update_project(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     if current_user.role == "dept_head":
-        subordinate_ids = {
-            user.id for user in crud_user.user.get_subordinates(db, user_id=current_user.id)
-        }
-        subordinate_ids.add(current_user.id)
+        subordinate_ids = crud_user.user.get_subordinate_ids(db, user_id=current_user.id, include_self=True)
 
         # Authorization check: Dept heads can only manage projects where the PM is their subordinate.
         if project.pm.id not in subordinate_ids:
@@ -165,10 +159,7 @@ def delete_project(
         raise HTTPException(status_code=404, detail="Project not found")
     # Authorization check: Dept heads can only manage projects where the PM is their subordinate.
     if current_user.role == "dept_head":
-        subordinate_ids = {
-            user.id for user in crud_user.user.get_subordinates(db, user_id=current_user.id)
-        }
-        subordinate_ids.add(current_user.id)
+        subordinate_ids = crud_user.user.get_subordinate_ids(db, user_id=current_user.id, include_self=True)
         if project.pm.id not in subordinate_ids:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -230,10 +221,7 @@ def add_project_member(
 
     # Authorization for Dept Head
     if current_user.role == "dept_head":
-        subordinate_ids = {
-            user.id for user in crud_user.user.get_subordinates(db, user_id=current_user.id)
-        }
-        subordinate_ids.add(current_user.id)
+        subordinate_ids = crud_user.user.get_subordinate_ids(db, user_id=current_user.id, include_self=True)
 
         # Check if the project's PM is a subordinate of the current user
         if project.pm and project.pm.id not in subordinate_ids:
@@ -35,12 +35,9 @@ def get_growth_culture_report(
 
     # 실장의 경우, 자신의 하위 조직원인지 확인
     if current_user.role == UserRole.DEPT_HEAD:
-        # Get all descendant organization IDs
-        descendant_orgs = crud.organization.get_all_descendant_orgs(db, org_id=current_user.organization_id)
-        allowed_org_ids = {org.id for org in descendant_orgs}
-        allowed_org_ids.add(current_user.organization_id)
-
-        if target_user.organization_id not in allowed_org_ids:
+        if not target_user.organization_id or not crud.organization.is_descendant_org(
+            db, ancestor_id=current_user.organization_id, descendant_id=target_user.organization_id
+        ):
             raise HTTPException(
                 status_code=403, detail="You can only view reports for users in your department."
             )
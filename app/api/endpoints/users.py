@@ -1,11 +1,12 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.models.user import User as UserModel, UserRole
 from app.schemas.user import User, UserCreate, UserUpdate, UserHistoryResponse
+from app.schemas.token import ActivationToken
 from app.schemas.project_member import (
     ProjectMemberWeightDetail,
     UserProjectWeightsUpdate,
@@ -13,6 +14,8 @@ from app.schemas.project_member import (
 from app.crud import user as user_crud
 from app.crud import project_member as project_member_crud
 from app.api import deps
+from app.api.pagination import paginated_response
+from app.crud.pagination import MAX_PAGE_SIZE
 
 
 
@@ -59,6 +62,31 @@ def update_user(
     return user
 
 
+@router.post("/{user_id}/activation-token", response_model=ActivationToken)
+def issue_activation_token(
+    *,
+    db: Session = Depends(get_db),
+    user_id: int,
+    current_user: UserModel = Depends(deps.get_current_admin_user),
+):
+    """
+    Issue a new single-use activation token for a user, replacing any previous one. (Admin only)
+    """
+    user = user_crud.user.get(db, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail="The user with this username does not exist in the system",
+        )
+    token = user_crud.user.issue_activation_token(db, user=user)
+    return {
+        "username": user.username,
+        "email": user.email,
+        "activation_token": token,
+        "expires_at": user.activation_expires_at,
+    }
+
+
 @router.delete("/{user_id}", response_model=User)
 def delete_user(
     *,
@@ -89,48 +117,87 @@ def read_current_user(
     return current_user
 
 
+def _user_listing(
+    response: Response,
+    db: Session,
+    *,
+    manager_id: Optional[int],
+    role: Optional[List[UserRole]],
+    org_id: Optional[int],
+    name_prefix: Optional[str],
+    cursor: Optional[str],
+    limit: Optional[int],
+):
+    filters = dict(manager_id=manager_id, roles=role, org_id=org_id, name_prefix=name_prefix)
+    return paginated_response(
+        response,
+        user_crud.user.listing_query(db, **filters),
+        [UserModel.id],
+        schema=User,
+        cursor=cursor,
+        limit=limit,
+        count=lambda: user_crud.user.count_listing(db, **filters),
+    )
+
+
 @router.get("/", response_model=List[User])
 def read_users(
+    response: Response,
     db: Session = Depends(get_db),
+    role: Optional[List[UserRole]] = Query(None),
+    org_id: Optional[int] = Query(None, description="Only users in this organization or below it."),
+    name_prefix: Optional[str] = Query(None, min_length=1, description="Full name or username prefix."),
+    cursor: Optional[str] = Query(None, description="`X-Next-Cursor` of the previous page."),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     current_user: UserModel = Depends(deps.get_current_admin_or_dept_head_user),
 ):
     """
-    Retrieve users.
+    Retrieve users, ordered by id.
     - Admins can retrieve all users.
     - Department Heads can retrieve their subordinates.
+    - Filters: `role` (repeatable), `org_id` subtree and `name_prefix`.
+    - Pass `limit` (and then `cursor`) to page through the result; otherwise
+      everything is returned. `X-Total-Count` carries the total on the first page.
     """
-    if current_user.role == UserRole.ADMIN:
-        users = user_crud.user.get_multi(db)
-    elif current_user.role == UserRole.DEPT_HEAD:
-        users = user_crud.user.get_subordinates(db, user_id=current_user.id)
-    else:
+    if current_user.role not in [UserRole.ADMIN, UserRole.DEPT_HEAD]:
         # This case should not be reached due to the dependency check
-        users = []
-    return users
+        return []
+    manager_id = current_user.id if current_user.role == UserRole.DEPT_HEAD else None
+    return _user_listing(
+        response, db, manager_id=manager_id, role=role, org_id=org_id,
+        name_prefix=name_prefix, cursor=cursor, limit=limit,
+    )
 
 
 @router.get("/me/subordinates", response_model=List[User])
 def read_my_subordinates(
     *,
+    response: Response,
     db: Session = Depends(get_db),
+    role: Optional[List[UserRole]] = Query(None),
+    org_id: Optional[int] = Query(None, description="Only users in this organization or below it."),
+    name_prefix: Optional[str] = Query(None, min_length=1, description="Full name or username prefix."),
+    cursor: Optional[str] = Query(None, description="`X-Next-Cursor` of the previous page."),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
     current_user: UserModel = Depends(deps.get_current_user),
 ):
     """
-    Retrieve all subordinates for the current user.
+    Retrieve subordinates for the current user, ordered by id.
     - Admins can retrieve all users.
     - Team leads and department heads can retrieve their own subordinates.
+    - Same filters and pagination as `GET /users/`.
     """
-    if current_user.role == UserRole.ADMIN:
-        return user_crud.user.get_multi(db)
-
-    if current_user.role not in [UserRole.TEAM_LEAD, UserRole.DEPT_HEAD]:
+    if current_user.role not in [UserRole.ADMIN, UserRole.TEAM_LEAD, UserRole.DEPT_HEAD]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to view subordinates.",
         )
-    
-    subordinates = user_crud.user.get_subordinates(db, user_id=current_user.id)
-    return subordinates
+
+    manager_id = None if current_user.role == UserRole.ADMIN else current_user.id
+    return _user_listing(
+        response, db, manager_id=manager_id, role=role, org_id=org_id,
+        name_prefix=name_prefix, cursor=cursor, limit=limit,
+    )
 
 
 @router.get("/me/history", response_model=UserHistoryResponse)
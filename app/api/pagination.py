@@ -0,0 +1,50 @@
+from typing import Any, Callable, Optional, Sequence, Type
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Query
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.api.streaming import stream_json_array
+from app.crud.pagination import DEFAULT_PAGE_SIZE, iter_keyset, keyset_page
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+# Rows loaded per statement when a listing is streamed in full.
+STREAM_PAGE_SIZE = 500
+
+
+def paginated_response(
+    response: Response,
+    query: Query,
+    columns: Sequence[ColumnElement],
+    *,
+    schema: Type[BaseModel],
+    cursor: Optional[str],
+    limit: Optional[int],
+    count: Callable[[], int],
+) -> Any:
+    """
+    Answers a listing request from `query` ordered by `columns`.
+
+    Without `cursor` and `limit` the whole listing is streamed, as the
+    unpaginated endpoints always did. Otherwise one keyset page is returned
+    and the next page's cursor is sent in `X-Next-Cursor` (absent on the
+    last page). `X-Total-Count` is only computed for the first request of a
+    listing; clients keep it while following cursors.
+    """
+    if cursor is None and limit is None:
+        streamed = stream_json_array(iter_keyset(query, columns, page_size=STREAM_PAGE_SIZE), schema)
+        streamed.headers[TOTAL_COUNT_HEADER] = str(count())
+        return streamed
+
+    try:
+        items, next_cursor = keyset_page(query, columns, cursor=cursor, limit=limit or DEFAULT_PAGE_SIZE)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if cursor is None:
+        response.headers[TOTAL_COUNT_HEADER] = str(count())
+    return items
@@ -0,0 +1,30 @@
+from typing import Any, Iterable, Iterator, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+# Items serialized per chunk written to the response.
+STREAM_CHUNK_SIZE = 200
+
+
+def _json_array_chunks(items: Iterable[Any], schema: Type[BaseModel]) -> Iterator[bytes]:
+    yield b"["
+    buffer = []
+    first = True
+    for item in items:
+        buffer.append(schema.model_validate(item).model_dump_json())
+        if len(buffer) >= STREAM_CHUNK_SIZE:
+            yield (("" if first else ",") + ",".join(buffer)).encode()
+            first = False
+            buffer = []
+    if buffer:
+        yield (("" if first else ",") + ",".join(buffer)).encode()
+    yield b"]"
+
+
+def stream_json_array(items: Iterable[Any], schema: Type[BaseModel]) -> StreamingResponse:
+    """
+    Returns `items` as a JSON array of `schema` objects, serialized while
+    they are iterated instead of being collected into a list first.
+    """
+    return StreamingResponse(_json_array_chunks(items, schema), media_type="application/json")
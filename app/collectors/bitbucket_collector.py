@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from app import models, crud
-from app.core.security import decrypt_data
+from app.core.credential_cache import decrypt_credentials
 from app.collectors.base import BaseCollector
 from app.schemas.collaboration import CollaborationInteractionCreate
 from app.models.collaboration import InteractionType, CollaborationCategory
@@ -11,7 +11,7 @@ class BitbucketCollector(BaseCollector):
     """
     def collect(self, user: models.User, account: models.external_account.ExternalAccount) -> int:
         
-        credentials = decrypt_data(account.encrypted_credentials)
+        credentials = decrypt_credentials(account.id, account.encrypted_credentials)
         
         # TODO: Implement actual Bitbucket API connection using credentials
         print(f"INFO: Starting Bitbucket data collection for user '{user.full_name}' with account '{account.account_id}'")
@@ -4,7 +4,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 
 from app import models, crud
-from app.core.security import decrypt_data
+from app.core.credential_cache import decrypt_credentials
 from app.core.config import settings
 from app.collectors.base import BaseCollector
 from app.schemas.collaboration import CollaborationInteractionCreate
@@ -21,7 +21,7 @@ class JiraCollector(BaseCollector):
             return 0
 
         try:
-            credentials = decrypt_data(account.encrypted_credentials)
+            credentials = decrypt_credentials(account.id, account.encrypted_credentials)
         except Exception:
             print(f"ERROR: Could not decrypt credentials for user {user.id} and account {account.id}. Skipping.")
             return 0
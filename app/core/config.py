@@ -1,18 +1,70 @@
 
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./growth_wave.db"
+    # Optional read replica. When set, GET requests get a session on it, so
+    # report and dashboard reads do not compete with writes on the primary.
+    # Replication lag applies: a write may not be visible to the next GET.
+    DATABASE_READ_URL: Optional[str] = None
+    # Connection pool per engine (ignored for SQLite): DB_POOL_SIZE kept-open
+    # connections plus up to DB_MAX_OVERFLOW extra ones under load, waiting up
+    # to DB_POOL_TIMEOUT seconds for a free connection. Connections are
+    # recycled after DB_POOL_RECYCLE seconds and, with DB_POOL_PRE_PING,
+    # checked before use so a restarted database does not fail requests.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Statements running longer than this are cancelled by the server
+    # (PostgreSQL and MySQL). 0 means no limit.
+    DB_STATEMENT_TIMEOUT_MS: int = 0
     SECRET_KEY: str = "a_very_secret_key_that_should_be_changed"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     API_V1_STR: str = "/api/v1"
 
+    # Authentication settings
+    # How long a verified access token may be served from the in-process
+    # principal cache without reloading its user. Changes to a user made
+    # through this process invalidate that user's entries at once.
+    # 0 disables the cache.
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    # Maximum number of cached tokens (least recently used are evicted first).
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    # Authorize requests straight from the verified token claims (user id,
+    # role, organization, token version) instead of loading the user. Tokens
+    # are rejected once the user's token version moves on, i.e. after a role,
+    # organization or username change; such users have to log in again.
+    AUTH_CLAIMS_FAST_PATH: bool = False
+    # How long a user's current token version may be served from memory.
+    # Changes made through this process invalidate it at once.
+    TOKEN_VERSION_CACHE_TTL_SECONDS: int = 30
+    # Password checks on login run on their own pool of LOGIN_VERIFY_WORKERS
+    # threads, so a login storm cannot occupy the request threadpool. Once
+    # LOGIN_MAX_PENDING checks are running or queued, further logins are
+    # answered with 503 and a Retry-After of LOGIN_RETRY_AFTER_SECONDS.
+    LOGIN_VERIFY_WORKERS: int = 4
+    LOGIN_MAX_PENDING: int = 64
+    LOGIN_RETRY_AFTER_SECONDS: int = 2
+
     # IMPORTANT: This is a default key for development.
     # For production, generate a new key using `cryptography.fernet.Fernet.generate_key()`
     # and set it as an environment variable.
     ENCRYPTION_KEY: str = "moxN23-I7gJjA9b3y1b-iGkR5v7y_wZ3-aX9b_c8d_E="
+    # Key rotation: list the new key first, followed by the keys still in use.
+    # New data is encrypted with the first key; data encrypted with any listed
+    # key can be decrypted. Once the rotate-credentials job has re-encrypted
+    # every account, the old keys can be removed. Empty means ENCRYPTION_KEY only.
+    ENCRYPTION_KEYS: list[str] = []
+    # Rows re-encrypted per transaction by the rotate-credentials job.
+    CREDENTIAL_ROTATION_BATCH_SIZE: int = 500
+    # Decrypted external account credentials are kept in memory for this long
+    # (0 disables the cache), for at most CREDENTIAL_CACHE_SIZE accounts.
+    CREDENTIAL_CACHE_TTL_SECONDS: int = 300
+    CREDENTIAL_CACHE_SIZE: int = 1000
 
     # Praise settings
     PRAISE_LIMIT_PER_PERIOD: int = 5
@@ -28,6 +80,36 @@ class Settings(BaseSettings):
         "총명한", "우아한", "강인한", "믿음직한", "평화로운", "유쾌한", "정의로운", "창의적인", "끈기있는", "열정적인"
     ]
     
+    # Evaluation settings
+    # Refresh the stale final scores of a period right after each evaluation submission.
+    # When disabled, scores are refreshed via the recalculate endpoint.
+    RECALCULATE_SCORES_ON_SUBMIT: bool = True
+    # Number of worker processes (organization-subtree shards) used for a full
+    # period calculation. 1 scores everything in the request process.
+    SCORE_CALCULATION_SHARDS: int = 1
+    # How long the in-process evaluation period cache may serve period lookups
+    # before reloading. Writes made through this process invalidate it at once.
+    EVALUATION_PERIOD_CACHE_TTL_SECONDS: int = 60
+
+    # Organization settings
+    # How long the in-process organization tree may serve hierarchy checks
+    # before reloading. Writes made through this process invalidate it at once.
+    ORG_TREE_CACHE_TTL_SECONDS: int = 60
+    # Maximum number of per-manager subordinate id sets kept in memory.
+    SUBORDINATE_CACHE_SIZE: int = 1024
+
+    # User provisioning settings
+    # How the chart sync sets up the accounts it creates:
+    #   "inline"  - the username as initial password, bcrypt in the request process
+    #   "pool"    - the same, with batches hashed in a pool of PASSWORD_HASH_WORKERS processes
+    #   "pending" - no password; a single-use activation token (valid for
+    #               ACTIVATION_TOKEN_EXPIRE_HOURS) is returned for each account
+    #               and sets the password with POST /auth/activate
+    # Accounts created with POST /users are always hashed with bcrypt inline.
+    PASSWORD_PROVISIONING_MODE: Literal["inline", "pool", "pending"] = "inline"
+    PASSWORD_HASH_WORKERS: int = 4
+    ACTIVATION_TOKEN_EXPIRE_HOURS: int = 72
+
     # Jira Collector settings
     JIRA_SERVER_URL: Optional[str] = None
 
@@ -0,0 +1,93 @@
+"""
+Short-lived cache of decrypted external account credentials.
+
+Collectors need the plaintext credentials of every linked account on every
+run, and each decryption is a Fernet HMAC check plus an AES decryption
+(trying every configured key in turn for tokens made with an older key).
+Plaintexts are cached per account for CREDENTIAL_CACHE_TTL_SECONDS.
+
+Entries are held in `bytearray`s and overwritten with zeros whenever they
+leave the cache: on expiry, on LRU eviction and when their account is
+deleted. Each entry also records a digest of the ciphertext it came from,
+so an account whose credentials were replaced or re-encrypted is decrypted
+again instead of being served the old plaintext.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.security import decrypt_data
+
+
+def _zero(buffer: bytearray) -> None:
+    buffer[:] = bytes(len(buffer))
+
+
+def _digest(encrypted_data: str) -> bytes:
+    return hashlib.sha256(encrypted_data.encode()).digest()
+
+
+class CredentialCache:
+    """Thread-safe LRU cache of plaintexts keyed by account id, zeroed on removal."""
+
+    def __init__(self, *, ttl_seconds: float, maxsize: int):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[int, Tuple[float, bytes, bytearray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _drop(self, account_id: int) -> None:
+        entry = self._entries.pop(account_id, None)
+        if entry is not None:
+            _zero(entry[2])
+
+    def get(self, account_id: int, encrypted_data: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if entry is None:
+                return None
+            expires_at, digest, plaintext = entry
+            if expires_at < time.monotonic() or digest != _digest(encrypted_data):
+                self._drop(account_id)
+                return None
+            self._entries.move_to_end(account_id)
+            return plaintext.decode()
+
+    def set(self, account_id: int, encrypted_data: str, plaintext: str) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._drop(account_id)
+            self._entries[account_id] = (
+                time.monotonic() + self.ttl_seconds, _digest(encrypted_data), bytearray(plaintext.encode())
+            )
+            while len(self._entries) > self.maxsize:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                _zero(evicted)
+
+    def invalidate(self, account_ids: Optional[Iterable[int]] = None) -> None:
+        """Zeroes and drops the given accounts, or every entry when none are given."""
+        with self._lock:
+            for account_id in list(self._entries) if account_ids is None else account_ids:
+                self._drop(account_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+credential_cache = CredentialCache(
+    ttl_seconds=settings.CREDENTIAL_CACHE_TTL_SECONDS, maxsize=settings.CREDENTIAL_CACHE_SIZE
+)
+
+
+def decrypt_credentials(account_id: int, encrypted_data: str) -> str:
+    """The plaintext credentials of an account, decrypted at most once per TTL."""
+    plaintext = credential_cache.get(account_id, encrypted_data)
+    if plaintext is None:
+        plaintext = decrypt_data(encrypted_data)
+        credential_cache.set(account_id, encrypted_data, plaintext)
+    return plaintext
@@ -1,5 +1,8 @@
+from typing import Any, Dict, Optional
 
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -7,15 +10,58 @@ from app.core.config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Request methods served from the read replica, when one is configured.
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+def create_db_engine(url: str, *, statement_timeout_ms: Optional[int] = None) -> Engine:
+    """
+    Creates an engine for `url` configured from the DB_* settings.
+
+    SQLite keeps its default pool and only allows use across threads.
+    Other databases get a sized queue pool with pre-ping and recycling, and
+    a server-side statement timeout for PostgreSQL and MySQL.
+    """
+    backend = make_url(url).get_backend_name()
+    if statement_timeout_ms is None:
+        statement_timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS
+    if backend == "sqlite":
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    connect_args: Dict[str, Any] = {}
+    if backend == "postgresql" and statement_timeout_ms:
+        connect_args["options"] = f"-c statement_timeout={int(statement_timeout_ms)}"
+    engine = create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if backend == "mysql" and statement_timeout_ms:
+        @event.listens_for(engine, "connect")
+        def _set_statement_timeout(dbapi_connection, connection_record) -> None:
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET SESSION max_execution_time = {int(statement_timeout_ms)}")
+            cursor.close()
+    return engine
+
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+read_engine = create_db_engine(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else engine
+ReadSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if read_engine is not engine else SessionLocal
+)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    """A session on the read replica for GET requests, on the primary otherwise."""
+    db = ReadSessionLocal() if request.method in READ_METHODS else SessionLocal()
     try:
         yield db
     finally:
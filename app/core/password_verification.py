@@ -0,0 +1,106 @@
+"""
+Bounded executor for login password checks.
+
+bcrypt is deliberately slow (tens of milliseconds of CPU per check). Run in
+the request threadpool, a burst of logins takes every thread and stalls
+unrelated endpoints. Checks are instead handed to a dedicated thread pool
+(bcrypt releases the GIL, so threads run in parallel) and awaited from the
+event loop. The number of checks running or queued is capped; beyond it a
+login is rejected at once instead of waiting in an ever longer queue.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.security import verify_and_update_password
+
+
+class PasswordVerifierSaturated(Exception):
+    """Raised when the verification queue is full."""
+
+
+class LoginMetrics:
+    """Counters and recent latencies of login requests."""
+
+    def __init__(self, *, window: int = 1024):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._verify_latencies: Deque[float] = deque(maxlen=window)
+
+    def observe(self, outcome: str, seconds: float) -> None:
+        """Records one login request ("success", "failure" or "rejected") and its latency."""
+        with self._lock:
+            self._counts[outcome] = self._counts.get(outcome, 0) + 1
+            self._latencies.append(seconds)
+
+    def observe_verification(self, seconds: float) -> None:
+        with self._lock:
+            self._verify_latencies.append(seconds)
+
+    @staticmethod
+    def _percentiles(values) -> Dict[str, Optional[float]]:
+        ordered = sorted(values)
+        if not ordered:
+            return {"p50": None, "p95": None, "p99": None, "max": None}
+
+        def at(fraction: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2)
+
+        return {"p50": at(0.5), "p95": at(0.95), "p99": at(0.99), "max": round(ordered[-1] * 1000, 2)}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": dict(self._counts),
+                "latency_ms": self._percentiles(self._latencies),
+                "verify_latency_ms": self._percentiles(self._verify_latencies),
+            }
+
+
+class PasswordVerifier:
+    def __init__(
+        self,
+        *,
+        workers: int,
+        max_pending: int,
+        verify: Callable[[str, str], Tuple[bool, Optional[str]]] = verify_and_update_password,
+    ):
+        self.max_pending = max_pending
+        self._verify = verify
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="password-verify")
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.metrics = LoginMetrics()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        `verify_and_update_password` on the pool. Raises
+        PasswordVerifierSaturated without waiting when the queue is full.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordVerifierSaturated()
+            self._pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._verify, plain_password, hashed_password)
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self.metrics.observe_verification(time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"pending": self._pending, "max_pending": self.max_pending, **self.metrics.snapshot()}
+
+
+password_verifier = PasswordVerifier(workers=settings.LOGIN_VERIFY_WORKERS, max_pending=settings.LOGIN_MAX_PENDING)
@@ -1,27 +1,96 @@
 
+import hashlib
+import multiprocessing
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional, Sequence, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 
 from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# Fernet instance for encrypting/decrypting external tokens
-fernet = Fernet(settings.ENCRYPTION_KEY.encode())
+# Stored instead of a password hash for accounts awaiting activation. It is
+# not a hash of any scheme, so no password matches it.
+UNUSABLE_PASSWORD = "!"
+
+# Encrypts external tokens with the first configured key and decrypts tokens
+# made with any of them.
+fernet = MultiFernet([Fernet(key.encode()) for key in settings.ENCRYPTION_KEYS or [settings.ENCRYPTION_KEY]])
+
+# In "pool" mode, batches smaller than this are still hashed inline; starting
+# work in another process costs more than it saves for a few passwords.
+POOL_MIN_BATCH_SIZE = 8
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_pool_lock = threading.Lock()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_and_update_password(plain_password, hashed_password)[0]
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verifies a password and returns a replacement hash if the stored one is outdated."""
+    if not hashed_password or pwd_context.identify(hashed_password) is None:
+        return False, None
+    return pwd_context.verify_and_update(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            # Workers are spawned rather than forked from the running server.
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=max(1, settings.PASSWORD_HASH_WORKERS),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _hash_pool
+
+
+def shutdown_hash_pool() -> None:
+    """Stops the password hashing pool, if it was started."""
+    global _hash_pool
+    with _hash_pool_lock:
+        pool, _hash_pool = _hash_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def hash_provisioned_passwords(passwords: Sequence[str]) -> List[str]:
+    """
+    bcrypt hashes of the initial passwords of new accounts, in the order
+    given. In "pool" mode, batches of POOL_MIN_BATCH_SIZE or more are hashed
+    in a shared pool of PASSWORD_HASH_WORKERS processes, started on first use.
+    """
+    if settings.PASSWORD_PROVISIONING_MODE == "pool" and len(passwords) >= POOL_MIN_BATCH_SIZE:
+        chunksize = max(1, len(passwords) // (max(1, settings.PASSWORD_HASH_WORKERS) * 4))
+        return list(_get_hash_pool().map(get_password_hash, passwords, chunksize=chunksize))
+    return [get_password_hash(password) for password in passwords]
+
+
+def hash_activation_token(token: str) -> str:
+    # Tokens are random and high-entropy, so a plain digest is enough to keep
+    # a database leak from revealing usable tokens.
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def generate_activation_token() -> Tuple[str, str]:
+    """A new single-use activation token and the hash to store for it."""
+    token = secrets.token_urlsafe(32)
+    return token, hash_activation_token(token)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -41,3 +110,8 @@ def encrypt_data(data: str) -> str:
 def decrypt_data(encrypted_data: str) -> str:
     """Decrypts a string."""
     return fernet.decrypt(encrypted_data.encode()).decode()
+
+
+def rotate_encrypted_data(encrypted_data: str) -> str:
+    """Re-encrypts a token with the current primary key, keeping its original timestamp."""
+    return fernet.rotate(encrypted_data.encode()).decode()
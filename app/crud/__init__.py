@@ -1,4 +1,5 @@
 from . import user
+from . import principal
 from . import organization
 from .external_account import external_account
 from .praise import praise
@@ -7,7 +7,7 @@ from app.crud.base import CRUDBase
 from app.models.collaboration import CollaborationInteraction, InteractionType, CollaborationCategory
 from app.models.user import User
 from app.models.project_member import ProjectMember
-from app.models.organization import Organization
+from app.models.organization import OrganizationClosure
 from app.schemas.collaboration import CollaborationInteractionCreate, CollaborationData, CollaborationGraph, CollaborationAnalysis, CollaborationNode, CollaborationEdge
 
 
@@ -27,11 +27,12 @@ class CRUDCollaborationInteraction(CRUDBase[CollaborationInteraction, Collaborat
         
         if organization_id:
             # Get all users in the specified organization and its sub-organizations
-            org_and_descendants = db.query(Organization).filter(Organization.id == organization_id).cte(name="org_and_descendants", recursive=True)
-            org_and_descendants = org_and_descendants.union_all(
-                db.query(Organization).filter(Organization.parent_id == org_and_descendants.c.id)
+            org_user_ids = (
+                db.query(User.id)
+                .join(OrganizationClosure, User.organization_id == OrganizationClosure.descendant_id)
+                .filter(OrganizationClosure.ancestor_id == organization_id)
+                .subquery()
             )
-            org_user_ids = db.query(User.id).join(org_and_descendants, User.organization_id == org_and_descendants.c.id).subquery()
             
             query = query.filter(
                 (CollaborationInteraction.source_user_id.in_(org_user_ids)) |
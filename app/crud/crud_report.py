@@ -13,7 +13,7 @@ def get_evaluated_users_by_period(
     - DEPT_HEAD: 자신의 하위 조직에 속한 사용자만 조회합니다.
     - ADMIN: 모든 사용자를 조회합니다.
     """
-    period = crud.evaluation_period.get(db, id=period_id)
+    period = crud.evaluation_period.get_snapshot(db, id=period_id)
     if not period:
         return []
 
@@ -34,9 +34,7 @@ def get_evaluated_users_by_period(
         target_user_ids = evaluated_user_ids
     elif current_user.role == UserRole.DEPT_HEAD:
         # DEPT_HEAD는 자신의 하위 조직원 중에서 평가받은 사용자만 대상으로 합니다.
-        subordinate_ids = {
-            user.id for user in crud.user.user.get_subordinates(db, user_id=current_user.id)
-        }
+        subordinate_ids = crud.user.user.get_subordinate_ids(db, user_id=current_user.id)
         target_user_ids = evaluated_user_ids.intersection(subordinate_ids)
     else:
         # 그 외 역할은 조회 권한이 없습니다. (API 레벨에서 차단되지만 안전장치)
@@ -100,7 +98,7 @@ def get_detailed_evaluation_result(
             continue
 
         # Peer Evaluation
-        peer_score = crud.peer_evaluation.peer_evaluation.get_average_score_for_evaluatee(
+        peer_aggregate = crud.peer_evaluation.peer_evaluation.get_score_aggregate(
             db, evaluatee_id=user_id, project_id=pm.project_id, period_id=period_id
         )
         peer_feedback = crud.peer_evaluation.peer_evaluation.get_feedback_for_evaluatee(
@@ -116,7 +114,8 @@ def get_detailed_evaluation_result(
             project_id=pm.project_id,
             project_name=pm.project.name,
             participation_weight=pm.participation_weight,
-            peer_evaluation_score=peer_score,
+            peer_evaluation_score=peer_aggregate.average_score if peer_aggregate else None,
+            peer_criterion_scores=peer_aggregate.criterion_averages if peer_aggregate else None,
             pm_evaluation_score=pm_eval.score if pm_eval else None,
             peer_feedback=[f.comment for f in peer_feedback if f.comment],
         )
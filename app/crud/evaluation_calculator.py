@@ -1,6 +1,26 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, insert, update
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
-from statistics import mean
+from app.core import database
+from app.core.config import settings
+from app.services.score_sharding import partition_users_by_organization
+from app.services.scoring_kernel import (
+    DEFAULT_SCORE_WEIGHTS,
+    ScoreColumns,
+    ScoreWeights,
+    combine_components,
+    compute_component_scores,
+    compute_scores,
+    grade_boundaries,
+)
+
+PM_ROLES = (models.UserRole.TEAM_LEAD, models.UserRole.DEPT_HEAD)
+
 
 def calculate_and_store_final_scores(
     db: Session, *, evaluatee: models.User, evaluation_period: str
@@ -17,16 +37,16 @@ def calculate_and_store_final_scores(
     #role_weights = crud.evaluation.evaluation_weight.get_multi_by_role(db, role=evaluatee.role)
     #if not role_weights:
         #return None
-    
+
     #weight_map = {item.item: item.weight for item in role_weights}
-    
+
     # 2. Get user's project memberships
     project_memberships = crud.project_member.project_member.get_multi_by_user(db, user_id=evaluatee.id)
-    
+
     total_weighted_peer_score = 0
     total_weighted_pm_score = 0
 
-    is_pm_role = evaluatee.role in [models.UserRole.TEAM_LEAD, models.UserRole.DEPT_HEAD]
+    is_pm_role = evaluatee.role in PM_ROLES
 
     # 3. Calculate weighted average score from all projects
     if is_pm_role:
@@ -56,38 +76,27 @@ def calculate_and_store_final_scores(
                 )
                 if pm_eval:
                     total_weighted_pm_score += pm_eval.score * project_weight
-    
-    # 4. Calculate the combined project score component
+
+    # 4. Peer/PM weights within the project score component (see DEFAULT_SCORE_WEIGHTS)
     #peer_weight = weight_map.get(models.evaluation.EvaluationItem.PEER_REVIEW, 0)
     #pm_weight = weight_map.get(models.evaluation.EvaluationItem.PM_REVIEW, 0)
-    peer_weight = 50
-    pm_weight = 50
-    
-    project_score = 0
-    # Normalize weights within the project score component
-    if (peer_weight + pm_weight) > 0:
-        normalized_peer_weight = peer_weight / (peer_weight + pm_weight)
-        normalized_pm_weight = pm_weight / (peer_weight + pm_weight)
-        project_score = (total_weighted_peer_score * normalized_peer_weight) + \
-                        (total_weighted_pm_score * normalized_pm_weight)
 
     # 5. Get qualitative evaluation score
     qualitative_eval = crud.qualitative_evaluation.qualitative_evaluation.get_by_evaluatee_and_period(
         db, evaluatee_id=evaluatee.id, period_id=period.id
     )
-    
+
     qualitative_combined_score = 0
     if qualitative_eval:
         qualitative_combined_score = (
             qualitative_eval.qualitative_score + qualitative_eval.department_contribution_score
         )
-    
+
     # 6. Calculate final score using the 70/30 split
-    # Normalize qualitative score (out of 30) to a 100-point scale
-    qualitative_normalized_score = (qualitative_combined_score / 30.0) * 100
-    
-    final_score = (project_score * 0.7) + (qualitative_normalized_score * 0.3)
-    
+    final_score = combine_components(
+        total_weighted_peer_score, total_weighted_pm_score, qualitative_combined_score
+    )
+
     # 7. Create and store the final evaluation record
     final_eval_in = schemas.FinalEvaluationCreate(
         evaluatee_id=evaluatee.id,
@@ -97,7 +106,7 @@ def calculate_and_store_final_scores(
         qualitative_score=qualitative_combined_score, # Store the combined score
         final_score=final_score,
     )
-    
+
     db_obj = crud.final_evaluation.get_by_user_and_period(
         db, evaluatee_id=evaluatee.id, period_id=period.id
     )
@@ -109,18 +118,425 @@ def calculate_and_store_final_scores(
     return final_evaluation
 
 
-def calculate_scores_for_period(db: Session, *, period_id: int) -> bool:
+@dataclass
+class PeriodEvaluationData:
+    """
+    Everything needed to score a set of users for one period, loaded with a
+    handful of grouped queries instead of several queries per membership.
+    """
+    evaluation_period: str
+    # (user_id, role) in id order
+    users: List[Tuple[int, models.UserRole]] = field(default_factory=list)
+    # user_id -> [(project_id, participation_weight)] in membership id order
+    memberships: Dict[int, List[Tuple[int, int]]] = field(default_factory=dict)
+    # (evaluatee_id, project_id) -> average total peer score
+    peer_averages: Dict[Tuple[int, int], float] = field(default_factory=dict)
+    # (evaluatee_id, project_id) -> first PM score for that project
+    pm_scores: Dict[Tuple[int, int], int] = field(default_factory=dict)
+    # evaluatee_id -> first PM score across all projects (used for PM roles)
+    first_pm_scores: Dict[int, int] = field(default_factory=dict)
+    # evaluatee_id -> qualitative_score + department_contribution_score
+    qualitative_scores: Dict[int, int] = field(default_factory=dict)
+
+
+def load_period_evaluation_data(
+    db: Session, *, evaluation_period: str, user_ids: Optional[List[int]] = None
+) -> PeriodEvaluationData:
+    """
+    Loads peer, PM and qualitative data for a period with grouped queries.
+    If `user_ids` is given, only those evaluatees are loaded.
+    """
+    User = models.User
+    ProjectMember = models.ProjectMember
+    PeerScoreAggregate = models.PeerScoreAggregate
+    PmEvaluation = models.PmEvaluation
+    QualitativeEvaluation = models.QualitativeEvaluation
+
+    data = PeriodEvaluationData(evaluation_period=evaluation_period)
+
+    user_query = db.query(User.id, User.role)
+    if user_ids is not None:
+        user_query = user_query.filter(User.id.in_(user_ids))
+    data.users = [(row.id, row.role) for row in user_query.order_by(User.id)]
+
+    membership_query = db.query(
+        ProjectMember.user_id, ProjectMember.project_id, ProjectMember.participation_weight
+    )
+    if user_ids is not None:
+        membership_query = membership_query.filter(ProjectMember.user_id.in_(user_ids))
+    for row in membership_query.order_by(ProjectMember.id):
+        data.memberships.setdefault(row.user_id, []).append(
+            (row.project_id, row.participation_weight)
+        )
+
+    peer_query = db.query(
+        PeerScoreAggregate.evaluatee_id,
+        PeerScoreAggregate.project_id,
+        PeerScoreAggregate.score_sum,
+        PeerScoreAggregate.eval_count,
+    ).filter(PeerScoreAggregate.evaluation_period == evaluation_period)
+    if user_ids is not None:
+        peer_query = peer_query.filter(PeerScoreAggregate.evaluatee_id.in_(user_ids))
+    for row in peer_query:
+        if row.eval_count > 0:
+            data.peer_averages[(row.evaluatee_id, row.project_id)] = row.score_sum / row.eval_count
+
+    pm_query = db.query(
+        PmEvaluation.evaluatee_id, PmEvaluation.project_id, PmEvaluation.score
+    ).filter(PmEvaluation.evaluation_period == evaluation_period)
+    if user_ids is not None:
+        pm_query = pm_query.filter(PmEvaluation.evaluatee_id.in_(user_ids))
+    for row in pm_query.order_by(PmEvaluation.id):
+        data.pm_scores.setdefault((row.evaluatee_id, row.project_id), row.score)
+        data.first_pm_scores.setdefault(row.evaluatee_id, row.score)
+
+    qualitative_query = db.query(
+        QualitativeEvaluation.evaluatee_id,
+        QualitativeEvaluation.qualitative_score,
+        QualitativeEvaluation.department_contribution_score,
+    ).filter(QualitativeEvaluation.evaluation_period == evaluation_period)
+    if user_ids is not None:
+        qualitative_query = qualitative_query.filter(QualitativeEvaluation.evaluatee_id.in_(user_ids))
+    for row in qualitative_query.order_by(QualitativeEvaluation.id):
+        data.qualitative_scores.setdefault(
+            row.evaluatee_id, row.qualitative_score + row.department_contribution_score
+        )
+
+    return data
+
+
+def build_score_columns(data: PeriodEvaluationData) -> ScoreColumns:
+    """
+    Flattens loaded period data into the columnar layout of the scoring kernel.
+    Users keep the order of `data.users`.
+    """
+    user_count = len(data.users)
+    row_user: List[int] = []
+    row_weight: List[int] = []
+    row_peer_avg: List[float] = []
+    row_pm_score: List[int] = []
+    is_pm_role = np.zeros(user_count, dtype=bool)
+    first_pm_score = np.zeros(user_count)
+    qualitative_score = np.zeros(user_count)
+
+    for index, (user_id, role) in enumerate(data.users):
+        is_pm_role[index] = role in PM_ROLES
+        first_pm_score[index] = data.first_pm_scores.get(user_id, 0)
+        qualitative_score[index] = data.qualitative_scores.get(user_id, 0)
+        for project_id, participation_weight in data.memberships.get(user_id, []):
+            row_user.append(index)
+            row_weight.append(participation_weight)
+            row_peer_avg.append(data.peer_averages.get((user_id, project_id)) or 0)
+            row_pm_score.append(data.pm_scores.get((user_id, project_id), 0))
+
+    return ScoreColumns(
+        user_count=user_count,
+        row_user=np.asarray(row_user, dtype=np.intp),
+        row_weight=np.asarray(row_weight, dtype=float) / 100.0,
+        row_peer_avg=np.asarray(row_peer_avg, dtype=float),
+        row_pm_score=np.asarray(row_pm_score, dtype=float),
+        is_pm_role=is_pm_role,
+        first_pm_score=first_pm_score,
+        # The combined qualitative score is already summed by the loader.
+        qualitative_score=qualitative_score,
+        department_contribution_score=np.zeros(user_count),
+    )
+
+
+def compute_final_scores(
+    data: PeriodEvaluationData, weights: ScoreWeights = DEFAULT_SCORE_WEIGHTS
+) -> List[Dict]:
+    """
+    Computes the FinalEvaluation values for every user in `data` in memory
+    with the vectorized scoring kernel. Results match
+    `calculate_and_store_final_scores` for the default weights.
+    """
+    scores = compute_scores(build_score_columns(data), weights)
+    peer_scores = scores.peer_score.tolist()
+    pm_scores = scores.pm_score.tolist()
+    qualitative_scores = scores.qualitative_score.tolist()
+    final_scores = scores.final_score.tolist()
+
+    return [
+        {
+            "evaluatee_id": user_id,
+            "peer_score": peer_scores[index],
+            "pm_score": pm_scores[index],
+            "qualitative_score": qualitative_scores[index],
+            "final_score": final_scores[index],
+        }
+        for index, (user_id, _) in enumerate(data.users)
+    ]
+
+
+def store_final_scores(db: Session, *, evaluation_period: str, results: List[Dict]) -> None:
+    """
+    Writes computed scores back with one batched UPDATE for existing
+    FinalEvaluation rows and one batched INSERT for new ones, in a single
+    transaction. Existing grades are left untouched.
+    """
+    if results:
+        _write_final_scores(db, evaluation_period=evaluation_period, results=results)
+    db.commit()
+
+
+def _write_final_scores(db: Session, *, evaluation_period: str, results: List[Dict]) -> None:
+    FinalEvaluation = models.FinalEvaluation
+    existing_ids: Dict[int, int] = {}
+    existing_query = (
+        db.query(FinalEvaluation.evaluatee_id, FinalEvaluation.id)
+        .filter(
+            FinalEvaluation.evaluation_period == evaluation_period,
+            FinalEvaluation.evaluatee_id.in_([r["evaluatee_id"] for r in results]),
+        )
+        .order_by(FinalEvaluation.id)
+    )
+    for row in existing_query:
+        existing_ids.setdefault(row.evaluatee_id, row.id)
+
+    updates = []
+    inserts = []
+    for result in results:
+        final_eval_id = existing_ids.get(result["evaluatee_id"])
+        if final_eval_id is not None:
+            updates.append({"id": final_eval_id, **result})
+        else:
+            inserts.append(
+                {"evaluation_period": evaluation_period, **result}
+            )
+
+    if updates:
+        db.execute(update(FinalEvaluation), updates)
+    if inserts:
+        db.execute(insert(FinalEvaluation), inserts)
+
+
+def _init_scoring_worker() -> None:
+    # Connections inherited from the parent process must not be reused.
+    database.engine.dispose(close=False)
+
+
+def _score_user_shard(evaluation_period: str, user_ids: List[int]) -> List[Dict]:
+    """Worker entry point: scores one shard of users with its own session."""
+    db = database.SessionLocal()
+    try:
+        data = load_period_evaluation_data(db, evaluation_period=evaluation_period, user_ids=user_ids)
+        return compute_final_scores(data)
+    finally:
+        db.close()
+
+
+def compute_sharded_final_scores(
+    db: Session, *, evaluation_period: str, shard_count: int
+) -> List[Dict]:
+    """
+    Computes the final scores of every user, split into organization-subtree
+    shards that are scored in parallel worker processes. Workers read through
+    their own `SessionLocal`, so only committed data is seen. Results are
+    returned in evaluatee id order, like `compute_final_scores`.
+    """
+    organizations = db.query(models.Organization.id, models.Organization.parent_id).all()
+    users = db.query(models.User.id, models.User.organization_id).all()
+    shards = partition_users_by_organization(organizations, users, shard_count)
+
+    if len(shards) <= 1:
+        data = load_period_evaluation_data(db, evaluation_period=evaluation_period)
+        return compute_final_scores(data)
+
+    with ProcessPoolExecutor(max_workers=len(shards), initializer=_init_scoring_worker) as executor:
+        shard_results = executor.map(
+            _score_user_shard, [evaluation_period] * len(shards), shards
+        )
+        results = [result for shard_result in shard_results for result in shard_result]
+
+    results.sort(key=lambda result: result["evaluatee_id"])
+    return results
+
+
+def calculate_scores_for_period(
+    db: Session, *, period_id: int, shard_count: Optional[int] = None
+) -> bool:
     """
     Calculates final scores for all users for a given evaluation period.
+    With more than one shard (`SCORE_CALCULATION_SHARDS` by default), scoring
+    runs in parallel worker processes and the results are written back in a
+    single write phase.
     """
-    period = crud.evaluation_period.get(db, id=period_id)
+    period = crud.evaluation_period.get_snapshot(db, id=period_id)
     if not period:
         return False
+    if shard_count is None:
+        shard_count = settings.SCORE_CALCULATION_SHARDS
+
+    # Every user is refreshed, so all pending marks read up front are resolved.
+    pending_marks = crud.final_evaluation.get_pending_recalculations(
+        db, evaluation_period=period.name
+    )
+    if shard_count > 1:
+        results = compute_sharded_final_scores(
+            db, evaluation_period=period.name, shard_count=shard_count
+        )
+    else:
+        data = load_period_evaluation_data(db, evaluation_period=period.name)
+        results = compute_final_scores(data)
+    crud.final_evaluation.clear_pending_recalculations(db, marks=pending_marks)
+    store_final_scores(db, evaluation_period=period.name, results=results)
+
+    return True
+
+
+def refresh_pending_scores(db: Session, *, evaluation_period: str) -> List[int]:
+    """
+    Refreshes the FinalEvaluation rows of evaluatees marked stale by
+    evaluation writes and clears their marks, in the current transaction.
+    Does not commit. Returns the refreshed evaluatee ids.
 
-    users = crud.user.user.get_multi(db)
-    for user in users:
-        calculate_and_store_final_scores(
-            db, evaluatee=user, evaluation_period=period.name
+    Evaluatees without a FinalEvaluation row for the period get one. Marks
+    bumped by a concurrent write after being read are kept.
+    """
+    db.flush()
+    pending_marks = crud.final_evaluation.get_pending_recalculations(
+        db, evaluation_period=evaluation_period
+    )
+    if not pending_marks:
+        return []
+
+    pending_ids = sorted({mark.evaluatee_id for mark in pending_marks})
+    data = load_period_evaluation_data(
+        db, evaluation_period=evaluation_period, user_ids=pending_ids
+    )
+    results = compute_final_scores(data)
+    _write_final_scores(db, evaluation_period=evaluation_period, results=results)
+    crud.final_evaluation.clear_pending_recalculations(db, marks=pending_marks)
+    return pending_ids
+
+
+def recalculate_pending_scores(
+    db: Session, *, evaluation_period: str
+) -> List[models.FinalEvaluation]:
+    """
+    Refreshes the FinalEvaluation rows of evaluatees marked stale by
+    evaluation writes, and clears their marks in the same transaction.
+    """
+    FinalEvaluation = models.FinalEvaluation
+
+    pending_ids = refresh_pending_scores(db, evaluation_period=evaluation_period)
+    if not pending_ids:
+        return []
+    db.commit()
+
+    return (
+        db.query(FinalEvaluation)
+        .filter(
+            FinalEvaluation.evaluation_period == evaluation_period,
+            FinalEvaluation.evaluatee_id.in_(pending_ids),
+        )
+        .order_by(FinalEvaluation.evaluatee_id, FinalEvaluation.id)
+        .all()
+    )
+
+
+def _simulation_scenario(
+    *,
+    name: Optional[str],
+    weights: ScoreWeights,
+    user_ids: List[int],
+    final_scores: np.ndarray,
+    baseline_scores: np.ndarray,
+    cumulative_ratios: Tuple[float, float],
+    baseline_boundaries: Optional[List[Optional[float]]] = None,
+) -> Dict:
+    boundaries = grade_boundaries(final_scores, cumulative_ratios)
+    if baseline_boundaries is None:
+        baseline_boundaries = boundaries
+    shifts = [
+        current - base if current is not None and base is not None else None
+        for current, base in zip(boundaries, baseline_boundaries)
+    ]
+    deltas = (final_scores - baseline_scores).tolist()
+    simulated = final_scores.tolist()
+    baseline = baseline_scores.tolist()
+    return {
+        "name": name,
+        "weights": {
+            "name": name,
+            "peer_weight": weights.peer_weight,
+            "pm_weight": weights.pm_weight,
+            "project_ratio": weights.project_ratio,
+            "qualitative_ratio": weights.qualitative_ratio,
+        },
+        "mean_score": float(final_scores.mean()) if len(final_scores) else 0.0,
+        "min_score": float(final_scores.min()) if len(final_scores) else 0.0,
+        "max_score": float(final_scores.max()) if len(final_scores) else 0.0,
+        "boundaries": {"s_min_score": boundaries[0], "a_min_score": boundaries[1]},
+        "boundary_shift": {"s_min_score": shifts[0], "a_min_score": shifts[1]},
+        "users": [
+            {
+                "evaluatee_id": user_id,
+                "baseline_score": baseline[index],
+                "simulated_score": simulated[index],
+                "delta": deltas[index],
+            }
+            for index, user_id in enumerate(user_ids)
+        ],
+    }
+
+
+def simulate_final_scores(
+    db: Session,
+    *,
+    evaluation_period: str,
+    weight_sets: List[Tuple[Optional[str], ScoreWeights]],
+    s_ratio: float,
+    a_ratio: float,
+) -> Dict:
+    """
+    Computes the period's score distribution under each (name, weights) set
+    without writing anything. The period data is loaded and the per-user
+    component scores are computed once; each weight set only re-runs the
+    final blend. Deltas and grade-boundary shifts are relative to the current
+    formula (DEFAULT_SCORE_WEIGHTS).
+    """
+    data = load_period_evaluation_data(db, evaluation_period=evaluation_period)
+    components = compute_component_scores(build_score_columns(data))
+    user_ids = [user_id for user_id, _ in data.users]
+    cumulative_ratios = (s_ratio, s_ratio + a_ratio)
+
+    def blend(weights: ScoreWeights) -> np.ndarray:
+        return np.asarray(
+            combine_components(
+                components.peer_score, components.pm_score, components.qualitative_score, weights
+            ),
+            dtype=float,
+        )
+
+    baseline_scores = blend(DEFAULT_SCORE_WEIGHTS)
+    baseline = _simulation_scenario(
+        name="current",
+        weights=DEFAULT_SCORE_WEIGHTS,
+        user_ids=user_ids,
+        final_scores=baseline_scores,
+        baseline_scores=baseline_scores,
+        cumulative_ratios=cumulative_ratios,
+    )
+    baseline_boundaries = [baseline["boundaries"]["s_min_score"], baseline["boundaries"]["a_min_score"]]
+
+    scenarios = [
+        _simulation_scenario(
+            name=name,
+            weights=weights,
+            user_ids=user_ids,
+            final_scores=blend(weights),
+            baseline_scores=baseline_scores,
+            cumulative_ratios=cumulative_ratios,
+            baseline_boundaries=baseline_boundaries,
         )
-    
-    return True
\ No newline at end of file
+        for name, weights in weight_sets
+    ]
+
+    return {
+        "evaluation_period": evaluation_period,
+        "user_count": len(user_ids),
+        "baseline": baseline,
+        "scenarios": scenarios,
+    }
@@ -1,23 +1,118 @@
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, object_session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.crud.base import CRUDBase
 from app.models.evaluation import EvaluationPeriod
 from app.schemas.evaluation import EvaluationPeriodCreate, EvaluationPeriodUpdate
-from sqlalchemy.orm import Session
 from datetime import date
 
 
+@dataclass(frozen=True)
+class PeriodSnapshot:
+    """Detached, read-only copy of an evaluation period row."""
+    id: int
+    name: str
+    start_date: date
+    end_date: date
+
+
+@dataclass
+class PeriodIndex:
+    periods: List[PeriodSnapshot] = field(default_factory=list)  # in id order
+    by_id: Dict[int, PeriodSnapshot] = field(default_factory=dict)
+    by_name: Dict[str, PeriodSnapshot] = field(default_factory=dict)
+
+    def active_on(self, day: date) -> PeriodSnapshot | None:
+        for period in self.periods:
+            if period.start_date <= day <= period.end_date:
+                return period
+        return None
+
+
+# Evaluation periods are few and rarely written, so the whole table is cached
+# as one index. The TTL bounds staleness from writes made by other processes.
+_period_cache: TTLCache[PeriodIndex] = TTLCache(
+    ttl_seconds=settings.EVALUATION_PERIOD_CACHE_TTL_SECONDS, maxsize=1
+)
+_PERIOD_INDEX_KEY = "periods"
+# Set on a session/connection that has written periods it has not committed yet.
+_PERIODS_CHANGED = "evaluation_periods_changed"
+
+
+def invalidate_period_cache() -> None:
+    _period_cache.invalidate()
+
+
+def _load_period_index(db: Session) -> PeriodIndex:
+    index = PeriodIndex()
+    rows = db.query(
+        EvaluationPeriod.id, EvaluationPeriod.name, EvaluationPeriod.start_date, EvaluationPeriod.end_date
+    ).order_by(EvaluationPeriod.id)
+    for row in rows:
+        snapshot = PeriodSnapshot(id=row.id, name=row.name, start_date=row.start_date, end_date=row.end_date)
+        index.periods.append(snapshot)
+        index.by_id[snapshot.id] = snapshot
+        index.by_name.setdefault(snapshot.name, snapshot)
+    return index
+
+
+def _period_index(db: Session) -> PeriodIndex:
+    # A session with its own uncommitted period writes must not see (or
+    # publish) the shared index.
+    if db.info.get(_PERIODS_CHANGED):
+        return _load_period_index(db)
+    return _period_cache.get_or_load(_PERIOD_INDEX_KEY, lambda: _load_period_index(db))
+
+
+@event.listens_for(EvaluationPeriod, "after_insert")
+@event.listens_for(EvaluationPeriod, "after_update")
+@event.listens_for(EvaluationPeriod, "after_delete")
+def _on_period_written(mapper, connection, target) -> None:
+    invalidate_period_cache()
+    connection.info[_PERIODS_CHANGED] = True
+    session = object_session(target)
+    if session is not None:
+        session.info[_PERIODS_CHANGED] = True
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _on_session_transaction_end(session: Session) -> None:
+    if session.info.pop(_PERIODS_CHANGED, False):
+        invalidate_period_cache()
+
+
+@event.listens_for(Engine, "commit")
+@event.listens_for(Engine, "rollback")
+def _on_connection_transaction_end(connection) -> None:
+    # Covers transactions controlled outside the session, e.g. an outer
+    # connection-level transaction that is rolled back.
+    if connection.info.pop(_PERIODS_CHANGED, False):
+        invalidate_period_cache()
+
+
 class CRUDEvaluationPeriod(CRUDBase[EvaluationPeriod, EvaluationPeriodCreate, EvaluationPeriodUpdate]):
-    def get_active_period(self, db: Session) -> EvaluationPeriod | None:
+    def get_active_period(self, db: Session) -> PeriodSnapshot | None:
         """
         Find the currently active evaluation period.
         """
-        today = date.today()
-        return db.query(EvaluationPeriod).filter(
-            EvaluationPeriod.start_date <= today,
-            EvaluationPeriod.end_date >= today
-        ).first()
-
-    def get_by_name(self, db: Session, *, name: str) -> EvaluationPeriod | None:
-        return db.query(EvaluationPeriod).filter(EvaluationPeriod.name == name).first()
+        return _period_index(db).active_on(date.today())
+
+    def get_by_name(self, db: Session, *, name: str) -> PeriodSnapshot | None:
+        return _period_index(db).by_name.get(name)
+
+    def get_snapshot(self, db: Session, *, id: int) -> PeriodSnapshot | None:
+        return _period_index(db).by_id.get(id)
+
+    def get_name(self, db: Session, *, id: int) -> str | None:
+        period = self.get_snapshot(db, id=id)
+        return period.name if period else None
 
 
 evaluation_period = CRUDEvaluationPeriod(EvaluationPeriod)
@@ -1,10 +1,18 @@
+from sqlalchemy import bindparam, event, inspect
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Optional, Set
+
+from cryptography.fernet import InvalidToken
 
 from app.crud.base import CRUDBase
 from app.models.external_account import ExternalAccount
 from app.schemas.external_account import ExternalAccountCreate
-from app.core.security import encrypt_data
+from app.core.config import settings
+from app.core.credential_cache import credential_cache
+from app.core.security import encrypt_data, rotate_encrypted_data
+
+# Set on a session that deleted accounts: their ids, or True for a bulk delete.
+_CREDENTIALS_DELETED = "credentials_deleted"
 
 class CRUDExternalAccount(CRUDBase[ExternalAccount, ExternalAccountCreate, None]):
     def create_with_owner(
@@ -35,4 +43,88 @@ class CRUDExternalAccount(CRUDBase[ExternalAccount, ExternalAccountCreate, None]
             .all()
         )
 
+    def rotate_credentials(self, db: Session, *, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Re-encrypts every account's credentials with the primary encryption
+        key. Rows are read in id order, `batch_size` at a time, and each batch
+        is written and committed on its own, so no lock is held for longer
+        than one batch and collectors keep working throughout (every
+        configured key still decrypts). A row whose credentials changed since
+        it was read is left alone and counted as `skipped`; rows no configured
+        key can decrypt are counted as `failed`.
+        """
+        batch_size = batch_size or settings.CREDENTIAL_ROTATION_BATCH_SIZE
+        table = ExternalAccount.__table__
+        statement = (
+            table.update()
+            .where(table.c.id == bindparam("b_id"))
+            .where(table.c.encrypted_credentials == bindparam("b_old"))
+            .values(encrypted_credentials=bindparam("b_new"))
+        )
+        stats = {"rotated": 0, "skipped": 0, "failed": 0}
+        last_id = 0
+        while True:
+            rows = (
+                db.query(ExternalAccount.id, ExternalAccount.encrypted_credentials)
+                .filter(ExternalAccount.id > last_id)
+                .order_by(ExternalAccount.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                return stats
+            last_id = rows[-1].id
+            params = []
+            for row in rows:
+                try:
+                    params.append({
+                        "b_id": row.id,
+                        "b_old": row.encrypted_credentials,
+                        "b_new": rotate_encrypted_data(row.encrypted_credentials),
+                    })
+                except InvalidToken:
+                    stats["failed"] += 1
+            if params:
+                updated = db.execute(statement, params).rowcount
+                stats["rotated"] += updated
+                stats["skipped"] += len(params) - updated
+            db.commit()
+
+
+def _mark_deleted(session: Optional[Session], account_ids: Optional[Set[int]]) -> None:
+    # Zeroed at flush and again at commit, in case a concurrent reader cached
+    # the credentials in between.
+    credential_cache.invalidate(account_ids)
+    if session is None:
+        return
+    pending = session.info.get(_CREDENTIALS_DELETED)
+    if pending is True:
+        return
+    session.info[_CREDENTIALS_DELETED] = True if account_ids is None else (pending or set()) | account_ids
+
+
+@event.listens_for(ExternalAccount, "after_delete")
+def _on_account_deleted(mapper, connection, target) -> None:
+    _mark_deleted(inspect(target).session, {target.id})
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_bulk_delete(orm_execute_state) -> None:
+    mapper = orm_execute_state.bind_mapper
+    if orm_execute_state.is_delete and mapper is not None and mapper.class_ is ExternalAccount:
+        _mark_deleted(orm_execute_state.session, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_session_commit(session: Session) -> None:
+    deleted = session.info.pop(_CREDENTIALS_DELETED, None)
+    if deleted is not None:
+        credential_cache.invalidate(None if deleted is True else deleted)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_session_rollback(session: Session) -> None:
+    session.info.pop(_CREDENTIALS_DELETED, None)
+
+
 external_account = CRUDExternalAccount(ExternalAccount)
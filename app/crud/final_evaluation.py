@@ -1,23 +1,111 @@
+from typing import Any, Iterable, List
+
+from sqlalchemy import delete, insert, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.crud.base import CRUDBase
-from app.models.evaluation import FinalEvaluation, EvaluationPeriod
+from app.crud.upsert import UPSERT_BATCH_SIZE, conflict_insert
+from app.crud.evaluation_period import evaluation_period as crud_evaluation_period
+from app.models.evaluation import FinalEvaluation, PendingScoreRecalculation
 from app.schemas.evaluation import FinalEvaluationCreate, FinalEvaluationUpdate
 
 class CRUDFinalEvaluation(CRUDBase[FinalEvaluation, FinalEvaluationCreate, FinalEvaluationUpdate]):
     def get_by_user_and_period(
         self, db: Session, *, evaluatee_id: int, period_id: int
     ) -> FinalEvaluation | None:
-        period = db.query(EvaluationPeriod).filter(EvaluationPeriod.id == period_id).first()
-        if not period:
+        period_name = crud_evaluation_period.get_name(db, id=period_id)
+        if not period_name:
             return None
         return (
             db.query(FinalEvaluation)
             .filter(
                 FinalEvaluation.evaluatee_id == evaluatee_id,
-                FinalEvaluation.evaluation_period == period.name,
+                FinalEvaluation.evaluation_period == period_name,
             )
+            .order_by(FinalEvaluation.id)
             .first()
         )
 
+    def mark_for_recalculation(
+        self, db: Session, *, evaluatee_ids: Iterable[int], evaluation_period: str
+    ) -> None:
+        """
+        Marks evaluatees whose final score is stale. Existing marks get their
+        version bumped. Concurrent writers marking the same evaluatee never
+        conflict. Does not commit; callers mark inside their own write.
+        """
+        evaluatee_ids = set(evaluatee_ids)
+        if not evaluatee_ids:
+            return
+        on_conflict_insert = conflict_insert(db)
+        if on_conflict_insert is not None:
+            rows = [
+                {"evaluatee_id": evaluatee_id, "evaluation_period": evaluation_period, "version": 1}
+                for evaluatee_id in sorted(evaluatee_ids)
+            ]
+            for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+                stmt = on_conflict_insert(PendingScoreRecalculation).values(rows[start:start + UPSERT_BATCH_SIZE])
+                db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["evaluatee_id", "evaluation_period"],
+                        set_={"version": PendingScoreRecalculation.version + 1},
+                    )
+                )
+            return
+        for evaluatee_id in sorted(evaluatee_ids):
+            if self._bump_mark(db, evaluatee_id=evaluatee_id, evaluation_period=evaluation_period):
+                continue
+            try:
+                with db.begin_nested():
+                    db.execute(
+                        insert(PendingScoreRecalculation).values(
+                            evaluatee_id=evaluatee_id, evaluation_period=evaluation_period, version=1
+                        )
+                    )
+            except IntegrityError:
+                # Another writer inserted the mark in between; bump theirs.
+                self._bump_mark(db, evaluatee_id=evaluatee_id, evaluation_period=evaluation_period)
+
+    def _bump_mark(self, db: Session, *, evaluatee_id: int, evaluation_period: str) -> bool:
+        return db.execute(
+            update(PendingScoreRecalculation)
+            .where(
+                PendingScoreRecalculation.evaluatee_id == evaluatee_id,
+                PendingScoreRecalculation.evaluation_period == evaluation_period,
+            )
+            .values(version=PendingScoreRecalculation.version + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount > 0
+
+    def get_pending_recalculations(
+        self, db: Session, *, evaluation_period: str
+    ) -> List[Any]:
+        """Returns (id, evaluatee_id, version) rows of the pending marks of a period."""
+        return (
+            db.query(
+                PendingScoreRecalculation.id,
+                PendingScoreRecalculation.evaluatee_id,
+                PendingScoreRecalculation.version,
+            )
+            .filter(PendingScoreRecalculation.evaluation_period == evaluation_period)
+            .all()
+        )
+
+    def clear_pending_recalculations(
+        self, db: Session, *, marks: List[Any]
+    ) -> None:
+        """
+        Deletes the given marks unless they were re-marked after being read.
+        Does not commit.
+        """
+        for start in range(0, len(marks), 500):
+            seen = [(mark.id, mark.version) for mark in marks[start:start + 500]]
+            db.execute(
+                delete(PendingScoreRecalculation).where(
+                    tuple_(PendingScoreRecalculation.id, PendingScoreRecalculation.version).in_(seen)
+                ),
+                execution_options={"synchronize_session": False},
+            )
+
 final_evaluation = CRUDFinalEvaluation(FinalEvaluation)
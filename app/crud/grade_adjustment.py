@@ -1,10 +1,66 @@
 from app import crud, models
-from typing import List, Dict
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Dict, Optional
 from app.schemas.evaluation import GradeAdjustment
+from sqlalchemy import case, func, select, update
 from sqlalchemy.orm import Session
 from app.exceptions import GradeAdjustmentError, GradeTOExceededError
+from app.services.grade_assignment import B, GRADE_LABELS, assign_grade_codes
 import math
 
+import numpy as np
+
+
+@dataclass(frozen=True)
+class GradeQuota:
+    """S/A TO of one department and how much of it the current grades use."""
+    department_id: int
+    department_name: str
+    department_grade: Optional[str]
+    headcount: int
+    s_to: Optional[int]
+    a_to: Optional[int]
+    s_count: int
+    a_count: int
+    b_plus_count: int
+    b_minus_count: int
+
+
+def _grade_to(headcount: int, ratio: Optional[float]) -> Optional[int]:
+    if ratio is None:
+        return None
+    return math.floor(headcount * (ratio / 100.0))
+
+
+def _validate_to(db: Session, *, department_id: int, evaluation_period: str, headcount: int, grade_counts: Counter) -> None:
+    # Get the evaluation period object to find the period_id
+    period = crud.evaluation_period.get_by_name(db, name=evaluation_period)
+    if not period:
+        raise GradeAdjustmentError(f"Evaluation period '{evaluation_period}' not found.")
+
+    # Get the department's grade for the specific period from the DepartmentEvaluation table
+    department_grade = db.execute(
+        select(models.DepartmentEvaluation.grade).where(
+            models.DepartmentEvaluation.department_id == department_id,
+            models.DepartmentEvaluation.evaluation_period_id == period.id,
+        )
+    ).scalar()
+    if not department_grade:
+        raise GradeTOExceededError("Department grade is not set for the selected period.")
+
+    ratio = crud.department_grade_ratio.get_by_grade(db, department_grade=department_grade)
+    if not ratio:
+        raise GradeTOExceededError(f"Grade ratio for department grade '{department_grade}' not found.")
+
+    s_to = _grade_to(headcount, ratio.s_ratio)
+    a_to = _grade_to(headcount, ratio.a_ratio)
+    if grade_counts["S"] > s_to:
+        raise GradeTOExceededError(f"Number of S grades ({grade_counts['S']}) exceeds the limit ({s_to}).")
+    if grade_counts["A"] > a_to:
+        raise GradeTOExceededError(f"Number of A grades ({grade_counts['A']}) exceeds the limit ({a_to}).")
+
+
 def adjust_grades_for_department(
     db: Session,
     *,
@@ -15,83 +71,299 @@ def adjust_grades_for_department(
 ) -> List[models.FinalEvaluation]:
     """
     Adjusts grades for all users in a department, ensuring B+/B- balance and TO limits.
+
+    The department's grade counts are kept in a Counter and moved per
+    adjustment, so validation is linear in the department size plus the
+    number of adjustments. All accepted changes are written with a single
+    UPDATE and committed together.
     """
     # 1. Get the department and its users
-    parent_org = crud.organization.organization.get(db, id=department_id)
-    if not parent_org:
+    org_tree = crud.organization.get_org_tree(db)
+    if department_id not in org_tree:
         raise GradeAdjustmentError(f"Department with id {department_id} not found.")
-    org_and_descendants = [parent_org] + crud.organization.get_all_descendant_orgs(db, department_id)
-    dept_user_ids = [user.id for org in org_and_descendants for user in org.members]
-    
-    # 2. Get all final evaluations for these users in the period
-    all_evals = (
-        db.query(models.FinalEvaluation)
-        .filter(
-            models.FinalEvaluation.evaluatee_id.in_(dept_user_ids),
-            models.FinalEvaluation.evaluation_period == evaluation_period,
+    dept_user_ids = org_tree.subtree_user_ids(department_id)
+
+    # 2. Get the current grade of every evaluation for these users in the period
+    current_grades: Dict[int, tuple] = {
+        evaluatee_id: (evaluation_id, grade)
+        for evaluation_id, evaluatee_id, grade in db.execute(
+            select(models.FinalEvaluation.id, models.FinalEvaluation.evaluatee_id, models.FinalEvaluation.grade).where(
+                models.FinalEvaluation.evaluatee_id.in_(dept_user_ids),
+                models.FinalEvaluation.evaluation_period == evaluation_period,
+            )
+        )
+    }
+
+    # 3. Apply the proposed changes to the grade counts; users without an
+    #    evaluation in this department are ignored. A later adjustment for the
+    #    same user replaces an earlier one.
+    new_grades: Dict[int, str] = {}
+    for adj in adjustments:
+        if adj.user_id in current_grades:
+            new_grades[current_grades[adj.user_id][0]] = adj.grade
+    grade_counts = Counter(grade for _, grade in current_grades.values())
+    old_grades = {evaluation_id: grade for evaluation_id, grade in current_grades.values()}
+    for evaluation_id, new_grade in new_grades.items():
+        grade_counts[old_grades[evaluation_id]] -= 1
+        grade_counts[new_grade] += 1
+
+    if current_user_role == models.UserRole.DEPT_HEAD:
+        # 4. TO Validation for DEPT_HEAD
+        _validate_to(
+            db,
+            department_id=department_id,
+            evaluation_period=evaluation_period,
+            headcount=len(dept_user_ids),
+            grade_counts=grade_counts,
         )
+        # 5. B+/B- Validation for DEPT_HEAD
+        if grade_counts["B+"] != grade_counts["B-"]:
+            raise GradeAdjustmentError("The number of B+ and B- grades must be equal.")
+
+    if not new_grades:
+        return []
+
+    # 6. If validation passes, write every change in one statement
+    db.execute(
+        update(models.FinalEvaluation)
+        .where(models.FinalEvaluation.id.in_(new_grades))
+        .values(grade=case(new_grades, value=models.FinalEvaluation.id))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    # Return the evaluations that were actually updated
+    return (
+        db.query(models.FinalEvaluation)
+        .filter(models.FinalEvaluation.id.in_(new_grades))
+        .populate_existing()
+        .order_by(models.FinalEvaluation.id)
         .all()
     )
 
-    # 3. Create a map of proposed changes
-    adjustment_map: Dict[int, str] = {adj.user_id: adj.grade for adj in adjustments}
 
-    # 4. Apply proposed changes to a temporary copy of the evaluations
-    temp_grades: Dict[int, str | None] = {ev.evaluatee_id: ev.grade for ev in all_evals}
-    for user_id, new_grade in adjustment_map.items():
-        if user_id in temp_grades:
-            temp_grades[user_id] = new_grade
+def _graded_departments(db: Session, *, evaluation_period_id: int, department_ids: Optional[List[int]] = None) -> list:
+    """(id, name, department grade, S ratio, A ratio) of every department graded in the period."""
+    query = (
+        select(
+            models.Organization.id,
+            models.Organization.name,
+            models.DepartmentEvaluation.grade,
+            models.DepartmentGradeRatio.s_ratio,
+            models.DepartmentGradeRatio.a_ratio,
+        )
+        .join(models.DepartmentEvaluation, models.DepartmentEvaluation.department_id == models.Organization.id)
+        .outerjoin(
+            models.DepartmentGradeRatio,
+            models.DepartmentGradeRatio.department_grade == models.DepartmentEvaluation.grade,
+        )
+        .where(models.DepartmentEvaluation.evaluation_period_id == evaluation_period_id)
+        .order_by(models.Organization.id)
+    )
+    if department_ids is not None:
+        query = query.where(models.Organization.id.in_(department_ids))
+    return db.execute(query).all()
+
+
+def get_grade_quotas(
+    db: Session, *, evaluation_period_id: int, department_ids: Optional[List[int]] = None
+) -> List[GradeQuota]:
+    """
+    S/A TO and current grade usage of every department graded in the period
+    (optionally only `department_ids`). Headcounts come from the cached org
+    tree; grade usage for all departments is one GROUP BY over the closure
+    table.
+    """
+    period = crud.evaluation_period.get_snapshot(db, id=evaluation_period_id)
+    if not period:
+        raise GradeAdjustmentError(f"Evaluation period with id {evaluation_period_id} not found.")
 
-    # 5. TO Validation for DEPT_HEAD
-    if current_user_role == models.UserRole.DEPT_HEAD:
-        # Get the evaluation period object to find the period_id
-        period = crud.evaluation_period.get_by_name(db, name=evaluation_period)
-        if not period:
-            raise GradeAdjustmentError(f"Evaluation period '{evaluation_period}' not found.")
+    departments = _graded_departments(db, evaluation_period_id=evaluation_period_id, department_ids=department_ids)
+    if not departments:
+        return []
 
-        # Get the department's grade for the specific period from the DepartmentEvaluation table
-        dept_eval = db.query(models.DepartmentEvaluation).filter(
-            models.DepartmentEvaluation.department_id == department_id,
-            models.DepartmentEvaluation.evaluation_period_id == period.id
-        ).first()
-
-        if not dept_eval or not dept_eval.grade:
-            raise GradeTOExceededError("Department grade is not set for the selected period.")
-        
-        department_grade = dept_eval.grade
-        
-        ratio = crud.department_grade_ratio.get_by_grade(db, department_grade=department_grade)
-        if not ratio:
-            raise GradeTOExceededError(f"Grade ratio for department grade '{department_grade}' not found.")
-
-        num_employees = len(dept_user_ids)
-        s_to = math.floor(num_employees * (ratio.s_ratio / 100.0))
-        a_to = math.floor(num_employees * (ratio.a_ratio / 100.0))
-
-        s_count = sum(1 for grade in temp_grades.values() if grade == "S")
-        a_count = sum(1 for grade in temp_grades.values() if grade == "A")
-
-        if s_count > s_to:
-            raise GradeTOExceededError(f"Number of S grades ({s_count}) exceeds the limit ({s_to}).")
-        if a_count > a_to:
-            raise GradeTOExceededError(f"Number of A grades ({a_count}) exceeds the limit ({a_to}).")
-
-    # 6. B+/B- Validation for DEPT_HEAD
-    if current_user_role == models.UserRole.DEPT_HEAD:
-        b_plus_count = sum(1 for grade in temp_grades.values() if grade == "B+")
-        b_minus_count = sum(1 for grade in temp_grades.values() if grade == "B-")
-        if b_plus_count != b_minus_count:
-            raise GradeAdjustmentError("The number of B+ and B- grades must be equal.")
+    closure = models.OrganizationClosure
+    usage: Dict[int, Counter] = {department_id: Counter() for department_id, *_ in departments}
+    for department_id, grade, count in db.execute(
+        select(closure.ancestor_id, models.FinalEvaluation.grade, func.count(models.FinalEvaluation.id))
+        .join(models.User, models.User.organization_id == closure.descendant_id)
+        .join(models.FinalEvaluation, models.FinalEvaluation.evaluatee_id == models.User.id)
+        .where(
+            closure.ancestor_id.in_(list(usage)),
+            models.FinalEvaluation.evaluation_period == period.name,
+            models.FinalEvaluation.grade.is_not(None),
+        )
+        .group_by(closure.ancestor_id, models.FinalEvaluation.grade)
+    ):
+        usage[department_id][grade] = count
+
+    org_tree = crud.organization.get_org_tree(db)
+    quotas = []
+    for department_id, name, department_grade, s_ratio, a_ratio in departments:
+        headcount = len(org_tree.subtree_user_ids(department_id))
+        counts = usage[department_id]
+        quotas.append(GradeQuota(
+            department_id=department_id,
+            department_name=name,
+            department_grade=department_grade,
+            headcount=headcount,
+            s_to=_grade_to(headcount, s_ratio),
+            a_to=_grade_to(headcount, a_ratio),
+            s_count=counts["S"],
+            a_count=counts["A"],
+            b_plus_count=counts["B+"],
+            b_minus_count=counts["B-"],
+        ))
+    return quotas
+
+
+@dataclass
+class GradeAssignmentResult:
+    evaluation_period_id: int
+    dry_run: bool
+    assigned_count: int
+    departments: List[GradeQuota]
+    skipped_department_ids: List[int]
+
+
+def assign_grades_for_period(
+    db: Session, *, evaluation_period_id: int, b_split_ratio: float = 0.0, dry_run: bool = False
+) -> GradeAssignmentResult:
+    """
+    Generates starting grades for every department graded in the period
+    from the members' final scores (FR-A-4.3):
+
+    - a department head gets the department's own grade,
+    - the other members are ranked by final score and get S and A up to the
+      department's TO (the head's grade counts against it, as in
+      `adjust_grades_for_department`), the rest B, or an equal number of
+      B+/B- when `b_split_ratio` is set.
+
+    A user in nested graded departments is graded with the innermost one.
+    A department's TO covers its whole subtree, so grades given in its
+    nested graded departments count against it: the innermost departments
+    are ranked first, then each enclosing level. Departments without a grade
+    ratio are skipped. Ranking is one vectorized sort per nesting level and
+    all grades are written in one executemany UPDATE and a single commit
+    (nothing is written on `dry_run`).
+    """
+    period = crud.evaluation_period.get_snapshot(db, id=evaluation_period_id)
+    if not period:
+        raise GradeAdjustmentError(f"Evaluation period with id {evaluation_period_id} not found.")
 
-    # 7. If validation passes, update the database
-    updated_evaluations = []
-    for user_id, new_grade in adjustment_map.items():
-        evaluation_to_update = next((ev for ev in all_evals if ev.evaluatee_id == user_id), None)
-        if evaluation_to_update:
-            updated_eval = crud.final_evaluation.update(
-                db, db_obj=evaluation_to_update, obj_in={"grade": new_grade}
+    departments = _graded_departments(db, evaluation_period_id=evaluation_period_id)
+    org_tree = crud.organization.get_org_tree(db)
+    skipped = [department_id for department_id, _, _, s_ratio, a_ratio in departments if s_ratio is None or a_ratio is None]
+    departments = [row for row in departments if row[0] not in skipped and row[0] in org_tree]
+    headcounts = [len(org_tree.subtree_user_ids(department_id)) for department_id, *_ in departments]
+    subtree_org_ids = [set(org_tree.subtree_org_ids(department_id)) for department_id, *_ in departments]
+    # Graded departments inside each department, and how deeply each one is nested.
+    nested = [
+        [other for other, row in enumerate(departments) if other != index and row[0] in subtree_org_ids[index]]
+        for index in range(len(departments))
+    ]
+    depths = np.zeros(len(departments), dtype=np.int64)
+    for inner in nested:
+        depths[inner] += 1
+
+    # Innermost graded department of every user: larger subtrees are claimed first.
+    user_department: Dict[int, int] = {}
+    for index in sorted(range(len(departments)), key=lambda i: -len(org_tree.subtree_org_ids(departments[i][0]))):
+        for user_id in org_tree.subtree_user_ids(departments[index][0]):
+            user_department[user_id] = index
+
+    dept_head_grades: Dict[int, str] = {}
+    if departments:
+        department_index = {row[0]: index for index, row in enumerate(departments)}
+        for user_id, org_id in db.execute(
+            select(models.User.id, models.User.organization_id).where(
+                models.User.role == models.UserRole.DEPT_HEAD,
+                models.User.organization_id.in_(list(department_index)),
             )
-            updated_evaluations.append(updated_eval)
+        ):
+            if user_department.get(user_id) == department_index[org_id]:
+                dept_head_grades[user_id] = departments[department_index[org_id]][2]
 
-    # Return the evaluations that were actually updated
-    return updated_evaluations
+    evaluation_ids, dept_rows, scores, evaluatee_ids = [], [], [], []
+    head_evaluations: Dict[int, str] = {}
+    head_grade_counts = [Counter() for _ in departments]
+    for evaluation_id, evaluatee_id, final_score in db.execute(
+        select(models.FinalEvaluation.id, models.FinalEvaluation.evaluatee_id, models.FinalEvaluation.final_score).where(
+            models.FinalEvaluation.evaluation_period == period.name
+        )
+    ):
+        index = user_department.get(evaluatee_id)
+        if index is None:
+            continue
+        if evaluatee_id in dept_head_grades:
+            head_evaluations[evaluation_id] = dept_head_grades[evaluatee_id]
+            head_grade_counts[index][dept_head_grades[evaluatee_id]] += 1
+            continue
+        evaluation_ids.append(evaluation_id)
+        dept_rows.append(index)
+        scores.append(final_score)
+        evaluatee_ids.append(evaluatee_id)
+
+    dept_index = np.array(dept_rows, dtype=np.int64)
+    score_values = np.array(scores, dtype=np.float64)
+    tie_keys = np.array(evaluatee_ids, dtype=np.int64)
+    codes = np.full(len(dept_index), B, dtype=np.int8)
+    s_caps = np.zeros(len(departments), dtype=np.int64)
+    a_caps = np.zeros(len(departments), dtype=np.int64)
+    # Grades given to each department's own members (head included).
+    counts = head_grade_counts
+    for depth in sorted(set(depths.tolist()), reverse=True):
+        for index in np.flatnonzero(depths == depth).tolist():
+            used = sum((counts[inner] for inner in nested[index]), Counter(counts[index]))
+            row, headcount = departments[index], headcounts[index]
+            s_caps[index] = max(_grade_to(headcount, row[3]) - used["S"], 0)
+            a_caps[index] = max(_grade_to(headcount, row[4]) - used["A"], 0)
+        level_rows = np.flatnonzero(depths[dept_index] == depth)
+        level_codes = assign_grade_codes(
+            dept_index[level_rows], score_values[level_rows], tie_keys[level_rows], s_caps, a_caps, b_split_ratio
+        )
+        codes[level_rows] = level_codes
+        for index, code_counts in enumerate(
+            np.bincount(
+                dept_index[level_rows] * len(GRADE_LABELS) + level_codes,
+                minlength=len(departments) * len(GRADE_LABELS),
+            ).reshape(len(departments), len(GRADE_LABELS))
+        ):
+            for label, count in zip(GRADE_LABELS, code_counts):
+                counts[index][label] += int(count)
+    grades = GRADE_LABELS[codes]
+    # Reported like get_grade_quotas: usage over the whole subtree.
+    subtree_counts = [
+        sum((counts[inner] for inner in nested[index]), Counter(counts[index])) for index in range(len(departments))
+    ]
+
+    if not dry_run:
+        rows = [{"id": evaluation_id, "grade": grade} for evaluation_id, grade in head_evaluations.items()]
+        rows.extend({"id": evaluation_id, "grade": grade} for evaluation_id, grade in zip(evaluation_ids, grades.tolist()))
+        if rows:
+            db.execute(update(models.FinalEvaluation), rows)
+            db.commit()
+
+    return GradeAssignmentResult(
+        evaluation_period_id=evaluation_period_id,
+        dry_run=dry_run,
+        assigned_count=len(evaluation_ids) + len(head_evaluations),
+        departments=[
+            GradeQuota(
+                department_id=department_id,
+                department_name=name,
+                department_grade=department_grade,
+                headcount=headcount,
+                s_to=_grade_to(headcount, s_ratio),
+                a_to=_grade_to(headcount, a_ratio),
+                s_count=subtree_counts[index]["S"],
+                a_count=subtree_counts[index]["A"],
+                b_plus_count=subtree_counts[index]["B+"],
+                b_minus_count=subtree_counts[index]["B-"],
+            )
+            for index, ((department_id, name, department_grade, s_ratio, a_ratio), headcount) in enumerate(
+                zip(departments, headcounts)
+            )
+        ],
+        skipped_department_ids=skipped,
+    )
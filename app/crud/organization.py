@@ -1,20 +1,27 @@
 import json
 import csv
 import io
-from typing import List, Dict, Any
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, FrozenSet, Iterator, Optional, Tuple
 
 from fastapi import UploadFile
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import delete, event, exists, func, insert, inspect, literal, select, true, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query, Session, joinedload, object_session
 
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.crud.base import CRUDBase
-from app.models.organization import Organization
+from app.crud.pagination import count_rows
+from app.models.organization import Organization, OrganizationClosure
 from app.schemas.organization import OrganizationCreate, OrganizationUpdate
-from app.crud import user as crud_user
-from app.core.security import get_password_hash
+from app.core.security import UNUSABLE_PASSWORD, generate_activation_token, hash_provisioned_passwords
 from app.models.user import User, UserRole
 from app.models.evaluation import FinalEvaluation
-from app.schemas.user import UserCreate, UserUpdate
 from app.crud import evaluation_period as crud_evaluation_period
+from app.services.org_tree import OrgTree
 
 
 class CRUDOrganization(CRUDBase[Organization, OrganizationCreate, OrganizationUpdate]):
@@ -24,16 +31,330 @@ class CRUDOrganization(CRUDBase[Organization, OrganizationCreate, OrganizationUp
 organization = CRUDOrganization(Organization)
 
 
+_closure = OrganizationClosure.__table__
+
+
+def _subtree_ids(org_id: int):
+    return select(_closure.c.descendant_id).where(_closure.c.ancestor_id == org_id)
+
+
+def _detach_subtree(connection, org_id: int) -> None:
+    """Removes the links between `org_id`'s subtree and everything above it."""
+    subtree = _subtree_ids(org_id)
+    connection.execute(
+        delete(_closure).where(_closure.c.descendant_id.in_(subtree), _closure.c.ancestor_id.not_in(subtree))
+    )
+
+
+def _attach_subtree(connection, org_id: int, parent_id: int) -> None:
+    """Links every ancestor of `parent_id` (itself included) to every node of `org_id`'s subtree."""
+    supertree = _closure.alias("supertree")
+    subtree = _closure.alias("subtree")
+    connection.execute(
+        insert(_closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(supertree.c.ancestor_id, subtree.c.descendant_id, supertree.c.depth + subtree.c.depth + 1)
+            .select_from(supertree.join(subtree, true()))
+            .where(supertree.c.descendant_id == parent_id, subtree.c.ancestor_id == org_id),
+        )
+    )
+
+
+# The whole hierarchy is cached as one OrgTree. Every organization write and
+# every user insert/delete/move/role change bumps the cache generation, and the tree is
+# rebuilt on the next lookup. The TTL bounds staleness from other processes.
+_org_tree_cache: TTLCache[OrgTree] = TTLCache(ttl_seconds=settings.ORG_TREE_CACHE_TTL_SECONDS, maxsize=1)
+_ORG_TREE_KEY = "org_tree"
+# Subordinate id sets per (manager id, include_self), derived from the tree
+# and dropped together with it.
+_subordinate_cache: TTLCache[FrozenSet[int]] = TTLCache(
+    ttl_seconds=settings.ORG_TREE_CACHE_TTL_SECONDS, maxsize=settings.SUBORDINATE_CACHE_SIZE
+)
+# Set on a session/connection that has written hierarchy changes it has not committed yet.
+_HIERARCHY_CHANGED = "organization_hierarchy_changed"
+
+
+def invalidate_org_tree() -> None:
+    _org_tree_cache.invalidate()
+    _subordinate_cache.invalidate()
+
+
+def _load_org_tree(db: Session) -> OrgTree:
+    return OrgTree(
+        db.query(Organization.id, Organization.parent_id).all(),
+        db.query(User.id, User.organization_id).all(),
+    )
+
+
+def get_org_tree(db: Session) -> OrgTree:
+    """Returns the cached organization tree, rebuilding it if the hierarchy changed."""
+    # A session with its own uncommitted hierarchy writes must not see (or
+    # publish) the shared tree.
+    if db.info.get(_HIERARCHY_CHANGED):
+        return _load_org_tree(db)
+    return _org_tree_cache.get_or_load(_ORG_TREE_KEY, lambda: _load_org_tree(db))
+
+
+def _load_subordinate_ids(db: Session, user_id: int, include_self: bool) -> FrozenSet[int]:
+    tree = get_org_tree(db)
+    org_id = tree.org_of(user_id)
+    user_ids = set(tree.subtree_user_ids(org_id)) if org_id is not None else set()
+    if include_self:
+        user_ids.add(user_id)
+    else:
+        user_ids.discard(user_id)
+    return frozenset(user_ids)
+
+
+def get_subordinate_ids(db: Session, user_id: int, *, include_self: bool = False) -> FrozenSet[int]:
+    """
+    Ids of the users in `user_id`'s organization and every organization below
+    it, served from a per-manager cache.
+    """
+    if db.info.get(_HIERARCHY_CHANGED):
+        return _load_subordinate_ids(db, user_id, include_self)
+    return _subordinate_cache.get_or_load(
+        (user_id, include_self), lambda: _load_subordinate_ids(db, user_id, include_self)
+    )
+
+
+def _mark_session_hierarchy_changed(db: Session) -> None:
+    invalidate_org_tree()
+    db.info[_HIERARCHY_CHANGED] = True
+
+
+def _mark_hierarchy_changed(connection, target) -> None:
+    invalidate_org_tree()
+    connection.info[_HIERARCHY_CHANGED] = True
+    session = object_session(target)
+    if session is not None:
+        session.info[_HIERARCHY_CHANGED] = True
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_delete")
+def _on_user_membership_written(mapper, connection, target) -> None:
+    _mark_hierarchy_changed(connection, target)
+
+
+@event.listens_for(User, "after_update")
+def _on_user_updated(mapper, connection, target) -> None:
+    attrs = inspect(target).attrs
+    # Role changes do not move anyone in the tree, but they change who may
+    # act on the cached subordinate sets.
+    if attrs.organization_id.history.has_changes() or attrs.role.history.has_changes():
+        _mark_hierarchy_changed(connection, target)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _on_session_transaction_end(session: Session) -> None:
+    if session.info.pop(_HIERARCHY_CHANGED, False):
+        invalidate_org_tree()
+
+
+@event.listens_for(Engine, "commit")
+@event.listens_for(Engine, "rollback")
+def _on_connection_transaction_end(connection) -> None:
+    if connection.info.pop(_HIERARCHY_CHANGED, False):
+        invalidate_org_tree()
+
+
+@event.listens_for(Organization, "after_insert")
+def _on_organization_inserted(mapper, connection, target) -> None:
+    _mark_hierarchy_changed(connection, target)
+    connection.execute(insert(_closure).values(ancestor_id=target.id, descendant_id=target.id, depth=0))
+    if target.parent_id is not None:
+        connection.execute(
+            insert(_closure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(_closure.c.ancestor_id, literal(target.id), _closure.c.depth + 1).where(
+                    _closure.c.descendant_id == target.parent_id
+                ),
+            )
+        )
+
+
+@event.listens_for(Organization, "after_update")
+def _on_organization_updated(mapper, connection, target) -> None:
+    if not inspect(target).attrs.parent_id.history.has_changes():
+        return
+    _mark_hierarchy_changed(connection, target)
+    _detach_subtree(connection, target.id)
+    if target.parent_id is not None:
+        _attach_subtree(connection, target.id, target.parent_id)
+
+
+@event.listens_for(Organization, "before_delete")
+def _on_organization_deleted(mapper, connection, target) -> None:
+    _mark_hierarchy_changed(connection, target)
+    # Organizations left under the deleted one are cut off from its ancestors,
+    # the same as following their now dangling parent_id.
+    _detach_subtree(connection, target.id)
+    connection.execute(delete(_closure).where(_closure.c.ancestor_id == target.id))
+
+
+def rebuild_organization_closure(db: Session) -> None:
+    """
+    Recomputes the whole closure table from `Organization.parent_id`, for
+    rows written outside the ORM. Does not commit.
+    """
+    tree = select(
+        Organization.id.label("ancestor_id"), Organization.id.label("descendant_id"), literal(0).label("depth")
+    ).cte(name="tree", recursive=True)
+    tree = tree.union_all(
+        select(tree.c.ancestor_id, Organization.id, tree.c.depth + 1).where(Organization.parent_id == tree.c.descendant_id)
+    )
+    db.execute(delete(_closure))
+    db.execute(
+        insert(_closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"], select(tree.c.ancestor_id, tree.c.descendant_id, tree.c.depth)
+        )
+    )
+
+
 def get_organizations(db: Session) -> List[Organization]:
     return db.query(Organization).all()
 
+def organizations_query(
+    db: Session, *, root_id: Optional[int] = None, level: Optional[int] = None, name_prefix: Optional[str] = None
+) -> Query:
+    """Organizations in the subtree of `root_id`, at `level`, named with `name_prefix`."""
+    query = db.query(Organization)
+    if root_id is not None:
+        query = query.filter(Organization.id.in_(get_descendant_org_ids(db, root_id)))
+    if level is not None:
+        query = query.filter(Organization.level == level)
+    if name_prefix:
+        query = query.filter(Organization.name.startswith(name_prefix, autoescape=True))
+    return query
+
+def count_organizations(
+    db: Session, *, root_id: Optional[int] = None, level: Optional[int] = None, name_prefix: Optional[str] = None
+) -> int:
+    """Total for `organizations_query`; without level/name filters the cached org tree answers it."""
+    if level is None and not name_prefix:
+        tree = get_org_tree(db)
+        return len(tree) if root_id is None else len(tree.subtree_org_ids(root_id))
+    query = organizations_query(db, root_id=root_id, level=level, name_prefix=name_prefix)
+    return count_rows(query, Organization.id)
+
+def get_organization(db: Session, org_id: int) -> Organization | None:
+    return db.query(Organization).filter(Organization.id == org_id).first()
+
+def get_organization_tree(
+    db: Session, *, root_id: Optional[int] = None, max_depth: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Nested organization chart with member counts, as plain dicts matching
+    `OrganizationTreeNode`.
+
+    Returns the top-level organizations, or only `root_id`, with their
+    subtrees down to `max_depth` levels below them (unlimited if None). One
+    statement reads every node together with its depth, child count and
+    member counts (GROUP BY over users and the closure table); the rows come
+    ordered by depth, so each parent is placed before its children and the
+    tree is assembled in a single pass.
+    """
+    members = (
+        select(User.organization_id.label("org_id"), func.count(User.id).label("count"))
+        .group_by(User.organization_id)
+        .subquery()
+    )
+    subtree_members = (
+        select(_closure.c.ancestor_id.label("org_id"), func.count(User.id).label("count"))
+        .join(User, User.organization_id == _closure.c.descendant_id)
+        .group_by(_closure.c.ancestor_id)
+        .subquery()
+    )
+    children = (
+        select(Organization.parent_id.label("org_id"), func.count(Organization.id).label("count"))
+        .where(Organization.parent_id.is_not(None))
+        .group_by(Organization.parent_id)
+        .subquery()
+    )
+    if root_id is not None:
+        depths = (
+            select(_closure.c.descendant_id.label("org_id"), _closure.c.depth.label("depth"))
+            .where(_closure.c.ancestor_id == root_id)
+            .subquery()
+        )
+    else:
+        depths = (
+            select(_closure.c.descendant_id.label("org_id"), func.max(_closure.c.depth).label("depth"))
+            .group_by(_closure.c.descendant_id)
+            .subquery()
+        )
+
+    query = (
+        select(
+            Organization.id,
+            Organization.name,
+            Organization.level,
+            Organization.parent_id,
+            depths.c.depth,
+            func.coalesce(members.c.count, 0),
+            func.coalesce(subtree_members.c.count, 0),
+            func.coalesce(children.c.count, 0),
+        )
+        .join(depths, depths.c.org_id == Organization.id)
+        .outerjoin(members, members.c.org_id == Organization.id)
+        .outerjoin(subtree_members, subtree_members.c.org_id == Organization.id)
+        .outerjoin(children, children.c.org_id == Organization.id)
+        .order_by(depths.c.depth, Organization.name, Organization.id)
+    )
+    if max_depth is not None:
+        query = query.where(depths.c.depth <= max_depth)
+
+    roots: List[Dict[str, Any]] = []
+    nodes: Dict[int, Dict[str, Any]] = {}
+    for org_id, name, level, parent_id, _depth, member_count, subtree_count, child_count in db.execute(query):
+        node = {
+            "id": org_id,
+            "name": name,
+            "level": level,
+            "parent_id": parent_id,
+            "member_count": member_count,
+            "subtree_member_count": subtree_count,
+            "child_count": child_count,
+            "children": [],
+        }
+        nodes[org_id] = node
+        parent = nodes.get(parent_id) if org_id != root_id else None
+        if parent is not None:
+            parent["children"].append(node)
+        else:
+            roots.append(node)
+    return roots
+
 def get_all_descendant_orgs(db: Session, org_id: int) -> List[Organization]:
-    descendants = []
-    children = db.query(Organization).options(joinedload(Organization.members)).filter(Organization.parent_id == org_id).all()
-    for child in children:
-        descendants.append(child)
-        descendants.extend(get_all_descendant_orgs(db, child.id))
-    return descendants
+    """Returns every organization below `org_id`, nearest first, with members loaded."""
+    return (
+        db.query(Organization)
+        .join(OrganizationClosure, OrganizationClosure.descendant_id == Organization.id)
+        .options(joinedload(Organization.members))
+        .filter(OrganizationClosure.ancestor_id == org_id, OrganizationClosure.depth > 0)
+        .order_by(OrganizationClosure.depth, Organization.id)
+        .all()
+    )
+
+def get_descendant_org_ids(db: Session, org_id: int, *, include_self: bool = True) -> List[int]:
+    org_ids = get_org_tree(db).subtree_org_ids(org_id)
+    return org_ids if include_self else org_ids[1:]
+
+def get_ancestor_orgs(db: Session, org_id: int) -> List[Organization]:
+    """Returns every organization above `org_id`, nearest first."""
+    return (
+        db.query(Organization)
+        .join(OrganizationClosure, OrganizationClosure.ancestor_id == Organization.id)
+        .filter(OrganizationClosure.descendant_id == org_id, OrganizationClosure.depth > 0)
+        .order_by(OrganizationClosure.depth)
+        .all()
+    )
+
+def is_descendant_org(db: Session, *, ancestor_id: int, descendant_id: int) -> bool:
+    """True if `descendant_id` is `ancestor_id` or lies anywhere below it."""
+    return get_org_tree(db).is_descendant(ancestor_id, descendant_id)
 
 def create_organization(db: Session, org: OrganizationCreate) -> Organization:
     db_org = Organization(
@@ -49,6 +370,9 @@ def create_organization(db: Session, org: OrganizationCreate) -> Organization:
 
 def update_organization(db: Session, db_org: Organization, org_in: "OrganizationUpdate") -> Organization:
     update_data = org_in.model_dump(exclude_unset=True)
+    new_parent_id = update_data.get("parent_id")
+    if new_parent_id is not None and is_descendant_org(db, ancestor_id=db_org.id, descendant_id=new_parent_id):
+        raise ValueError("An organization cannot be moved under itself or one of its descendants.")
     for field, value in update_data.items():
         setattr(db_org, field, value)
     db.add(db_org)
@@ -108,164 +432,389 @@ def delete_organization(db: Session, org_id: int) -> Organization:
         db.commit()
     return db_org
 
-def sync_organizations_from_file(db: Session, file: UploadFile) -> Dict[str, Any]:
-    content = file.file.read()
-    file_content = content.decode("utf-8")
-
-    if file.filename.endswith(".json"):
+# Rows applied per flush by the organization file import.
+ORG_IMPORT_BATCH_SIZE = 500
+# Per-row errors listed in the import result; the rest are only counted.
+ORG_IMPORT_MAX_REPORTED_ERRORS = 1000
+
+
+@dataclass
+class _OrgRow:
+    row: int
+    name: str
+    level: Optional[int]
+    parent_name: Optional[str]
+
+
+def _iter_org_file_records(file: UploadFile) -> Iterator[Tuple[int, Any]]:
+    """
+    Yields (row number, record) pairs, reading CSV and NDJSON uploads line by
+    line. A record is a dict, or the ValueError a malformed line raised.
+    """
+    filename = file.filename or ""
+    if filename.endswith(".csv"):
+        text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        reader = csv.DictReader(text)
+        # Row numbers count the header line, as spreadsheets show them.
+        for row_number, record in enumerate(reader, start=2):
+            yield row_number, record
+    elif filename.endswith((".ndjson", ".jsonl")):
+        text = io.TextIOWrapper(file.file, encoding="utf-8-sig")
+        for row_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield row_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row_number, ValueError(f"Invalid JSON: {e.msg}")
+    elif filename.endswith(".json"):
+        # A JSON array cannot be read incrementally; use NDJSON for large files.
         try:
-            data = json.loads(file_content)
-        except json.JSONDecodeError:
+            data = json.load(file.file)
+        except (json.JSONDecodeError, UnicodeDecodeError):
             raise ValueError("Invalid JSON format")
-    elif file.filename.endswith(".csv"):
-        raise NotImplementedError("CSV processing is not yet implemented.")
+        if not isinstance(data, list):
+            raise ValueError("File content should be a list of organization objects")
+        yield from enumerate(data, start=1)
     else:
         raise ValueError("Unsupported file type")
 
-    if not isinstance(data, list):
-        raise ValueError("File content should be a list of organization objects")
 
-    existing_orgs_by_name = {org.name: org for org in get_organizations(db)}
-    incoming_orgs_by_name = {org_data["name"]: org_data for org_data in data if "name" in org_data}
+def _parse_org_row(row_number: int, record: Any) -> _OrgRow:
+    if isinstance(record, ValueError):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Row must be an object")
+    name = (record.get("name") or "").strip()
+    if not name:
+        raise ValueError("'name' is required")
+    level = record.get("level")
+    if level in (None, ""):
+        level = None
+    else:
+        try:
+            level = int(level)
+        except (TypeError, ValueError):
+            raise ValueError(f"'level' must be an integer, got {level!r}")
+    parent_name = (record.get("parent_name") or "").strip() or None
+    if parent_name == name:
+        raise ValueError("An organization cannot be its own parent")
+    return _OrgRow(row=row_number, name=name, level=level, parent_name=parent_name)
 
-    created_count = 0
-    updated_count = 0
 
-    # 1st Pass: Create/Update organizations
-    for name, org_data in incoming_orgs_by_name.items():
-        if name in existing_orgs_by_name:
-            org_model = existing_orgs_by_name[name]
-            org_model.level = org_data.get("level", org_model.level)
-            db.add(org_model)
-            updated_count += 1
-        else:
-            new_org = Organization(name=name, level=org_data.get("level"), parent_id=None)
-            db.add(new_org)
-            created_count += 1
-    db.commit()
+def _closure_contains(db: Session, *, ancestor_id: int, descendant_id: int) -> bool:
+    # Reads the closure table directly: during an import the session holds
+    # uncommitted hierarchy changes, so the cached tree would be rebuilt per call.
+    return db.query(
+        exists().where(
+            OrganizationClosure.ancestor_id == ancestor_id,
+            OrganizationClosure.descendant_id == descendant_id,
+        )
+    ).scalar()
 
-    # 2nd Pass: Set parent-child relationships
-    all_orgs_by_name = {org.name: org for org in get_organizations(db)}
-    for name, org_data in incoming_orgs_by_name.items():
-        parent_name = org_data.get("parent_name")
-        if parent_name and parent_name in all_orgs_by_name:
-            org_model = all_orgs_by_name[name]
-            parent_model = all_orgs_by_name[parent_name]
-            org_model.parent_id = parent_model.id
-            db.add(org_model)
-
-    # 3rd Pass: Delete old organizations
-    deleted_count = 0
-    for name, org_model in existing_orgs_by_name.items():
-        if name not in incoming_orgs_by_name:
-            db.delete(org_model)
-            deleted_count += 1
 
-    db.commit()
+def _orgs_by_name(db: Session, names) -> Dict[str, Organization]:
+    orgs: Dict[str, Organization] = {}
+    for org in db.query(Organization).filter(Organization.name.in_(list(names))).order_by(Organization.id.desc()):
+        orgs[org.name] = org  # the oldest organization wins a shared name
+    return orgs
 
-    return {
-        "status": "success",
-        "created": created_count,
-        "updated": updated_count,
-        "deleted": deleted_count
-    }
 
-def sync_organizations_and_users_from_json(db: Session, file: UploadFile) -> Dict[str, Any]:
-    content = file.file.read()
-    try:
-        chart_data = json.loads(content)
-    except json.JSONDecodeError:
-        raise ValueError("Invalid JSON format")
+def sync_organizations_from_file(db: Session, file: UploadFile) -> Dict[str, Any]:
+    """
+    Syncs organizations from a JSON, CSV or NDJSON upload of
+    {name, level, parent_name} rows. Rows are validated as they are read and
+    applied in batches; an invalid row is reported and skipped without
+    aborting the file. Parents are linked once every row has been read, then
+    organizations missing from the file are deleted.
+    """
+    result: Dict[str, Any] = {"status": "success", "created": 0, "updated": 0, "deleted": 0, "error_count": 0, "errors": []}
+    seen_names: set = set()
+    parent_links: Dict[str, Tuple[int, Optional[str]]] = {}
+
+    def report(row_number: int, error: str, name: Optional[str] = None) -> None:
+        result["error_count"] += 1
+        if len(result["errors"]) < ORG_IMPORT_MAX_REPORTED_ERRORS:
+            result["errors"].append({"row": row_number, "name": name, "error": error})
+
+    def apply_batch(batch: List[_OrgRow]) -> None:
+        existing = _orgs_by_name(db, {row.name for row in batch})
+        for row in batch:
+            org_model = existing.get(row.name)
+            if org_model:
+                if row.level is not None:
+                    org_model.level = row.level
+                result["updated"] += 1
+            elif row.level is None:
+                report(row.row, "'level' is required for a new organization", row.name)
+                continue
+            else:
+                existing[row.name] = Organization(name=row.name, level=row.level, parent_id=None)
+                db.add(existing[row.name])
+                result["created"] += 1
+            parent_links[row.name] = (row.row, row.parent_name)
+        db.flush()
 
-    stats = {"orgs_created": 0, "orgs_updated": 0, "users_created": 0, "users_updated": 0}
+    try:
+        batch: List[_OrgRow] = []
+        for row_number, record in _iter_org_file_records(file):
+            name = record.get("name") if isinstance(record, dict) else None
+            try:
+                row = _parse_org_row(row_number, record)
+            except ValueError as e:
+                report(row_number, str(e), name)
+                # A named row is still in the file, so its organization is kept.
+                if isinstance(name, str) and name.strip():
+                    seen_names.add(name.strip())
+                continue
+            if row.name in seen_names:
+                report(row_number, "Duplicate organization name in file", row.name)
+                continue
+            seen_names.add(row.name)
+            batch.append(row)
+            if len(batch) >= ORG_IMPORT_BATCH_SIZE:
+                apply_batch(batch)
+                batch = []
+        apply_batch(batch)
+
+        # Link parents; a parent may appear anywhere in the file.
+        names = list(parent_links)
+        for start in range(0, len(names), ORG_IMPORT_BATCH_SIZE):
+            chunk = names[start:start + ORG_IMPORT_BATCH_SIZE]
+            parent_names = {parent_links[name][1] for name in chunk if parent_links[name][1]}
+            orgs = _orgs_by_name(db, set(chunk) | parent_names)
+            for name in chunk:
+                row_number, parent_name = parent_links[name]
+                parent_id = None
+                if parent_name:
+                    if parent_name not in orgs or parent_name not in seen_names:
+                        report(row_number, f"Parent organization '{parent_name}' not found in file", name)
+                        continue
+                    parent_id = orgs[parent_name].id
+                    if _closure_contains(db, ancestor_id=orgs[name].id, descendant_id=parent_id):
+                        report(row_number, f"'{parent_name}' is below '{name}' in the hierarchy", name)
+                        continue
+                if orgs[name].parent_id != parent_id:
+                    orgs[name].parent_id = parent_id
+                    # Flushed one by one so the cycle check sees earlier moves.
+                    db.flush()
+
+        # Delete organizations that are no longer in the file.
+        stale_ids = [
+            org_id for org_id, name in db.query(Organization.id, Organization.name).yield_per(ORG_IMPORT_BATCH_SIZE)
+            if name not in seen_names
+        ]
+        for start in range(0, len(stale_ids), ORG_IMPORT_BATCH_SIZE):
+            for org_model in db.query(Organization).filter(Organization.id.in_(stale_ids[start:start + ORG_IMPORT_BATCH_SIZE])):
+                db.delete(org_model)
+                result["deleted"] += 1
+            db.flush()
 
-    def _get_leader_role(org_data: Dict) -> UserRole:
-        # Level 3 (Team): No sub-organizations
-        if not org_data.get("sub_organizations"):
-            return UserRole.TEAM_LEAD
-        
-        # Level 2 (Department): All sub-organizations are teams
-        is_dept_head = True
-        for sub_org in org_data["sub_organizations"]:
-            if sub_org.get("sub_organizations"):
-                is_dept_head = False
-                break
-        if is_dept_head:
-            return UserRole.DEPT_HEAD
-
-        # Level 1 (Center/HQ): Anything above a department
-        return UserRole.CENTER_HEAD
-
-    def _process_user(user_data: Dict, org_id: int, role: UserRole):
-        if not user_data:
-            return
-
-        email = user_data.get("email")
-        if not email:
-            email = "null@suresofttech.com"
-
-        user = crud_user.user.get_by_email(db, email=email)
-        
-        full_name = user_data.get("name")
-        title = user_data.get("title")
-
-        if user:
-            # Update existing user
-            user_update_data = UserUpdate(
-                full_name=full_name,
-                title=title,
-                organization_id=org_id,
-                role=role
-            )
-            crud_user.user.update(db, db_obj=user, obj_in=user_update_data)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return result
+
+
+# Email used for chart entries that have none.
+_CHART_PLACEHOLDER_EMAIL = "null@suresofttech.com"
+# Keeps the prefetch IN lists well below SQLite's bound-parameter limit.
+_CHART_PREFETCH_BATCH_SIZE = 500
+
+
+@dataclass
+class _ChartOrg:
+    name: str
+    parent: Optional["_ChartOrg"]
+    depth: int
+    leader_role: UserRole
+    # (person data, role) in chart order
+    people: List[Tuple[Dict, UserRole]]
+    model: Optional[Organization] = None
+
+
+def _get_leader_role(org_data: Dict) -> UserRole:
+    # Level 3 (Team): No sub-organizations
+    if not org_data.get("sub_organizations"):
+        return UserRole.TEAM_LEAD
+
+    # Level 2 (Department): All sub-organizations are teams
+    is_dept_head = True
+    for sub_org in org_data["sub_organizations"]:
+        if sub_org.get("sub_organizations"):
+            is_dept_head = False
+            break
+    if is_dept_head:
+        return UserRole.DEPT_HEAD
+
+    # Level 1 (Center/HQ): Anything above a department
+    return UserRole.CENTER_HEAD
+
+
+def _parse_chart(chart_data: List[Dict]) -> List[_ChartOrg]:
+    """Flattens the chart into organizations in depth-first (parent before child) order."""
+    orgs: List[_ChartOrg] = []
+    stack: List[Tuple[Dict, Optional[_ChartOrg]]] = [(org_data, None) for org_data in reversed(chart_data)]
+    while stack:
+        org_data, parent = stack.pop()
+        leader_role = _get_leader_role(org_data)
+        people = []
+        if org_data.get("leader"):
+            people.append((org_data["leader"], leader_role))
+        people.extend((member, UserRole.EMPLOYEE) for member in org_data.get("members", []) if member)
+        org = _ChartOrg(
+            name=org_data["name"],
+            parent=parent,
+            depth=parent.depth + 1 if parent else 0,
+            leader_role=leader_role,
+            people=people,
+        )
+        orgs.append(org)
+        stack.extend((sub_org_data, org) for sub_org_data in reversed(org_data.get("sub_organizations", [])))
+    return orgs
+
+
+def _sync_chart_organizations(db: Session, orgs: List[_ChartOrg], stats: Dict[str, Any]) -> None:
+    """
+    Matches chart organizations to existing ones by (name, parent) and inserts
+    the missing ones, one flush per tree depth so children see their parent ids.
+    """
+    by_key: Dict[Tuple[str, Optional[int]], Organization] = {
+        (org.name, org.parent_id): org for org in db.query(Organization)
+    }
+    for depth in range(max((org.depth for org in orgs), default=-1) + 1):
+        new_orgs = []
+        for org in orgs:
+            if org.depth != depth:
+                continue
+            parent_model = org.parent.model if org.parent else None
+            key = (org.name, parent_model.id if parent_model else None)
+            if key in by_key:
+                org.model = by_key[key]
+                stats["orgs_updated"] += 1
+            else:
+                org.model = Organization(
+                    name=org.name,
+                    parent_id=key[1],
+                    level=parent_model.level + 1 if parent_model else 1,
+                )
+                by_key[key] = org.model
+                new_orgs.append(org.model)
+                stats["orgs_created"] += 1
+        db.add_all(new_orgs)
+        db.flush()
+
+
+def _sync_chart_users(db: Session, orgs: List[_ChartOrg], stats: Dict[str, Any]) -> None:
+    """
+    Diffs the chart's people against existing users by email and writes the
+    result with one bulk UPDATE and one bulk INSERT. A person listed more than
+    once ends up with their last listing. Users whose role or organization
+    changes get their token version bumped, so tokens carrying the old claims
+    stop being accepted. In "pending" provisioning mode new users get no
+    password; their activation tokens are returned in `stats["activations"]`.
+    """
+    people = [
+        (person.get("email") or _CHART_PLACEHOLDER_EMAIL, person, role, org.model.id)
+        for org in orgs
+        for person, role in org.people
+    ]
+    emails = list({email for email, _, _, _ in people})
+    existing: Dict[str, Any] = {}
+    for start in range(0, len(emails), _CHART_PREFETCH_BATCH_SIZE):
+        batch = emails[start:start + _CHART_PREFETCH_BATCH_SIZE]
+        existing.update(
+            (row.email, row)
+            for row in db.query(User.id, User.email, User.role, User.organization_id, User.token_version)
+            .filter(User.email.in_(batch))
+        )
+
+    updates: Dict[int, Dict[str, Any]] = {}
+    inserts: Dict[str, Dict[str, Any]] = {}
+    for email, person, role, org_id in people:
+        values = {
+            "full_name": person.get("name"),
+            "title": person.get("title"),
+            "organization_id": org_id,
+            "role": role,
+        }
+        if email in existing:
+            current = existing[email]
+            updates[current.id] = {"id": current.id, **values}
+            stats["users_updated"] += 1
+        elif email in inserts:
+            inserts[email].update(values)
             stats["users_updated"] += 1
         else:
-            # Create new user
-            username = email.split('@')[0]
-            password = username
-            user_create_data = UserCreate(
-                username=username,
-                email=email,
-                password=password,
-                full_name=full_name,
-                title=title,
-                organization_id=org_id,
-                role=role
-            )
-            crud_user.user.create(db, obj_in=user_create_data)
+            inserts[email] = {"username": email.split("@")[0], "email": email, **values}
             stats["users_created"] += 1
 
-    def _sync_recursive(org_data: Dict, parent_id: int = None):
-        org_name = org_data["name"]
-        
-        # Find existing organization by name and parent
-        existing_org = db.query(Organization).filter_by(name=org_name, parent_id=parent_id).first()
+    for email, current in existing.items():
+        row = updates[current.id]
+        claims_changed = row["role"] != current.role or row["organization_id"] != current.organization_id
+        row["token_version"] = (current.token_version or 0) + (1 if claims_changed else 0)
+
+    new_users = list(inserts.values())
+    if settings.PASSWORD_PROVISIONING_MODE == "pending":
+        expires_at = datetime.utcnow() + timedelta(hours=settings.ACTIVATION_TOKEN_EXPIRE_HOURS)
+        stats["activations"] = []
+        for row in new_users:
+            token, token_hash = generate_activation_token()
+            row.update(
+                hashed_password=UNUSABLE_PASSWORD, activation_token_hash=token_hash, activation_expires_at=expires_at
+            )
+            stats["activations"].append({"username": row["username"], "email": row["email"], "activation_token": token})
+    else:
+        # The initial password is the username.
+        hashes = hash_provisioned_passwords([row["username"] for row in new_users])
+        for row, hashed_password in zip(new_users, hashes):
+            row["hashed_password"] = hashed_password
 
-        if existing_org:
-            db_org = existing_org
-            stats["orgs_updated"] += 1
-        else:
-            # Simple level calculation based on depth, can be refined
-            level = parent_id and db.query(Organization).get(parent_id).level + 1 or 1
-            db_org = Organization(name=org_name, parent_id=parent_id, level=level)
-            db.add(db_org)
-            db.commit()
-            db.refresh(db_org)
-            stats["orgs_created"] += 1
+    if updates:
+        db.execute(update(User), list(updates.values()))
+    if new_users:
+        db.execute(insert(User), new_users)
+    if updates or inserts:
+        # Bulk statements skip the mapper events that track hierarchy changes.
+        _mark_session_hierarchy_changed(db)
 
-        # Process leader
-        leader_role = _get_leader_role(org_data)
-        _process_user(org_data.get("leader"), db_org.id, leader_role)
 
-        # Process members
-        for member_data in org_data.get("members", []):
-            _process_user(member_data, db_org.id, UserRole.EMPLOYEE)
+def sync_organizations_and_users_from_json(db: Session, file: UploadFile) -> Dict[str, Any]:
+    """
+    Syncs organizations and users from a nested org chart in one transaction:
+    parse, prefetch existing rows, diff, then bulk write. Nothing is committed
+    if any stage fails. Returns the counts plus per-stage timings in seconds.
+    """
+    started = time.perf_counter()
+    content = file.file.read()
+    try:
+        chart_data = json.loads(content)
+    except json.JSONDecodeError:
+        raise ValueError("Invalid JSON format")
 
-        # Recurse for sub-organizations
-        for sub_org_data in org_data.get("sub_organizations", []):
-            _sync_recursive(sub_org_data, parent_id=db_org.id)
+    stats: Dict[str, Any] = {"orgs_created": 0, "orgs_updated": 0, "users_created": 0, "users_updated": 0}
+    timing: Dict[str, float] = {}
 
-    for root_org_data in chart_data:
-        _sync_recursive(root_org_data)
+    def lap(stage: str, since: float) -> float:
+        now = time.perf_counter()
+        timing[stage] = round(now - since, 4)
+        return now
 
-    return stats
\ No newline at end of file
+    try:
+        orgs = _parse_chart(chart_data)
+        mark = lap("parse", started)
+        _sync_chart_organizations(db, orgs, stats)
+        mark = lap("organizations", mark)
+        _sync_chart_users(db, orgs, stats)
+        mark = lap("users", mark)
+        db.commit()
+        lap("commit", mark)
+    except Exception:
+        db.rollback()
+        raise
+
+    timing["total"] = round(time.perf_counter() - started, 4)
+    stats["timing"] = timing
+    return stats
@@ -0,0 +1,79 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+A page is read with `WHERE (sort key) > (last key of the previous page)`
+instead of OFFSET, so every page costs the same regardless of how deep the
+client has paged and rows inserted meanwhile never shift a page boundary.
+The cursor handed to clients is the last row's sort key, JSON encoded and
+base64url wrapped so it stays opaque.
+"""
+import base64
+import json
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Query
+from sqlalchemy.sql.elements import ColumnElement
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(values), separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Raises ValueError for a cursor that was not produced by `encode_cursor`."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor.")
+    return values
+
+
+def _after(columns: Sequence[ColumnElement], values: Sequence[Any]) -> ColumnElement:
+    if len(columns) == 1:
+        return columns[0] > values[0]
+    return tuple_(*columns) > tuple_(*values)
+
+
+def keyset_page(
+    query: Query,
+    columns: Sequence[ColumnElement],
+    *,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Tuple[list, Optional[str]]:
+    """
+    Returns one page of `query` ordered by `columns` (which must be unique
+    together) and the cursor of the next page, or None on the last page.
+    """
+    query = query.order_by(None).order_by(*columns)
+    if cursor is not None:
+        query = query.filter(_after(columns, decode_cursor(cursor, len(columns))))
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column in columns])
+
+
+def iter_keyset(query: Query, columns: Sequence[ColumnElement], *, page_size: int) -> Iterator[Any]:
+    """Yields every row of `query`, loading `page_size` rows per statement."""
+    query = query.order_by(None).order_by(*columns)
+    last: Optional[List[Any]] = None
+    while True:
+        page = (query.filter(_after(columns, last)) if last is not None else query).limit(page_size).all()
+        yield from page
+        if len(page) < page_size:
+            return
+        last = [getattr(page[-1], column.key) for column in columns]
+
+
+def count_rows(query: Query, column: ColumnElement) -> int:
+    """COUNT over `query` without its ORDER BY, so the database can answer from an index."""
+    return query.order_by(None).with_entities(func.count(column)).scalar() or 0
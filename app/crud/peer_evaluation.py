@@ -1,10 +1,24 @@
-from typing import List
+from typing import Any, Dict, Iterable, List, Tuple
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import insert, select, tuple_, update
+from app import crud
 from app.crud.base import CRUDBase
-from app.models.evaluation import PeerEvaluation, EvaluationPeriod
+from app.crud.evaluation_period import evaluation_period as crud_evaluation_period
+from app.crud.final_evaluation import final_evaluation as crud_final_evaluation
+from app.crud.upsert import UPSERT_BATCH_SIZE, bulk_upsert, conflict_insert, load_by_ids
+from app.models.evaluation import PeerEvaluation, PeerScoreAggregate
 from app.schemas.evaluation import PeerEvaluationCreate, PeerEvaluationBase
 
+# Matches the _peer_evaluation_uc unique constraint.
+PEER_EVALUATION_KEY = ("evaluator_id", "evaluation_period", "project_id", "evaluatee_id")
+PEER_EVALUATION_VALUE_COLUMNS = (
+    "score_1", "score_2", "score_3", "score_4", "score_5", "score_6", "score_7", "comment",
+)
+# Matches the _peer_score_aggregate_uc unique constraint.
+PEER_SCORE_AGGREGATE_KEY = ("evaluatee_id", "evaluation_period", "project_id")
+PEER_SCORE_AGGREGATE_TOTALS = ("eval_count", "score_sum", *(f"score_{i}_sum" for i in range(1, 8)))
+
 class CRUDPeerEvaluation(CRUDBase[PeerEvaluation, PeerEvaluationCreate, PeerEvaluationBase]):
     def get_feedback_for_evaluatee_by_period(
         self, db: Session, *, evaluatee_id: int, evaluation_period: str
@@ -29,61 +43,156 @@ class CRUDPeerEvaluation(CRUDBase[PeerEvaluation, PeerEvaluationCreate, PeerEval
         """
         Gets all non-empty feedback for an evaluatee for a specific project and period.
         """
-        period = db.query(EvaluationPeriod).filter(EvaluationPeriod.id == period_id).first()
-        if not period:
+        period_name = crud_evaluation_period.get_name(db, id=period_id)
+        if not period_name:
             return []
         return (
             db.query(PeerEvaluation)
             .filter(
                 PeerEvaluation.evaluatee_id == evaluatee_id,
                 PeerEvaluation.project_id == project_id,
-                PeerEvaluation.evaluation_period == period.name,
+                PeerEvaluation.evaluation_period == period_name,
                 PeerEvaluation.comment.isnot(None),
                 PeerEvaluation.comment != "",
             )
             .all()
         )
 
+    def get_score_aggregate(
+        self, db: Session, *, evaluatee_id: int, project_id: int, period_id: int
+    ) -> PeerScoreAggregate | None:
+        """Gets the materialized peer score totals for an evaluatee in a specific project and period."""
+        period_name = crud_evaluation_period.get_name(db, id=period_id)
+        if not period_name:
+            return None
+        return db.query(PeerScoreAggregate).filter(
+            PeerScoreAggregate.evaluatee_id == evaluatee_id,
+            PeerScoreAggregate.project_id == project_id,
+            PeerScoreAggregate.evaluation_period == period_name,
+        ).first()
+
     def get_average_score_for_evaluatee(
         self, db: Session, *, evaluatee_id: int, project_id: int, period_id: int
     ) -> float | None:
         """Calculates the average total score for an evaluatee in a specific project and period."""
-        period = db.query(EvaluationPeriod).filter(EvaluationPeriod.id == period_id).first()
-        if not period:
-            return None
-            
-        scores_sum = db.query(
-            func.sum(
-                PeerEvaluation.score_1
-                + PeerEvaluation.score_2
-                + PeerEvaluation.score_3
-                + PeerEvaluation.score_4
-                + PeerEvaluation.score_5
-                + PeerEvaluation.score_6
-                + PeerEvaluation.score_7
-            )
-        ).filter(
-            PeerEvaluation.evaluatee_id == evaluatee_id,
-            PeerEvaluation.project_id == project_id,
-            PeerEvaluation.evaluation_period == period.name,
-        ).scalar()
-
-        count = self.get_count_for_evaluatee(db, evaluatee_id=evaluatee_id, project_id=project_id, period_id=period_id)
+        aggregate = self.get_score_aggregate(
+            db, evaluatee_id=evaluatee_id, project_id=project_id, period_id=period_id
+        )
+        return aggregate.average_score if aggregate else None
 
-        return scores_sum / count if scores_sum is not None and count > 0 else None
+    def get_criterion_averages_for_evaluatee(
+        self, db: Session, *, evaluatee_id: int, project_id: int, period_id: int
+    ) -> List[float] | None:
+        """Calculates the average score of each of the seven criteria for an evaluatee in a specific project and period."""
+        aggregate = self.get_score_aggregate(
+            db, evaluatee_id=evaluatee_id, project_id=project_id, period_id=period_id
+        )
+        return aggregate.criterion_averages if aggregate else None
 
     def get_count_for_evaluatee(
         self, db: Session, *, evaluatee_id: int, project_id: int, period_id: int
     ) -> int:
         """Counts the number of evaluations for an evaluatee in a specific project and period."""
-        period = db.query(EvaluationPeriod).filter(EvaluationPeriod.id == period_id).first()
-        if not period:
-            return 0
-        return db.query(PeerEvaluation).filter(
-            PeerEvaluation.evaluatee_id == evaluatee_id,
-            PeerEvaluation.project_id == project_id,
-            PeerEvaluation.evaluation_period == period.name,
-        ).count()
+        aggregate = self.get_score_aggregate(
+            db, evaluatee_id=evaluatee_id, project_id=project_id, period_id=period_id
+        )
+        return aggregate.eval_count if aggregate else 0
+
+    def get_scores_for_update(
+        self, db: Session, *, evaluator_id: int, evaluation_period: str, keys: Iterable[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], Tuple[int, ...]]:
+        """
+        Reads the evaluator's current seven scores for the given (evaluatee_id,
+        project_id) pairs, locking the rows until the transaction ends.
+        """
+        keys = sorted(set(keys))
+        scores = [getattr(PeerEvaluation, f"score_{i}") for i in range(1, 8)]
+        previous = {}
+        for start in range(0, len(keys), UPSERT_BATCH_SIZE):
+            rows = db.execute(
+                select(PeerEvaluation.evaluatee_id, PeerEvaluation.project_id, *scores)
+                .where(
+                    PeerEvaluation.evaluator_id == evaluator_id,
+                    PeerEvaluation.evaluation_period == evaluation_period,
+                    tuple_(PeerEvaluation.evaluatee_id, PeerEvaluation.project_id).in_(
+                        keys[start:start + UPSERT_BATCH_SIZE]
+                    ),
+                )
+                .with_for_update()
+            )
+            for evaluatee_id, project_id, *values in rows:
+                previous[(evaluatee_id, project_id)] = tuple(values)
+        return previous
+
+    def apply_score_deltas(
+        self,
+        db: Session,
+        *,
+        evaluations: List[PeerEvaluationBase],
+        previous: Dict[Tuple[int, int], Tuple[int, ...]],
+        evaluation_period: str,
+    ) -> None:
+        """
+        Adds the change each submitted evaluation makes to its peer score
+        aggregate: a new evaluation adds one to the count and its scores to
+        the sums, a re-submitted one adds its difference from `previous`.
+
+        Concurrent submissions for the same evaluatee each add their own
+        difference, so neither overwrites the other's totals. Does not commit.
+        """
+        latest = {(e.evaluatee_id, e.project_id): tuple(e.scores[:7]) for e in evaluations}
+        rows = []
+        # Sorted so concurrent writers lock the aggregate rows in the same order.
+        for (evaluatee_id, project_id), scores in sorted(latest.items()):
+            old = previous.get((evaluatee_id, project_id))
+            deltas = [score - (old[i] if old else 0) for i, score in enumerate(scores)]
+            if old and not any(deltas):
+                continue
+            rows.append({
+                "evaluatee_id": evaluatee_id,
+                "project_id": project_id,
+                "evaluation_period": evaluation_period,
+                "eval_count": 0 if old else 1,
+                "score_sum": sum(deltas),
+                **{f"score_{i + 1}_sum": delta for i, delta in enumerate(deltas)},
+            })
+        if not rows:
+            return
+
+        on_conflict_insert = conflict_insert(db)
+        if on_conflict_insert is not None:
+            for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+                stmt = on_conflict_insert(PeerScoreAggregate).values(rows[start:start + UPSERT_BATCH_SIZE])
+                db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=list(PEER_SCORE_AGGREGATE_KEY),
+                        set_={
+                            column: getattr(PeerScoreAggregate, column) + stmt.excluded[column]
+                            for column in PEER_SCORE_AGGREGATE_TOTALS
+                        },
+                    )
+                )
+            return
+        for row in rows:
+            if self._add_to_aggregate(db, row=row):
+                continue
+            try:
+                with db.begin_nested():
+                    db.execute(insert(PeerScoreAggregate).values(**row))
+            except IntegrityError:
+                # Another writer created the aggregate in between; add to theirs.
+                self._add_to_aggregate(db, row=row)
+
+    def _add_to_aggregate(self, db: Session, *, row: Dict[str, Any]) -> bool:
+        return db.execute(
+            update(PeerScoreAggregate)
+            .where(*(getattr(PeerScoreAggregate, column) == row[column] for column in PEER_SCORE_AGGREGATE_KEY))
+            .values({
+                column: getattr(PeerScoreAggregate, column) + row[column]
+                for column in PEER_SCORE_AGGREGATE_TOTALS
+            })
+            .execution_options(synchronize_session=False)
+        ).rowcount > 0
 
     def get_by_evaluator_and_evaluatee(
         self, db: Session, *, project_id: int, evaluator_id: int, evaluatee_id: int, evaluation_period: str
@@ -100,7 +209,77 @@ class CRUDPeerEvaluation(CRUDBase[PeerEvaluation, PeerEvaluationCreate, PeerEval
         )
 
     def upsert_multi(
-        self, db: Session, *, evaluations: List[PeerEvaluationBase], evaluator_id: int, evaluation_period: str
+        self,
+        db: Session,
+        *,
+        evaluations: List[PeerEvaluationBase],
+        evaluator_id: int,
+        evaluation_period: str,
+        recalculate_scores: bool = False,
+    ) -> List[PeerEvaluation]:
+        """
+        Inserts or updates the evaluator's evaluations with one native
+        `INSERT ... ON CONFLICT DO UPDATE ... RETURNING`, falling back to the
+        per-row path on databases without it.
+
+        With `recalculate_scores`, the period's pending final scores are
+        refreshed before the single commit.
+        """
+        rows = [
+            {
+                "project_id": evaluation.project_id,
+                "evaluatee_id": evaluation.evaluatee_id,
+                "evaluator_id": evaluator_id,
+                "evaluation_period": evaluation_period,
+                **{f"score_{i + 1}": score for i, score in enumerate(evaluation.scores[:7])},
+                "comment": evaluation.comment,
+            }
+            for evaluation in evaluations
+        ]
+        previous = self.get_scores_for_update(
+            db,
+            evaluator_id=evaluator_id,
+            evaluation_period=evaluation_period,
+            keys=[(e.evaluatee_id, e.project_id) for e in evaluations],
+        )
+        upserted_objs = bulk_upsert(
+            db,
+            PeerEvaluation,
+            rows,
+            conflict_columns=PEER_EVALUATION_KEY,
+            update_columns=PEER_EVALUATION_VALUE_COLUMNS,
+        )
+        if upserted_objs is None:
+            return self._upsert_multi_per_row(
+                db,
+                evaluations=evaluations,
+                evaluator_id=evaluator_id,
+                evaluation_period=evaluation_period,
+                previous=previous,
+                recalculate_scores=recalculate_scores,
+            )
+
+        self.apply_score_deltas(
+            db, evaluations=evaluations, previous=previous, evaluation_period=evaluation_period
+        )
+        crud_final_evaluation.mark_for_recalculation(
+            db, evaluatee_ids=[e.evaluatee_id for e in evaluations], evaluation_period=evaluation_period
+        )
+        if recalculate_scores:
+            crud.evaluation_calculator.refresh_pending_scores(db, evaluation_period=evaluation_period)
+        upserted_ids = [obj.id for obj in upserted_objs]
+        db.commit()
+        return load_by_ids(db, PeerEvaluation, upserted_ids)
+
+    def _upsert_multi_per_row(
+        self,
+        db: Session,
+        *,
+        evaluations: List[PeerEvaluationBase],
+        evaluator_id: int,
+        evaluation_period: str,
+        previous: Dict[Tuple[int, int], Tuple[int, ...]],
+        recalculate_scores: bool = False,
     ) -> List[PeerEvaluation]:
         upserted_objs = []
         for evaluation in evaluations:
@@ -140,7 +319,15 @@ class CRUDPeerEvaluation(CRUDBase[PeerEvaluation, PeerEvaluationCreate, PeerEval
                 )
                 db.add(new_eval)
                 upserted_objs.append(new_eval)
-        
+
+        self.apply_score_deltas(
+            db, evaluations=evaluations, previous=previous, evaluation_period=evaluation_period
+        )
+        crud_final_evaluation.mark_for_recalculation(
+            db, evaluatee_ids=[e.evaluatee_id for e in evaluations], evaluation_period=evaluation_period
+        )
+        if recalculate_scores:
+            crud.evaluation_calculator.refresh_pending_scores(db, evaluation_period=evaluation_period)
         db.commit()
         for obj in upserted_objs:
             db.refresh(obj)
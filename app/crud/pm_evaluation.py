@@ -1,11 +1,18 @@
 from typing import List, Any, Optional
 from sqlalchemy.orm import Session
+from app import crud
 from app.crud.base import CRUDBase
-from app.models.evaluation import PmEvaluation, EvaluationPeriod
+from app.crud.evaluation_period import evaluation_period as crud_evaluation_period
+from app.crud.final_evaluation import final_evaluation as crud_final_evaluation
+from app.crud.upsert import bulk_upsert, load_by_ids
+from app.models.evaluation import PmEvaluation
 from app.models.project import Project
 from app.models.user import User
 from app.schemas.evaluation import PmEvaluationCreate, PmEvaluationBase
 
+# Matches the _pm_evaluation_uc unique constraint.
+PM_EVALUATION_KEY = ("evaluator_id", "evaluation_period", "project_id", "evaluatee_id")
+
 class CRUDPmEvaluation(CRUDBase[PmEvaluation, PmEvaluationCreate, PmEvaluationBase]):
     def get_for_evaluatee_by_period(
         self, db: Session, *, evaluatee_id: int, evaluation_period: str
@@ -32,16 +39,17 @@ class CRUDPmEvaluation(CRUDBase[PmEvaluation, PmEvaluationCreate, PmEvaluationBa
     def get_for_evaluatee_by_project_and_period(
         self, db: Session, *, evaluatee_id: int, project_id: int, period_id: int
     ) -> Optional[PmEvaluation]:
-        period = db.query(EvaluationPeriod).filter(EvaluationPeriod.id == period_id).first()
-        if not period:
+        period_name = crud_evaluation_period.get_name(db, id=period_id)
+        if not period_name:
             return None
         return (
             db.query(PmEvaluation)
             .filter(
                 PmEvaluation.evaluatee_id == evaluatee_id,
                 PmEvaluation.project_id == project_id,
-                PmEvaluation.evaluation_period == period.name,
+                PmEvaluation.evaluation_period == period_name,
             )
+            .order_by(PmEvaluation.id)
             .first()
         )
 
@@ -52,22 +60,16 @@ class CRUDPmEvaluation(CRUDBase[PmEvaluation, PmEvaluationCreate, PmEvaluationBa
                 PmEvaluation.evaluatee_id == evaluatee_id,
                 PmEvaluation.evaluation_period == evaluation_period,
             )
+            .order_by(PmEvaluation.id)
             .all()
         )
 
     def create(self, db: Session, *, obj_in: PmEvaluationBase, evaluator_id: int, evaluation_period: str) -> PmEvaluation:
-        db_obj = PmEvaluation(
-            project_id=obj_in.project_id,
-            evaluatee_id=obj_in.evaluatee_id,
-            score=obj_in.score,
-            comment=obj_in.comment,
-            evaluator_id=evaluator_id,
-            evaluation_period=evaluation_period,
-        )
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        # One PM evaluation per evaluator/evaluatee/project/period: a repeated
+        # submission updates the existing row.
+        return self.upsert_multi(
+            db, evaluations=[obj_in], evaluator_id=evaluator_id, evaluation_period=evaluation_period
+        )[0]
 
     def get_by_evaluator_and_evaluatee(
         self, db: Session, *, project_id: int, evaluator_id: int, evaluatee_id: int, evaluation_period: str
@@ -84,7 +86,66 @@ class CRUDPmEvaluation(CRUDBase[PmEvaluation, PmEvaluationCreate, PmEvaluationBa
         )
 
     def upsert_multi(
-        self, db: Session, *, evaluations: List[PmEvaluationBase], evaluator_id: int, evaluation_period: str
+        self,
+        db: Session,
+        *,
+        evaluations: List[PmEvaluationBase],
+        evaluator_id: int,
+        evaluation_period: str,
+        recalculate_scores: bool = False,
+    ) -> List[PmEvaluation]:
+        """
+        Inserts or updates the evaluator's evaluations with one native
+        `INSERT ... ON CONFLICT DO UPDATE ... RETURNING`, falling back to the
+        per-row path on databases without it.
+
+        With `recalculate_scores`, the period's pending final scores are
+        refreshed before the single commit.
+        """
+        rows = [
+            {
+                "project_id": evaluation.project_id,
+                "evaluatee_id": evaluation.evaluatee_id,
+                "evaluator_id": evaluator_id,
+                "evaluation_period": evaluation_period,
+                "score": evaluation.score,
+                "comment": evaluation.comment,
+            }
+            for evaluation in evaluations
+        ]
+        upserted_objs = bulk_upsert(
+            db,
+            PmEvaluation,
+            rows,
+            conflict_columns=PM_EVALUATION_KEY,
+            update_columns=("score", "comment"),
+        )
+        if upserted_objs is None:
+            return self._upsert_multi_per_row(
+                db,
+                evaluations=evaluations,
+                evaluator_id=evaluator_id,
+                evaluation_period=evaluation_period,
+                recalculate_scores=recalculate_scores,
+            )
+
+        crud_final_evaluation.mark_for_recalculation(
+            db, evaluatee_ids=[e.evaluatee_id for e in evaluations], evaluation_period=evaluation_period
+        )
+        if recalculate_scores:
+            crud.evaluation_calculator.refresh_pending_scores(db, evaluation_period=evaluation_period)
+        upserted_ids = [obj.id for obj in upserted_objs]
+        db.commit()
+        return load_by_ids(db, PmEvaluation, upserted_ids)
+
+    def _upsert_multi_per_row(
+        self,
+        db: Session,
+        *,
+        evaluations: List[PmEvaluationBase],
+        evaluator_id: int,
+        evaluation_period: str,
+        recalculate_scores: bool = False,
     ) -> List[PmEvaluation]:
         upserted_objs = []
         for evaluation in evaluations:
@@ -114,6 +175,11 @@ class CRUDPmEvaluation(CRUDBase[PmEvaluation, PmEvaluationCreate, PmEvaluationBa
                 db.add(new_eval)
                 upserted_objs.append(new_eval)
 
+        crud_final_evaluation.mark_for_recalculation(
+            db, evaluatee_ids=[e.evaluatee_id for e in evaluations], evaluation_period=evaluation_period
+        )
+        if recalculate_scores:
+            crud.evaluation_calculator.refresh_pending_scores(db, evaluation_period=evaluation_period)
         db.commit()
         for obj in upserted_objs:
             db.refresh(obj)
@@ -134,6 +200,9 @@ class CRUDPmEvaluation(CRUDBase[PmEvaluation, PmEvaluationCreate, PmEvaluationBa
             for evaluation in evaluations
         ]
         db.add_all(db_objs)
+        crud_final_evaluation.mark_for_recalculation(
+            db, evaluatee_ids=[e.evaluatee_id for e in evaluations], evaluation_period=evaluation_period
+        )
         db.commit()
         for db_obj in db_objs:
             db.refresh(db_obj)
@@ -0,0 +1,222 @@
+"""
+In-process cache of authenticated principals.
+
+Every authenticated request used to decode its JWT and load the user by
+username. A verified token is now cached under the SHA-256 of the token
+string together with a detached snapshot of its user (no password hash), so
+repeated requests with the same token skip both the signature check and the
+users query. The snapshot is turned back into a session-bound `User`
+without a SELECT; relationships and the password hash still load lazily
+when used.
+
+Snapshots carry the version of their username. Committing an update or a
+delete of a user bumps that version (and bulk UPDATE/DELETE statements on
+users bump every version), so cached snapshots of changed users stop
+matching at once. The version is read before the user is loaded, which
+means a snapshot loaded while a change was being committed can never be
+served after it.
+
+With AUTH_CLAIMS_FAST_PATH, tokens carrying the user id, role, organization
+and token version are trusted without loading the user at all. The only
+state consulted is the user's current `token_version`, kept in a per-user
+cache; it is bumped whenever one of those claims changes, which rejects
+older tokens.
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.user import User, UserRole
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Detached snapshot of an authenticated user."""
+    id: int
+    username: str
+    email: str
+    full_name: Optional[str]
+    title: Optional[str]
+    role: UserRole
+    organization_id: Optional[int]
+    reports_to: Optional[int]
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(**{f.name: getattr(user, f.name) for f in fields(cls)})
+
+    def attach(self, db: Session) -> User:
+        """A persistent `User` for this snapshot in `db`, without querying."""
+        user = User(**{f.name: getattr(self, f.name) for f in fields(self)})
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+
+@dataclass(frozen=True)
+class _CachedToken:
+    principal: Principal
+    version: Tuple[int, int]
+    expires_at: Optional[float]
+
+
+_principal_cache: TTLCache[_CachedToken] = TTLCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS, maxsize=settings.PRINCIPAL_CACHE_SIZE
+)
+# Current token_version per user id (None for a user that does not exist).
+_token_version_cache: TTLCache[Optional[int]] = TTLCache(
+    ttl_seconds=settings.TOKEN_VERSION_CACHE_TTL_SECONDS, maxsize=settings.PRINCIPAL_CACHE_SIZE
+)
+# Claims that must match the user's current state for a token to stay valid.
+_CLAIM_ATTRIBUTES = ("username", "role", "organization_id")
+_versions_lock = threading.Lock()
+# Bumped for every user by bulk statements; per-username counters otherwise.
+_epoch = 0
+_username_versions: Dict[str, int] = {}
+# Set on a session with uncommitted user changes: the (id, username) pairs
+# of the changed users, or True when every user may have changed.
+_PRINCIPALS_CHANGED = "principals_changed"
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def principal_version(username: str) -> Tuple[int, int]:
+    with _versions_lock:
+        return _epoch, _username_versions.get(username, 0)
+
+
+def invalidate_principals(users: Optional[Set[Tuple[int, str]]] = None) -> None:
+    """Makes cached tokens and token versions of `users` ((id, username) pairs), or of every user, stale."""
+    global _epoch
+    with _versions_lock:
+        if users is None:
+            _epoch += 1
+        else:
+            for _, username in users:
+                _username_versions[username] = _username_versions.get(username, 0) + 1
+    if users is None:
+        _token_version_cache.invalidate()
+    else:
+        for user_id, _ in users:
+            _token_version_cache.invalidate(user_id)
+
+
+def create_token_claims(user: User) -> Dict[str, Any]:
+    """Claims of an access token for `user`."""
+    return {
+        "sub": user.username,
+        "role": user.role.value,
+        "uid": user.id,
+        "org": user.organization_id,
+        "ver": user.token_version or 0,
+    }
+
+
+def get_token_version(db: Session, user_id: int) -> Optional[int]:
+    return _token_version_cache.get_or_load(
+        user_id, lambda: db.execute(select(User.token_version).where(User.id == user_id)).scalar()
+    )
+
+
+def user_from_claims(db: Session, payload: Dict[str, Any]) -> Optional[User]:
+    """
+    A persistent `User` built from verified token claims without querying,
+    or None if the token predates its user's current token version (or was
+    issued without the claims). Attributes outside the claims load lazily.
+    """
+    try:
+        user_id, version, role = int(payload["uid"]), int(payload["ver"]), UserRole(payload["role"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if get_token_version(db, user_id) != version:
+        return None
+    user = User(
+        id=user_id,
+        username=payload.get("sub"),
+        role=role,
+        organization_id=payload.get("org"),
+        token_version=version,
+    )
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def get_cached_principal(db: Session, token: str) -> Optional[User]:
+    """The user of a previously verified `token`, if still cached and current."""
+    cached = _principal_cache.get(_token_key(token))
+    if cached is None:
+        return None
+    if cached.expires_at is not None and cached.expires_at <= time.time():
+        _principal_cache.invalidate(_token_key(token))
+        return None
+    if cached.version != principal_version(cached.principal.username):
+        return None
+    return cached.principal.attach(db)
+
+
+def cache_principal(token: str, user: User, *, version: Tuple[int, int], expires_at: Optional[float]) -> None:
+    """
+    Caches the user of a verified token. `version` must have been read with
+    `principal_version` before `user` was loaded.
+    """
+    if settings.PRINCIPAL_CACHE_TTL_SECONDS <= 0:
+        return
+    _principal_cache.set(
+        _token_key(token), _CachedToken(principal=Principal.from_user(user), version=version, expires_at=expires_at)
+    )
+
+
+def _mark_changed(session: Optional[Session], users: Optional[Set[Tuple[int, str]]]) -> None:
+    if session is None:
+        invalidate_principals(users)
+        return
+    pending = session.info.get(_PRINCIPALS_CHANGED)
+    if pending is True:
+        return
+    if users is None:
+        session.info[_PRINCIPALS_CHANGED] = True
+    else:
+        session.info[_PRINCIPALS_CHANGED] = (pending or set()) | users
+
+
+@event.listens_for(User, "before_update")
+def _bump_token_version(mapper, connection, target) -> None:
+    attrs = inspect(target).attrs
+    if attrs.token_version.history.has_changes():
+        return
+    if any(getattr(attrs, name).history.has_changes() for name in _CLAIM_ATTRIBUTES):
+        target.token_version = (target.token_version or 0) + 1
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _on_user_written(mapper, connection, target) -> None:
+    history = inspect(target).attrs.username.history
+    usernames = {name for name in (*history.deleted, *history.unchanged, *history.added) if name}
+    _mark_changed(inspect(target).session, {(target.id, username) for username in usernames})
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_bulk_statement(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is User:
+        _mark_changed(orm_execute_state.session, None)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _on_session_transaction_end(session: Session) -> None:
+    changed = session.info.pop(_PRINCIPALS_CHANGED, None)
+    if changed is not None:
+        invalidate_principals(None if changed is True else changed)
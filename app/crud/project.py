@@ -38,8 +38,7 @@ class CRUDProject(CRUDBase[Project, ProjectCreate, ProjectUpdate]):
         # Role-based filtering for non-admins if no specific user_id is given
         if user_id is None:
             if user.role == UserRole.DEPT_HEAD:
-                subordinate_ids = {sub.id for sub in crud_user.user.get_subordinates(db, user_id=user.id)}
-                subordinate_ids.add(user.id)
+                subordinate_ids = crud_user.user.get_subordinate_ids(db, user_id=user.id, include_self=True)
                 query = query.filter(Project.pm_id.in_(subordinate_ids))
             elif user.role not in [UserRole.ADMIN]:
                 # For other roles, only show projects they are a member of
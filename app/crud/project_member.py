@@ -4,10 +4,10 @@ from datetime import date
 from sqlalchemy.orm import Session
 
 from app.crud.base import CRUDBase
+from app.crud.evaluation_period import evaluation_period as crud_evaluation_period
 from app.models.project_member import ProjectMember
 from app.models.project import Project
 from app.models.user import User
-from app.models.evaluation import EvaluationPeriod
 from app.schemas.project_member import (
     ProjectMemberCreate,
     ProjectMemberUpdate,
@@ -30,7 +30,7 @@ class CRUDProjectMember(
         )
 
     def get_multi_by_user(self, db: Session, *, user_id: int) -> List[ProjectMember]:
-        return db.query(ProjectMember).filter(ProjectMember.user_id == user_id).all()
+        return db.query(ProjectMember).filter(ProjectMember.user_id == user_id).order_by(ProjectMember.id).all()
 
     def get_multi_by_user_and_period(self, db: Session, *, user_id: int, start_date: date, end_date: date) -> List[ProjectMember]:
         return (
@@ -58,7 +58,7 @@ class CRUDProjectMember(
     def get_multi_by_user_and_period_id(
         self, db: Session, *, user_id: int, period_id: int
     ) -> List[ProjectMember]:
-        period = db.query(EvaluationPeriod).filter(EvaluationPeriod.id == period_id).first()
+        period = crud_evaluation_period.get_snapshot(db, id=period_id)
         if not period:
             return []
         return self.get_multi_by_user_and_period(
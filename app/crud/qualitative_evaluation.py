@@ -1,30 +1,96 @@
 from typing import List
 from sqlalchemy.orm import Session, aliased, joinedload
 from app.crud.base import CRUDBase
-from app.models.evaluation import QualitativeEvaluation, EvaluationPeriod
+from app.crud.evaluation_period import evaluation_period as crud_evaluation_period
+from app.crud.final_evaluation import final_evaluation as crud_final_evaluation
+from app.crud.upsert import bulk_upsert, load_by_ids
+from app.models.evaluation import QualitativeEvaluation
 from app.schemas.evaluation import QualitativeEvaluationCreate, QualitativeEvaluationBase
 from app import crud
 from app.models.user import User, UserRole
 from app.models.organization import Organization
 
+# Matches the _qualitative_evaluation_uc unique constraint.
+QUALITATIVE_EVALUATION_KEY = ("evaluator_id", "evaluation_period", "evaluatee_id")
+
 class CRUDQualitativeEvaluation(CRUDBase[QualitativeEvaluation, QualitativeEvaluationCreate, QualitativeEvaluationBase]):
     def get_by_evaluatee_and_period(
         self, db: Session, *, evaluatee_id: int, period_id: int
     ) -> QualitativeEvaluation | None:
-        period = db.query(EvaluationPeriod).filter(EvaluationPeriod.id == period_id).first()
-        if not period:
+        period_name = crud_evaluation_period.get_name(db, id=period_id)
+        if not period_name:
             return None
         return (
             db.query(QualitativeEvaluation)
             .filter(
                 QualitativeEvaluation.evaluatee_id == evaluatee_id,
-                QualitativeEvaluation.evaluation_period == period.name,
+                QualitativeEvaluation.evaluation_period == period_name,
             )
+            .order_by(QualitativeEvaluation.id)
             .first()
         )
 
     def upsert_multi(
-        self, db: Session, *, evaluations: List[QualitativeEvaluationBase], evaluator_id: int, evaluation_period: str
+        self,
+        db: Session,
+        *,
+        evaluations: List[QualitativeEvaluationBase],
+        evaluator_id: int,
+        evaluation_period: str,
+        recalculate_scores: bool = False,
+    ) -> List[QualitativeEvaluation]:
+        """
+        Inserts or updates the evaluator's evaluations with one native
+        `INSERT ... ON CONFLICT DO UPDATE ... RETURNING`, falling back to the
+        per-row path on databases without it.
+
+        With `recalculate_scores`, the period's pending final scores are
+        refreshed before the single commit.
+        """
+        rows = [
+            {
+                "evaluatee_id": evaluation.evaluatee_id,
+                "evaluator_id": evaluator_id,
+                "evaluation_period": evaluation_period,
+                "qualitative_score": evaluation.qualitative_score,
+                "department_contribution_score": evaluation.department_contribution_score,
+                "feedback": evaluation.feedback,
+            }
+            for evaluation in evaluations
+        ]
+        upserted_objs = bulk_upsert(
+            db,
+            QualitativeEvaluation,
+            rows,
+            conflict_columns=QUALITATIVE_EVALUATION_KEY,
+            update_columns=("qualitative_score", "department_contribution_score", "feedback"),
+        )
+        if upserted_objs is None:
+            return self._upsert_multi_per_row(
+                db,
+                evaluations=evaluations,
+                evaluator_id=evaluator_id,
+                evaluation_period=evaluation_period,
+                recalculate_scores=recalculate_scores,
+            )
+
+        crud_final_evaluation.mark_for_recalculation(
+            db, evaluatee_ids=[e.evaluatee_id for e in evaluations], evaluation_period=evaluation_period
+        )
+        if recalculate_scores:
+            crud.evaluation_calculator.refresh_pending_scores(db, evaluation_period=evaluation_period)
+        upserted_ids = [obj.id for obj in upserted_objs]
+        db.commit()
+        return load_by_ids(db, QualitativeEvaluation, upserted_ids)
+
+    def _upsert_multi_per_row(
+        self,
+        db: Session,
+        *,
+        evaluations: List[QualitativeEvaluationBase],
+        evaluator_id: int,
+        evaluation_period: str,
+        recalculate_scores: bool = False,
     ) -> List[QualitativeEvaluation]:
         
         updated_and_created_evaluations = []
@@ -57,6 +123,11 @@ class CRUDQualitativeEvaluation(CRUDBase[QualitativeEvaluation, QualitativeEvalu
                 db.add(new_eval)
                 updated_and_created_evaluations.append(new_eval)
 
+        crud_final_evaluation.mark_for_recalculation(
+            db, evaluatee_ids=[e.evaluatee_id for e in evaluations], evaluation_period=evaluation_period
+        )
+        if recalculate_scores:
+            crud.evaluation_calculator.refresh_pending_scores(db, evaluation_period=evaluation_period)
         db.commit()
         for eval_obj in updated_and_created_evaluations:
             db.refresh(eval_obj)
@@ -68,22 +139,14 @@ class CRUDQualitativeEvaluation(CRUDBase[QualitativeEvaluation, QualitativeEvalu
         if not active_period:
             return []
 
-        subordinates = crud.user.user.get_subordinates(db, user_id=evaluator.id)
-        
-        target_evaluatees = []
         if evaluator.role == UserRole.TEAM_LEAD:
-            target_evaluatees = subordinates
+            roles = None
         elif evaluator.role == UserRole.DEPT_HEAD:
-            target_evaluatees = [
-                sub for sub in subordinates if sub.role == UserRole.TEAM_LEAD
-            ]
+            roles = [UserRole.TEAM_LEAD]
         else:
             return []
 
-        if not target_evaluatees:
-            return []
-
-        target_ids = [user.id for user in target_evaluatees]
+        target_ids = crud.user.user.subordinates_query(db, user_id=evaluator.id, roles=roles).with_entities(User.id)
 
         # Alias for the specific evaluation by the current evaluator
         CurrentEvaluation = aliased(QualitativeEvaluation)
@@ -107,6 +170,7 @@ class CRUDQualitativeEvaluation(CRUDBase[QualitativeEvaluation, QualitativeEvalu
                 & (CurrentEvaluation.evaluation_period == active_period.name),
             )
             .filter(User.id.in_(target_ids))
+            .order_by(User.id)
             .all()
         )
         return results
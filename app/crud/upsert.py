@@ -0,0 +1,100 @@
+from typing import Any, Dict, List, Optional, Sequence, Type, TypeVar
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+
+ModelType = TypeVar("ModelType", bound=Base)
+
+# Keeps each statement well below SQLite's bound-parameter limit.
+UPSERT_BATCH_SIZE = 500
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE ... RETURNING.
+_DIALECT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def supports_native_upsert(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    if dialect.name == "sqlite":
+        # RETURNING needs SQLite 3.35+
+        return dialect.dbapi.sqlite_version_info >= (3, 35)
+    return dialect.name in _DIALECT_INSERTS
+
+
+def conflict_insert(db: Session):
+    """
+    Returns the dialect's ON CONFLICT-capable `insert` construct for
+    statements that do not need RETURNING (SQLite 3.24+), or None.
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name == "sqlite" and dialect.dbapi.sqlite_version_info < (3, 24):
+        return None
+    return _DIALECT_INSERTS.get(dialect.name)
+
+
+def native_insert(db: Session):
+    """Returns the dialect's ON CONFLICT-capable `insert` construct, or None."""
+    if not supports_native_upsert(db):
+        return None
+    return _DIALECT_INSERTS[db.get_bind().dialect.name]
+
+
+def bulk_upsert(
+    db: Session,
+    model: Type[ModelType],
+    rows: Sequence[Dict[str, Any]],
+    *,
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str],
+) -> Optional[List[ModelType]]:
+    """
+    Inserts or updates `rows` with one `INSERT ... ON CONFLICT DO UPDATE ...
+    RETURNING` per batch. `conflict_columns` must match a unique constraint.
+
+    Returns the persisted objects in the order of `rows` (a key repeated in
+    the batch resolves to its last row, like sequential upserts), or None when
+    the dialect has no native upsert so the caller can fall back to its
+    per-row path. Does not commit.
+    """
+    insert = native_insert(db)
+    if insert is None:
+        return None
+    if not rows:
+        return []
+
+    def key_of(values) -> tuple:
+        return tuple(values[column] for column in conflict_columns)
+
+    # ON CONFLICT cannot touch the same row twice in one statement.
+    latest: Dict[tuple, Dict[str, Any]] = {}
+    for row in rows:
+        latest[key_of(row)] = row
+    unique_rows = list(latest.values())
+
+    persisted: Dict[tuple, ModelType] = {}
+    for start in range(0, len(unique_rows), UPSERT_BATCH_SIZE):
+        stmt = insert(model).values(unique_rows[start:start + UPSERT_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(conflict_columns),
+            set_={column: stmt.excluded[column] for column in update_columns},
+        )
+        for obj in db.scalars(stmt.returning(model), execution_options={"populate_existing": True}):
+            persisted[tuple(getattr(obj, column) for column in conflict_columns)] = obj
+
+    return [persisted[key_of(row)] for row in rows]
+
+
+def load_by_ids(db: Session, model: Type[ModelType], ids: Sequence[int]) -> List[ModelType]:
+    """
+    Loads rows by primary key with a single SELECT, in the order of `ids`.
+    Used to repopulate objects expired by a commit instead of refreshing
+    them one by one.
+    """
+    if not ids:
+        return []
+    by_id = {obj.id: obj for obj in db.query(model).filter(model.id.in_(set(ids))).populate_existing()}
+    return [by_id[id] for id in ids]
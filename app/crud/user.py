@@ -1,18 +1,28 @@
 
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import FrozenSet, Iterator, Optional, Sequence
 
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Query, Session
 
 
 
 from app.crud.base import CRUDBase
+from app.crud.pagination import count_rows, iter_keyset
 
-from app.models.user import User
+from app.models.user import User, UserRole
+from app.models.organization import OrganizationClosure
 from app.models.external_account import ExternalAccount, Provider
 
 from app.schemas.user import UserCreate, UserUpdate, UserHistoryResponse, UserHistoryEntry, ProjectHistoryItem
 
-from app.core.security import get_password_hash, verify_password
+from app.core.config import settings
+from app.core.security import (
+    generate_activation_token,
+    get_password_hash,
+    hash_activation_token,
+    verify_and_update_password,
+)
 from app.crud import (
     organization as crud_org,
     evaluation_period as crud_eval_period,
@@ -21,6 +31,10 @@ from app.crud import (
 )
 
 
+# Users loaded per query when iterating over a subordinate list.
+SUBORDINATE_PAGE_SIZE = 500
+
+
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def get_by_username(self, db: Session, *, username: str) -> Optional[User]:
         return db.query(User).filter(User.username == username).first()
@@ -76,27 +90,151 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         user = self.get_by_username(db, username=username)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        verified, new_hash = verify_and_update_password(password, user.hashed_password)
+        if not verified:
             return None
+        if new_hash:
+            self.upgrade_password_hash(db, user=user, hashed_password=new_hash)
         return user
 
-    def get_subordinates(self, db: Session, *, user_id: int) -> list[User]:
-        user = self.get(db, id=user_id)
-        if not user or not user.organization_id:
-            return []
+    def upgrade_password_hash(self, db: Session, *, user: User, hashed_password: str) -> None:
+        """Outdated bcrypt hashes are upgraded on login."""
+        user.hashed_password = hashed_password
+        db.add(user)
+        db.commit()
 
-        descendant_orgs = crud_org.get_all_descendant_orgs(db, user.organization_id)
-        descendant_org_ids = [org.id for org in descendant_orgs]
-        
-        # Include the user's own organization
-        all_org_ids = descendant_org_ids + [user.organization_id]
+    def issue_activation_token(self, db: Session, *, user: User) -> str:
+        """
+        Issues a new single-use activation token for `user`, replacing any
+        previous one. Only its hash is stored; the token is returned once.
+        """
+        token, token_hash = generate_activation_token()
+        user.activation_token_hash = token_hash
+        user.activation_expires_at = datetime.utcnow() + timedelta(hours=settings.ACTIVATION_TOKEN_EXPIRE_HOURS)
+        db.add(user)
+        db.commit()
+        return token
 
-        subordinates = (
+    def activate(self, db: Session, *, token: str, password: str) -> Optional[User]:
+        """
+        Sets the password of the account holding an unexpired activation
+        `token` and consumes the token. Returns None for an unknown, expired
+        or already used token.
+        """
+        token_hash = hash_activation_token(token)
+        user = db.query(User).filter(User.activation_token_hash == token_hash).first()
+        if user is None or user.activation_expires_at is None or user.activation_expires_at <= datetime.utcnow():
+            return None
+        hashed_password = get_password_hash(password)
+        # Conditional on the token, so two concurrent activations cannot both succeed.
+        consumed = db.execute(
+            update(User)
+            .where(User.id == user.id, User.activation_token_hash == token_hash)
+            .values(hashed_password=hashed_password, activation_token_hash=None, activation_expires_at=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if not consumed:
+            return None
+        db.refresh(user)
+        return user
+
+    def subordinates_query(
+        self, db: Session, *, user_id: int, roles: Optional[Sequence[UserRole]] = None
+    ) -> Query:
+        """
+        Users in `user_id`'s organization and every organization below it
+        (excluding the user), ordered by id, as one query over the closure table.
+        """
+        manager_org_id = select(User.organization_id).where(User.id == user_id).scalar_subquery()
+        query = (
             db.query(User)
-            .filter(User.organization_id.in_(all_org_ids), User.id != user_id)
-            .all()
+            .join(OrganizationClosure, OrganizationClosure.descendant_id == User.organization_id)
+            .filter(OrganizationClosure.ancestor_id == manager_org_id, User.id != user_id)
+        )
+        if roles:
+            query = query.filter(User.role.in_(roles))
+        return query.order_by(User.id)
+
+    def get_subordinates(
+        self, db: Session, *, user_id: int, roles: Optional[Sequence[UserRole]] = None
+    ) -> list[User]:
+        return self.subordinates_query(db, user_id=user_id, roles=roles).all()
+
+    def iter_subordinates(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        roles: Optional[Sequence[UserRole]] = None,
+        page_size: Optional[int] = None,
+    ) -> Iterator[User]:
+        """
+        Yields subordinates page by page (keyset on id), so only one page of
+        users is loaded at a time.
+        """
+        query = self.subordinates_query(db, user_id=user_id, roles=roles)
+        return iter_keyset(query, [User.id], page_size=page_size or SUBORDINATE_PAGE_SIZE)
+
+    def listing_query(
+        self,
+        db: Session,
+        *,
+        manager_id: Optional[int] = None,
+        roles: Optional[Sequence[UserRole]] = None,
+        org_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+    ) -> Query:
+        """
+        Users for the listing endpoints: everyone, or only `manager_id`'s
+        subordinates, narrowed to the given roles, to the subtree of `org_id`
+        and to names (full name or username) starting with `name_prefix`.
+        """
+        if manager_id is not None:
+            query = self.subordinates_query(db, user_id=manager_id, roles=roles)
+        else:
+            query = db.query(User)
+            if roles:
+                query = query.filter(User.role.in_(roles))
+        if org_id is not None:
+            query = query.filter(User.organization_id.in_(crud_org.get_descendant_org_ids(db, org_id)))
+        if name_prefix:
+            query = query.filter(or_(
+                User.full_name.startswith(name_prefix, autoescape=True),
+                User.username.startswith(name_prefix, autoescape=True),
+            ))
+        return query
+
+    def count_listing(
+        self,
+        db: Session,
+        *,
+        manager_id: Optional[int] = None,
+        roles: Optional[Sequence[UserRole]] = None,
+        org_id: Optional[int] = None,
+        name_prefix: Optional[str] = None,
+    ) -> int:
+        """
+        Total for `listing_query` with the same filters. A plain subtree
+        filter is answered from the cached org tree without touching the
+        users table.
+        """
+        if org_id is not None and manager_id is None and not roles and not name_prefix:
+            return len(crud_org.get_org_tree(db).subtree_user_ids(org_id))
+        query = self.listing_query(db, manager_id=manager_id, roles=roles, org_id=org_id, name_prefix=name_prefix)
+        return count_rows(query, User.id)
+
+    def get_subordinate_ids(self, db: Session, *, user_id: int, include_self: bool = False) -> FrozenSet[int]:
+        """Ids of the users `get_subordinates` would return, without loading them."""
+        return crud_org.get_subordinate_ids(db, user_id, include_self=include_self)
+
+    def is_subordinate(self, db: Session, *, manager: User, user: User) -> bool:
+        """True if `user` belongs to `manager`'s organization or one below it."""
+        if not manager.organization_id or not user.organization_id or manager.id == user.id:
+            return False
+        return crud_org.is_descendant_org(
+            db, ancestor_id=manager.organization_id, descendant_id=user.organization_id
         )
-        return subordinates
 
     def get_user_history(self, db: Session, *, user_id: int) -> UserHistoryResponse:
         all_periods = crud_eval_period.evaluation_period.get_multi(db, limit=1000)
@@ -1,7 +1,10 @@
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.database import engine, Base
+from app.core.security import shutdown_hash_pool
 # Import all models to ensure they are registered with SQLAlchemy's metadata
 from app.models import user, organization, external_account, project, project_member, praise, strength, evaluation, collaboration
 from app.api.endpoints import auth, users, organizations, external_accounts, projects, praises, evaluations, reports, retrospectives, collaborations
@@ -11,7 +14,14 @@ from app.api.endpoints import auth, users, organizations, external_accounts, pro
 Base.metadata.create_all(bind=engine)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    shutdown_hash_pool()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Growth-Wave: Dual-Track HR Platform",
     description="This is the API for the Growth-Wave platform, combining formal evaluations with a growth & culture platform.",
     version="0.1.0"
@@ -32,6 +42,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 # API Routers
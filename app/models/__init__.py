@@ -1,9 +1,9 @@
 from .user import User, UserRole
-from .organization import Organization
+from .organization import Organization, OrganizationClosure
 from .external_account import ExternalAccount, Provider
 from .praise import Praise
 from .strength import StrengthProfile
-from .evaluation import EvaluationWeight, PeerEvaluation, PmEvaluation, QualitativeEvaluation, FinalEvaluation, DepartmentEvaluation
+from .evaluation import EvaluationWeight, PeerEvaluation, PmEvaluation, QualitativeEvaluation, FinalEvaluation, DepartmentEvaluation, DepartmentGradeRatio, PendingScoreRecalculation, PeerScoreAggregate
 from .project import Project
 from .project_member import ProjectMember
 from .collaboration import CollaborationInteraction, InteractionType
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Enum as SQLAlchemyEnum, ForeignKey, Date, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Enum as SQLAlchemyEnum, ForeignKey, Date, UniqueConstraint, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from typing import List
 
@@ -54,7 +54,66 @@ class PeerEvaluation(Base):
             self.score_7,
         ]
 
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # One evaluation per evaluator/evaluatee/project/period; the column order
+        # also serves the evaluator's per-period lookups.
+        UniqueConstraint(
+            'evaluator_id', 'evaluation_period', 'project_id', 'evaluatee_id', name='_peer_evaluation_uc'
+        ),
+        Index('ix_peer_evaluations_evaluatee_period_project', 'evaluatee_id', 'evaluation_period', 'project_id'),
+        {'extend_existing': True}
+    )
+
+class PeerScoreAggregate(Base):
+    """
+    Running totals of the peer evaluations an evaluatee received for one
+    project and period. The peer evaluation upsert path adds each
+    submission's difference in the same transaction as the evaluations.
+    """
+    __tablename__ = "peer_score_aggregates"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    evaluatee_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    project_id: Mapped[int] = mapped_column(Integer, ForeignKey("projects.id"), nullable=False)
+    evaluation_period: Mapped[str] = mapped_column(String, nullable=False)
+    eval_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Sum of the total (all seven criteria) scores
+    score_sum: Mapped[int] = mapped_column(Integer, nullable=False)
+    score_1_sum: Mapped[int] = mapped_column(Integer, nullable=False)
+    score_2_sum: Mapped[int] = mapped_column(Integer, nullable=False)
+    score_3_sum: Mapped[int] = mapped_column(Integer, nullable=False)
+    score_4_sum: Mapped[int] = mapped_column(Integer, nullable=False)
+    score_5_sum: Mapped[int] = mapped_column(Integer, nullable=False)
+    score_6_sum: Mapped[int] = mapped_column(Integer, nullable=False)
+    score_7_sum: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    @property
+    def average_score(self) -> float | None:
+        return self.score_sum / self.eval_count if self.eval_count > 0 else None
+
+    @property
+    def criterion_averages(self) -> List[float] | None:
+        if self.eval_count <= 0:
+            return None
+        return [
+            criterion_sum / self.eval_count
+            for criterion_sum in (
+                self.score_1_sum,
+                self.score_2_sum,
+                self.score_3_sum,
+                self.score_4_sum,
+                self.score_5_sum,
+                self.score_6_sum,
+                self.score_7_sum,
+            )
+        ]
+
+    __table_args__ = (
+        UniqueConstraint(
+            'evaluatee_id', 'evaluation_period', 'project_id', name='_peer_score_aggregate_uc'
+        ),
+        {'extend_existing': True}
+    )
 
 class PmEvaluation(Base):
     __tablename__ = "pm_evaluations"
@@ -71,7 +130,13 @@ class PmEvaluation(Base):
     evaluator = relationship("User", foreign_keys=lambda: PmEvaluation.evaluator_id)
     evaluatee = relationship("User", foreign_keys=lambda: PmEvaluation.evaluatee_id)
 
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        UniqueConstraint(
+            'evaluator_id', 'evaluation_period', 'project_id', 'evaluatee_id', name='_pm_evaluation_uc'
+        ),
+        Index('ix_pm_evaluations_evaluatee_period_project', 'evaluatee_id', 'evaluation_period', 'project_id'),
+        {'extend_existing': True}
+    )
 
 class QualitativeEvaluation(Base):
     __tablename__ = "qualitative_evaluations"
@@ -87,7 +152,13 @@ class QualitativeEvaluation(Base):
     evaluator: Mapped["User"] = relationship("User", foreign_keys=lambda: QualitativeEvaluation.evaluator_id)
     evaluatee: Mapped["User"] = relationship("User", foreign_keys=lambda: QualitativeEvaluation.evaluatee_id)
 
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        UniqueConstraint(
+            'evaluator_id', 'evaluation_period', 'evaluatee_id', name='_qualitative_evaluation_uc'
+        ),
+        Index('ix_qualitative_evaluations_evaluatee_period', 'evaluatee_id', 'evaluation_period'),
+        {'extend_existing': True}
+    )
 
 class FinalEvaluation(Base):
     __tablename__ = "final_evaluations"
@@ -104,7 +175,28 @@ class FinalEvaluation(Base):
 
     evaluatee = relationship("User")
 
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        UniqueConstraint('evaluatee_id', 'evaluation_period', name='_final_evaluation_evaluatee_period_uc'),
+        {'extend_existing': True}
+    )
+
+class PendingScoreRecalculation(Base):
+    """
+    Marks an evaluatee whose FinalEvaluation is stale because one of their
+    peer, PM or qualitative evaluations changed. `version` is bumped on every
+    new change so a recompute only clears the marks it has actually seen.
+    """
+    __tablename__ = "pending_score_recalculations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    evaluatee_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    evaluation_period = Column(String, nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        UniqueConstraint('evaluatee_id', 'evaluation_period', name='_pending_recalc_evaluatee_period_uc'),
+        {'extend_existing': True}
+    )
 
 class EvaluationPeriod(Base):
     __tablename__ = "evaluation_periods"
@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -8,7 +8,7 @@ class Organization(Base):
     __tablename__ = "organizations"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)
     level = Column(Integer, nullable=False)  # 1: 연구소/센터, 2: 실, 3: 팀
 
     parent_id = Column(Integer, ForeignKey("organizations.id"))
@@ -21,3 +21,20 @@ class Organization(Base):
 
     department_evaluations = relationship("DepartmentEvaluation", back_populates="department")
 
+
+
+class OrganizationClosure(Base):
+    """
+    Transitive closure of the organization tree: one row for every
+    (ancestor, descendant) pair, including each organization paired with
+    itself at depth 0. Maintained by the organization CRUD module.
+    """
+    __tablename__ = "organization_closure"
+
+    ancestor_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_organization_closure_descendant_depth", "descendant_id", "depth"),
+    )
@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum as SQLAlchemyEnum
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Enum as SQLAlchemyEnum
 from sqlalchemy.orm import relationship
 import enum
 
@@ -19,9 +19,15 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    full_name = Column(String)
+    full_name = Column(String, index=True)
     title = Column(String, nullable=True)
     role = Column(SQLAlchemyEnum(UserRole), default=UserRole.EMPLOYEE, nullable=False)
+    # Bumped whenever a claim embedded in access tokens (username, role,
+    # organization) changes, so tokens issued before the change stop validating.
+    token_version = Column(Integer, default=0, nullable=False)
+    # SHA-256 of a pending single-use activation token and its expiry (UTC).
+    activation_token_hash = Column(String, unique=True, nullable=True)
+    activation_expires_at = Column(DateTime, nullable=True)
 
     organization_id = Column(Integer, ForeignKey("organizations.id"))
     organization = relationship("Organization", back_populates="members")
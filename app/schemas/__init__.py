@@ -36,6 +36,9 @@ from .evaluation import (
     PmEvaluationDetail,
     MemberToEvaluateQualitatively,
     QualitativeEvaluationData,
+    ScoreWeightSet,
+    ScoreSimulationRequest,
+    ScoreSimulationResult,
 )
 from .report import GrowthAndCultureReport
 from .retrospective import Retrospective, RetrospectiveCreate, RetrospectiveUpdate
@@ -161,6 +161,35 @@ class GradeAdjustmentRequest(BaseModel):
     evaluation_period: str
     adjustments: List[GradeAdjustment]
 
+class GradeQuota(BaseModel):
+    department_id: int
+    department_name: str
+    department_grade: Optional[str] = None
+    headcount: int
+    s_to: Optional[int] = None
+    a_to: Optional[int] = None
+    s_count: int
+    a_count: int
+    b_plus_count: int
+    b_minus_count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class GradeAssignmentRequest(BaseModel):
+    evaluation_period_id: int
+    # Percentage of each department's B candidates given B+, and the same number B-
+    b_split_ratio: float = Field(0.0, ge=0, le=50)
+    dry_run: bool = False
+
+class GradeAssignmentResult(BaseModel):
+    evaluation_period_id: int
+    dry_run: bool
+    assigned_count: int
+    departments: List[GradeQuota]
+    skipped_department_ids: List[int]
+
+    model_config = ConfigDict(from_attributes=True)
+
 class DepartmentGradeRatioCreate(DepartmentGradeRatioBase):
     pass
 
@@ -269,3 +298,50 @@ class MemberToEvaluateQualitatively(BaseModel):
 class QualitativeEvaluationData(BaseModel):
     status: str # "NOT_STARTED", "IN_PROGRESS", "COMPLETED"
     members_to_evaluate: List[MemberToEvaluateQualitatively]
+
+
+# Schemas for the What-if Score Simulation
+class ScoreWeightSet(BaseModel):
+    name: Optional[str] = None
+    peer_weight: float = Field(50, ge=0)
+    pm_weight: float = Field(50, ge=0)
+    project_ratio: float = Field(0.7, ge=0)
+    qualitative_ratio: float = Field(0.3, ge=0)
+
+
+class ScoreSimulationRequest(BaseModel):
+    weight_sets: List[ScoreWeightSet] = Field(..., min_length=1, max_length=20)
+    # Share (%) of users graded S and A, used to place the grade boundaries.
+    s_ratio: float = Field(10.0, ge=0, le=100)
+    a_ratio: float = Field(20.0, ge=0, le=100)
+
+
+class GradeBoundaries(BaseModel):
+    # Lowest final score still inside the grade; None when the grade has no slots.
+    s_min_score: Optional[float] = None
+    a_min_score: Optional[float] = None
+
+
+class SimulatedUserScore(BaseModel):
+    evaluatee_id: int
+    baseline_score: float
+    simulated_score: float
+    delta: float
+
+
+class ScoreSimulationScenario(BaseModel):
+    name: Optional[str] = None
+    weights: ScoreWeightSet
+    mean_score: float
+    min_score: float
+    max_score: float
+    boundaries: GradeBoundaries
+    boundary_shift: GradeBoundaries
+    users: List[SimulatedUserScore]
+
+
+class ScoreSimulationResult(BaseModel):
+    evaluation_period: str
+    user_count: int
+    baseline: ScoreSimulationScenario
+    scenarios: List[ScoreSimulationScenario]
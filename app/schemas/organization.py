@@ -17,6 +17,25 @@ class Organization(BaseModel):
 # Update forward reference
 Organization.model_rebuild()
 
+class OrganizationTreeNode(BaseModel):
+    """
+    One node of the nested organization chart. `member_count` counts the
+    organization's own members and `subtree_member_count` those of its whole
+    subtree. `child_count` is kept when `children` is cut off by a depth
+    limit, so clients know which nodes can be expanded.
+    """
+    id: int
+    name: str
+    level: int
+    parent_id: Optional[int] = None
+    member_count: int = 0
+    subtree_member_count: int = 0
+    child_count: int = 0
+    children: List["OrganizationTreeNode"] = []
+
+
+OrganizationTreeNode.model_rebuild()
+
 class OrganizationCreate(BaseModel):
     name: str
 
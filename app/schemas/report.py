@@ -31,6 +31,8 @@ class ProjectEvaluationDetail(BaseModel):
     project_name: str
     participation_weight: int
     peer_evaluation_score: Optional[float] = None
+    # Average of each of the seven peer evaluation criteria
+    peer_criterion_scores: Optional[List[float]] = None
     pm_evaluation_score: Optional[float] = None
     peer_feedback: List[str] = []
 
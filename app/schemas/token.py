@@ -1,3 +1,5 @@
+from datetime import datetime
+
 
 from pydantic import BaseModel
 
@@ -8,3 +10,13 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: str | None = None
     role: str | None = None
+
+class AccountActivation(BaseModel):
+    token: str
+    password: str
+
+class ActivationToken(BaseModel):
+    username: str
+    email: str
+    activation_token: str
+    expires_at: datetime
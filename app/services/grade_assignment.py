@@ -0,0 +1,66 @@
+"""
+Vectorized grade assignment kernel.
+
+Input is one row per graded evaluation (department index, final score,
+evaluatee id) plus per-department S and A caps. All rows are ordered once
+with `np.lexsort` by (department, score descending, evaluatee id), which
+makes each department a contiguous run ranked best first, with ties broken
+by the lower evaluatee id so the result never depends on row order. Grades
+then follow from each row's rank within its run:
+
+- the first `s_cap` rows get S, the next `a_cap` rows get A,
+- the remaining rows are B candidates; optionally the top and the bottom
+  `b_split_ratio` percent of them get B+ and B- (always the same number,
+  so the B+/B- balance holds), the rest B.
+"""
+import numpy as np
+
+GRADE_LABELS = np.array(["S", "A", "B+", "B", "B-"], dtype=object)
+S, A, B_PLUS, B, B_MINUS = range(len(GRADE_LABELS))
+
+
+def rank_within_departments(dept_index: np.ndarray, scores: np.ndarray, tie_keys: np.ndarray):
+    """
+    Returns (order, rank): `order` sorts the rows by department, score
+    descending and tie key, and `rank[i]` is the 0-based rank of row
+    `order[i]` inside its department.
+    """
+    order = np.lexsort((tie_keys, -scores, dept_index))
+    sorted_dept = dept_index[order]
+    starts = np.searchsorted(sorted_dept, sorted_dept, side="left")
+    return order, np.arange(len(order)) - starts
+
+
+def assign_grade_codes(
+    dept_index: np.ndarray,
+    scores: np.ndarray,
+    tie_keys: np.ndarray,
+    s_caps: np.ndarray,
+    a_caps: np.ndarray,
+    b_split_ratio: float = 0.0,
+) -> np.ndarray:
+    """
+    Grade code (index into GRADE_LABELS) for every row. `dept_index` holds
+    0-based department indices into `s_caps`/`a_caps`.
+    """
+    codes = np.full(len(scores), B, dtype=np.int8)
+    if len(scores) == 0:
+        return codes
+    order, rank = rank_within_departments(dept_index, scores, tie_keys)
+    sorted_dept = dept_index[order]
+
+    sizes = np.bincount(dept_index, minlength=len(s_caps))
+    s_used = np.minimum(s_caps, sizes)
+    a_used = np.minimum(a_caps, sizes - s_used)
+    b_count = sizes - s_used - a_used
+    b_split = np.floor(b_count * (b_split_ratio / 100.0)).astype(np.int64)
+
+    row_s, row_a = s_used[sorted_dept], a_used[sorted_dept]
+    b_rank = rank - row_s - row_a
+    sorted_codes = np.full(len(order), B, dtype=np.int8)
+    sorted_codes[rank < row_s] = S
+    sorted_codes[(rank >= row_s) & (b_rank < 0)] = A
+    sorted_codes[(b_rank >= 0) & (b_rank < b_split[sorted_dept])] = B_PLUS
+    sorted_codes[(b_rank >= 0) & (b_rank >= b_count[sorted_dept] - b_split[sorted_dept])] = B_MINUS
+    codes[order] = sorted_codes
+    return codes
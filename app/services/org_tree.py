@@ -0,0 +1,125 @@
+"""
+Compact in-memory model of the organization tree and user membership.
+
+Organizations are numbered by a depth-first (Euler tour) walk, so each
+subtree occupies one contiguous interval [tin, tout) of the walk. That makes
+"is A an ancestor of B" two integer comparisons and a subtree listing an
+array slice. All lookups are plain arrays indexed by organization or user id
+(ids are dense autoincrement keys), with -1 marking an absent entry.
+"""
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_ABSENT = -1
+
+
+def _id_array(size: int) -> array:
+    return array("i", [_ABSENT]) * size
+
+
+class OrgTree:
+    """
+    Read-only snapshot of the hierarchy built from (organization_id,
+    parent_id) and (user_id, organization_id) pairs. Dangling parents are
+    treated as roots; an organization caught in a parent cycle is walked from
+    the smallest id of the cycle.
+    """
+
+    def __init__(
+        self,
+        organizations: Iterable[Tuple[int, Optional[int]]],
+        users: Iterable[Tuple[int, Optional[int]]],
+    ):
+        orgs = sorted(organizations)
+        org_size = orgs[-1][0] + 1 if orgs else 0
+        org_ids = {org_id for org_id, _ in orgs}
+
+        self._parent = _id_array(org_size)
+        children: Dict[Optional[int], List[int]] = {}
+        for org_id, parent_id in orgs:
+            if parent_id in org_ids:
+                self._parent[org_id] = parent_id
+                children.setdefault(parent_id, []).append(org_id)
+            else:
+                children.setdefault(None, []).append(org_id)
+
+        self._tin = _id_array(org_size)
+        self._tout = _id_array(org_size)
+        self._euler = array("i")
+        # Iterative walk; the hierarchy may be deeper than the recursion limit.
+        for start in children.get(None, []) + [org_id for org_id, _ in orgs]:
+            if self._tin[start] != _ABSENT:
+                continue
+            stack: List[Tuple[int, bool]] = [(start, False)]
+            while stack:
+                org_id, expanded = stack.pop()
+                if expanded:
+                    self._tout[org_id] = len(self._euler)
+                    continue
+                if self._tin[org_id] != _ABSENT:
+                    continue
+                self._tin[org_id] = len(self._euler)
+                self._euler.append(org_id)
+                stack.append((org_id, True))
+                stack.extend((child, False) for child in reversed(children.get(org_id, [])))
+
+        # Users are stored grouped by their organization's position in the
+        # walk, so the members of a subtree are one slice as well.
+        memberships = sorted(users)
+        user_size = memberships[-1][0] + 1 if memberships else 0
+        self._user_org = _id_array(user_size)
+        by_position: List[List[int]] = [[] for _ in range(len(self._euler))]
+        for user_id, org_id in memberships:
+            if org_id is not None and 0 <= org_id < org_size and self._tin[org_id] != _ABSENT:
+                self._user_org[user_id] = org_id
+                by_position[self._tin[org_id]].append(user_id)
+        self._members = array("i")
+        self._member_offsets = array("i", [0])
+        for members in by_position:
+            self._members.extend(members)
+            self._member_offsets.append(len(self._members))
+
+    def __contains__(self, org_id: int) -> bool:
+        return 0 <= org_id < len(self._tin) and self._tin[org_id] != _ABSENT
+
+    def __len__(self) -> int:
+        return len(self._euler)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the lookup arrays."""
+        arrays = (self._parent, self._tin, self._tout, self._euler, self._user_org, self._members, self._member_offsets)
+        return sum(len(a) * a.itemsize for a in arrays)
+
+    def parent_of(self, org_id: int) -> Optional[int]:
+        if org_id not in self or self._parent[org_id] == _ABSENT:
+            return None
+        return self._parent[org_id]
+
+    def org_of(self, user_id: int) -> Optional[int]:
+        if not 0 <= user_id < len(self._user_org) or self._user_org[user_id] == _ABSENT:
+            return None
+        return self._user_org[user_id]
+
+    def is_descendant(self, ancestor_id: Optional[int], org_id: Optional[int]) -> bool:
+        """True if `org_id` is `ancestor_id` or lies anywhere below it."""
+        if ancestor_id is None or org_id is None or ancestor_id not in self or org_id not in self:
+            return False
+        return self._tin[ancestor_id] <= self._tin[org_id] < self._tout[ancestor_id]
+
+    def is_member_of_subtree(self, user_id: int, org_id: Optional[int]) -> bool:
+        return self.is_descendant(org_id, self.org_of(user_id))
+
+    def subtree_org_ids(self, org_id: int) -> List[int]:
+        """`org_id` and every organization below it, in walk order."""
+        if org_id not in self:
+            return []
+        return self._euler[self._tin[org_id]:self._tout[org_id]].tolist()
+
+    def subtree_user_ids(self, org_id: int) -> List[int]:
+        """Users of `org_id` and of every organization below it."""
+        if org_id not in self:
+            return []
+        start = self._member_offsets[self._tin[org_id]]
+        end = self._member_offsets[self._tout[org_id]]
+        return self._members[start:end].tolist()
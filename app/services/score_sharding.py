@@ -0,0 +1,115 @@
+"""
+Partitioning of a period's user population into shards for parallel scoring.
+
+Users are grouped by organization subtree (following `Organization.parent_id`)
+so that a shard covers whole centers/departments/teams where possible. A
+subtree larger than the per-shard target is split into its child subtrees,
+and the resulting units are spread over the shards largest-first, each one
+going to the currently lightest shard.
+"""
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Users without an organization are grouped under this pseudo-unit.
+UNASSIGNED_ORGANIZATION = None
+
+
+def _subtree_sizes(
+    children: Dict[Optional[int], List[int]], direct_members: Dict[Optional[int], List[int]], roots: List[int]
+) -> Dict[int, int]:
+    sizes: Dict[int, int] = {}
+    # Iterative post-order walk; the hierarchy may be deeper than the recursion limit.
+    stack: List[Tuple[int, bool]] = [(root, False) for root in roots]
+    while stack:
+        org_id, expanded = stack.pop()
+        if expanded:
+            sizes[org_id] = len(direct_members.get(org_id, [])) + sum(
+                sizes[child] for child in children.get(org_id, [])
+            )
+        else:
+            stack.append((org_id, True))
+            stack.extend((child, False) for child in children.get(org_id, []))
+    return sizes
+
+
+def _collect_subtree_members(
+    org_id: int, children: Dict[Optional[int], List[int]], direct_members: Dict[Optional[int], List[int]]
+) -> List[int]:
+    members: List[int] = []
+    stack = [org_id]
+    while stack:
+        current = stack.pop()
+        members.extend(direct_members.get(current, []))
+        stack.extend(children.get(current, []))
+    return members
+
+
+def partition_users_by_organization(
+    organizations: Iterable[Tuple[int, Optional[int]]],
+    users: Iterable[Tuple[int, Optional[int]]],
+    shard_count: int,
+) -> List[List[int]]:
+    """
+    Splits users into at most `shard_count` shards along organization subtrees.
+
+    `organizations` are (organization_id, parent_id) pairs and `users` are
+    (user_id, organization_id) pairs. Returns the non-empty shards, each a
+    sorted list of user ids. Every user appears in exactly one shard.
+    """
+    shard_count = max(1, shard_count)
+
+    org_ids = set()
+    children: Dict[Optional[int], List[int]] = {}
+    parents: Dict[int, Optional[int]] = {}
+    for org_id, parent_id in organizations:
+        org_ids.add(org_id)
+        parents[org_id] = parent_id
+    for org_id in sorted(org_ids):
+        parent_id = parents[org_id]
+        # Dangling parents are treated as roots.
+        children.setdefault(parent_id if parent_id in org_ids else None, []).append(org_id)
+
+    direct_members: Dict[Optional[int], List[int]] = {}
+    total = 0
+    for user_id, org_id in users:
+        direct_members.setdefault(org_id if org_id in org_ids else UNASSIGNED_ORGANIZATION, []).append(user_id)
+        total += 1
+    if total == 0:
+        return []
+
+    roots = children.get(None, [])
+    sizes = _subtree_sizes(children, direct_members, roots)
+    target = -(-total // shard_count)
+
+    # Break the hierarchy into units no larger than the target where possible.
+    units: List[List[int]] = []
+    pending = list(roots)
+    while pending:
+        org_id = pending.pop()
+        if sizes[org_id] == 0:
+            continue
+        if sizes[org_id] > target and children.get(org_id):
+            own_members = direct_members.get(org_id, [])
+            if own_members:
+                units.append(list(own_members))
+            pending.extend(children[org_id])
+        else:
+            units.append(_collect_subtree_members(org_id, children, direct_members))
+
+    unassigned = list(direct_members.get(UNASSIGNED_ORGANIZATION, []))
+    # Organizations caught in a parent cycle are unreachable from any root.
+    for org_id in sorted(org_ids - sizes.keys()):
+        unassigned.extend(direct_members.get(org_id, []))
+    for start in range(0, len(unassigned), target):
+        units.append(unassigned[start:start + target])
+
+    # Longest-processing-time-first assignment.
+    units.sort(key=lambda unit: (-len(unit), min(unit)))
+    heap = [(0, index) for index in range(shard_count)]
+    shards: List[List[int]] = [[] for _ in range(shard_count)]
+    for unit in units:
+        load, index = heapq.heappop(heap)
+        shards[index].extend(unit)
+        heapq.heappush(heap, (load + len(unit), index))
+
+    return [sorted(shard) for shard in shards if shard]
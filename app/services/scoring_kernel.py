@@ -0,0 +1,134 @@
+"""
+Vectorized scoring kernel for the final evaluation formula.
+
+The kernel works on columnar arrays instead of ORM objects:
+
+- one row per project membership (user index, participation weight,
+  average peer score, PM score), and
+- one value per user (PM-role flag, first PM score, qualitative components).
+
+Every user's peer/PM/qualitative/final score is produced in a few passes over
+those arrays, applying exactly the same arithmetic as the per-user path in
+`app.crud.evaluation_calculator`.
+"""
+import math
+from dataclasses import dataclass
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+# qualitative_score (max 20) + department_contribution_score (max 10)
+QUALITATIVE_MAX_SCORE = 30.0
+
+
+@dataclass(frozen=True)
+class ScoreWeights:
+    """Weights of the final score formula."""
+    # Split of the project component between peer and PM evaluations
+    peer_weight: float = 50
+    pm_weight: float = 50
+    # Split of the final score between the project and qualitative components
+    project_ratio: float = 0.7
+    qualitative_ratio: float = 0.3
+
+
+DEFAULT_SCORE_WEIGHTS = ScoreWeights()
+
+
+@dataclass
+class ScoreColumns:
+    """Columnar input of the kernel."""
+    user_count: int
+    # Per membership row
+    row_user: np.ndarray        # int index into the per-user arrays
+    row_weight: np.ndarray      # participation weight / 100
+    row_peer_avg: np.ndarray    # average peer score, 0 when missing
+    row_pm_score: np.ndarray    # PM score for that project, 0 when missing
+    # Per user
+    is_pm_role: np.ndarray      # bool
+    first_pm_score: np.ndarray  # first PM score across projects, 0 when missing
+    qualitative_score: np.ndarray
+    department_contribution_score: np.ndarray
+
+
+class ScoreArrays(NamedTuple):
+    peer_score: np.ndarray
+    pm_score: np.ndarray
+    qualitative_score: np.ndarray
+    final_score: np.ndarray
+
+
+def combine_components(
+    peer_score: np.ndarray,
+    pm_score: np.ndarray,
+    qualitative_score: np.ndarray,
+    weights: ScoreWeights = DEFAULT_SCORE_WEIGHTS,
+) -> np.ndarray:
+    """
+    Applies the peer/PM project split and the project/qualitative blend to
+    participation-weighted scores. Works on scalars and arrays alike.
+    """
+    project_score = 0
+    if (weights.peer_weight + weights.pm_weight) > 0:
+        normalized_peer_weight = weights.peer_weight / (weights.peer_weight + weights.pm_weight)
+        normalized_pm_weight = weights.pm_weight / (weights.peer_weight + weights.pm_weight)
+        project_score = (peer_score * normalized_peer_weight) + (pm_score * normalized_pm_weight)
+
+    qualitative_normalized_score = (qualitative_score / QUALITATIVE_MAX_SCORE) * 100
+
+    return (project_score * weights.project_ratio) + (qualitative_normalized_score * weights.qualitative_ratio)
+
+
+def compute_component_scores(columns: ScoreColumns) -> ScoreArrays:
+    """
+    Computes the participation-weighted peer and PM scores and the combined
+    qualitative score of every user. These do not depend on the formula
+    weights, so they can be reused across several `combine_components` calls.
+    """
+    n = columns.user_count
+    # np.bincount accumulates rows in input order, which keeps the float sums
+    # identical to the sequential per-user loop.
+    peer_score = np.bincount(
+        columns.row_user, weights=columns.row_peer_avg * columns.row_weight, minlength=n
+    )
+    project_pm_score = np.bincount(
+        columns.row_user, weights=columns.row_pm_score * columns.row_weight, minlength=n
+    )
+    # PM roles are scored with a single, unweighted PM evaluation.
+    pm_score = np.where(columns.is_pm_role, columns.first_pm_score, project_pm_score)
+    qualitative_score = columns.qualitative_score + columns.department_contribution_score
+
+    return ScoreArrays(
+        peer_score=peer_score,
+        pm_score=pm_score,
+        qualitative_score=qualitative_score,
+        final_score=np.zeros(n),
+    )
+
+
+def compute_scores(
+    columns: ScoreColumns, weights: ScoreWeights = DEFAULT_SCORE_WEIGHTS
+) -> ScoreArrays:
+    """Computes every user's peer, PM, qualitative and final score."""
+    components = compute_component_scores(columns)
+    return components._replace(
+        final_score=combine_components(
+            components.peer_score, components.pm_score, components.qualitative_score, weights
+        )
+    )
+
+
+def grade_boundaries(
+    final_scores: np.ndarray, ratios: Sequence[float]
+) -> list[Optional[float]]:
+    """
+    Returns, for each cumulative grade ratio (in %), the lowest final score
+    that still falls inside the grade when users are ranked by score. Slot
+    counts are floored like the grade TO. None means the grade has no slots.
+    """
+    ranked = np.sort(np.asarray(final_scores, dtype=float))[::-1]
+    boundaries: list[Optional[float]] = []
+    for ratio in ratios:
+        slots = min(math.floor(len(ranked) * (ratio / 100.0)), len(ranked))
+        boundaries.append(float(ranked[slots - 1]) if slots > 0 else None)
+    return boundaries
@@ -0,0 +1,15 @@
+BEGIN TRANSACTION;
+
+CREATE TABLE pending_score_recalculations (
+    id INTEGER NOT NULL,
+    evaluatee_id INTEGER NOT NULL,
+    evaluation_period VARCHAR NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (id),
+    FOREIGN KEY(evaluatee_id) REFERENCES users (id),
+    CONSTRAINT _pending_recalc_evaluatee_period_uc UNIQUE (evaluatee_id, evaluation_period)
+);
+
+CREATE INDEX ix_pending_score_recalculations_id ON pending_score_recalculations (id);
+
+COMMIT;
@@ -0,0 +1,43 @@
+-- Migration: Composite indexes and uniqueness on the evaluation tables
+--
+-- 1. Removes duplicate evaluations, keeping the oldest row (the one reads already returned).
+-- 2. Adds unique indexes for one evaluation per evaluator/evaluatee/project/period
+--    (qualitative: evaluator/evaluatee/period, final: evaluatee/period) and composite
+--    indexes for the evaluatee-side lookups.
+--
+-- NOTE: SQLite cannot add table constraints with ALTER TABLE; the unique indexes below
+-- are equivalent to the UniqueConstraints declared on the models.
+
+BEGIN TRANSACTION;
+
+-- Step 1: Remove duplicates
+DELETE FROM peer_evaluations WHERE id NOT IN (
+    SELECT MIN(id) FROM peer_evaluations
+    GROUP BY evaluator_id, evaluation_period, project_id, evaluatee_id
+);
+DELETE FROM pm_evaluations WHERE id NOT IN (
+    SELECT MIN(id) FROM pm_evaluations
+    GROUP BY evaluator_id, evaluation_period, project_id, evaluatee_id
+);
+DELETE FROM qualitative_evaluations WHERE id NOT IN (
+    SELECT MIN(id) FROM qualitative_evaluations
+    GROUP BY evaluator_id, evaluation_period, evaluatee_id
+);
+DELETE FROM final_evaluations WHERE id NOT IN (
+    SELECT MIN(id) FROM final_evaluations
+    GROUP BY evaluatee_id, evaluation_period
+);
+
+-- Step 2: Uniqueness and composite indexes
+CREATE UNIQUE INDEX _peer_evaluation_uc ON peer_evaluations (evaluator_id, evaluation_period, project_id, evaluatee_id);
+CREATE INDEX ix_peer_evaluations_evaluatee_period_project ON peer_evaluations (evaluatee_id, evaluation_period, project_id);
+
+CREATE UNIQUE INDEX _pm_evaluation_uc ON pm_evaluations (evaluator_id, evaluation_period, project_id, evaluatee_id);
+CREATE INDEX ix_pm_evaluations_evaluatee_period_project ON pm_evaluations (evaluatee_id, evaluation_period, project_id);
+
+CREATE UNIQUE INDEX _qualitative_evaluation_uc ON qualitative_evaluations (evaluator_id, evaluation_period, evaluatee_id);
+CREATE INDEX ix_qualitative_evaluations_evaluatee_period ON qualitative_evaluations (evaluatee_id, evaluation_period);
+
+CREATE UNIQUE INDEX _final_evaluation_evaluatee_period_uc ON final_evaluations (evaluatee_id, evaluation_period);
+
+COMMIT;
@@ -0,0 +1,40 @@
+BEGIN TRANSACTION;
+
+CREATE TABLE peer_score_aggregates (
+    id INTEGER NOT NULL,
+    evaluatee_id INTEGER NOT NULL,
+    project_id INTEGER NOT NULL,
+    evaluation_period VARCHAR NOT NULL,
+    eval_count INTEGER NOT NULL,
+    score_sum INTEGER NOT NULL,
+    score_1_sum INTEGER NOT NULL,
+    score_2_sum INTEGER NOT NULL,
+    score_3_sum INTEGER NOT NULL,
+    score_4_sum INTEGER NOT NULL,
+    score_5_sum INTEGER NOT NULL,
+    score_6_sum INTEGER NOT NULL,
+    score_7_sum INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(evaluatee_id) REFERENCES users (id),
+    FOREIGN KEY(project_id) REFERENCES projects (id),
+    CONSTRAINT _peer_score_aggregate_uc UNIQUE (evaluatee_id, evaluation_period, project_id)
+);
+
+CREATE INDEX ix_peer_score_aggregates_id ON peer_score_aggregates (id);
+
+-- Backfill from the existing peer evaluations
+INSERT INTO peer_score_aggregates (
+    evaluatee_id, project_id, evaluation_period, eval_count, score_sum,
+    score_1_sum, score_2_sum, score_3_sum, score_4_sum, score_5_sum, score_6_sum, score_7_sum
+)
+SELECT
+    evaluatee_id,
+    project_id,
+    evaluation_period,
+    COUNT(id),
+    SUM(score_1 + score_2 + score_3 + score_4 + score_5 + score_6 + score_7),
+    SUM(score_1), SUM(score_2), SUM(score_3), SUM(score_4), SUM(score_5), SUM(score_6), SUM(score_7)
+FROM peer_evaluations
+GROUP BY evaluatee_id, project_id, evaluation_period;
+
+COMMIT;
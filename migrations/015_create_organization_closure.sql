@@ -0,0 +1,28 @@
+-- Migration: Closure table for the organization hierarchy
+--
+-- One row per (ancestor, descendant) pair, including each organization paired with
+-- itself at depth 0, backfilled from organizations.parent_id.
+
+BEGIN TRANSACTION;
+
+CREATE TABLE organization_closure (
+    ancestor_id INTEGER NOT NULL,
+    descendant_id INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id),
+    FOREIGN KEY(ancestor_id) REFERENCES organizations (id) ON DELETE CASCADE,
+    FOREIGN KEY(descendant_id) REFERENCES organizations (id) ON DELETE CASCADE
+);
+
+CREATE INDEX ix_organization_closure_descendant_depth ON organization_closure (descendant_id, depth);
+
+INSERT INTO organization_closure (ancestor_id, descendant_id, depth)
+WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM organizations
+    UNION ALL
+    SELECT tree.ancestor_id, o.id, tree.depth + 1
+    FROM tree JOIN organizations o ON o.parent_id = tree.descendant_id
+)
+SELECT ancestor_id, descendant_id, depth FROM tree;
+
+COMMIT;
@@ -0,0 +1,10 @@
+-- Migration: Indexes behind the paginated user and organization listings
+--
+-- Organizations are paged by (name, id) and both listings filter on a name prefix.
+
+BEGIN TRANSACTION;
+
+CREATE INDEX IF NOT EXISTS ix_organizations_name ON organizations (name);
+CREATE INDEX IF NOT EXISTS ix_users_full_name ON users (full_name);
+
+COMMIT;
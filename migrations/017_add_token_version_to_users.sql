@@ -0,0 +1,10 @@
+-- Migration: Token version counter on users
+--
+-- Access tokens embed the user's token_version; it is bumped on role,
+-- organization or username changes so that older tokens stop validating.
+
+BEGIN TRANSACTION;
+
+ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0;
+
+COMMIT;
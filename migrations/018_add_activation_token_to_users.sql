@@ -0,0 +1,16 @@
+-- Migration: Single-use activation tokens for provisioned accounts
+--
+-- Accounts awaiting activation store only the SHA-256 of their activation
+-- token and its expiry. The cheap sha256_crypt pending credentials are no
+-- longer accepted: they are replaced with an unusable password, and such
+-- accounts need an activation token issued via POST /users/{id}/activation-token.
+
+BEGIN TRANSACTION;
+
+ALTER TABLE users ADD COLUMN activation_token_hash VARCHAR;
+ALTER TABLE users ADD COLUMN activation_expires_at DATETIME;
+CREATE UNIQUE INDEX ix_users_activation_token_hash ON users (activation_token_hash);
+
+UPDATE users SET hashed_password = '!' WHERE hashed_password LIKE '$5$%';
+
+COMMIT;
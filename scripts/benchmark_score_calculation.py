@@ -0,0 +1,145 @@
+"""
+Benchmark of the period-wide final score calculation across shard counts.
+
+Seeds a throwaway SQLite database with a synthetic organization, users,
+projects and evaluations, then times `calculate_scores_for_period` for each
+shard count and checks that every run stores the same scores.
+
+Usage:
+    python scripts/benchmark_score_calculation.py --users 20000 --shards 1 2 4 8
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--teams-per-dept", type=int, default=8)
+    parser.add_argument("--depts", type=int, default=16)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def _seed(db, models, *, user_count, depts, teams_per_dept, period_name, rng):
+    from datetime import date
+    from sqlalchemy import insert
+    from app.models.evaluation import EvaluationPeriod
+    from app import crud
+
+    db.execute(insert(EvaluationPeriod), [
+        {"id": 1, "name": period_name, "start_date": date(2025, 1, 1), "end_date": date(2025, 6, 30)}
+    ])
+
+    organizations = [{"id": 1, "name": "center", "level": 1, "parent_id": None}]
+    team_ids = []
+    for d in range(depts):
+        dept_id = len(organizations) + 1
+        organizations.append({"id": dept_id, "name": f"dept-{d}", "level": 2, "parent_id": 1})
+        for t in range(teams_per_dept):
+            team_id = len(organizations) + 1
+            organizations.append({"id": team_id, "name": f"team-{d}-{t}", "level": 3, "parent_id": dept_id})
+            team_ids.append(team_id)
+    db.execute(insert(models.Organization), organizations)
+
+    users = []
+    for user_id in range(1, user_count + 1):
+        users.append({
+            "id": user_id,
+            "username": f"user{user_id}",
+            "email": f"user{user_id}@example.com",
+            "hashed_password": "x",
+            "full_name": f"User {user_id}",
+            "role": models.UserRole.TEAM_LEAD if user_id % 10 == 0 else models.UserRole.EMPLOYEE,
+            "organization_id": team_ids[user_id % len(team_ids)],
+        })
+    db.execute(insert(models.User), users)
+
+    # One project per team; every user works on their team's project and one other.
+    db.execute(insert(models.Project), [
+        {"id": team_id, "name": f"project-{team_id}", "evaluation_period_id": 1}
+        for team_id in team_ids
+    ])
+    members, peers, pms, qualitatives = [], [], [], []
+    for user in users:
+        own_project = user["organization_id"]
+        other_project = rng.choice(team_ids)
+        projects = [(own_project, 70), (other_project, 30)] if other_project != own_project else [(own_project, 100)]
+        for project_id, weight in projects:
+            members.append({"project_id": project_id, "user_id": user["id"], "participation_weight": weight, "is_pm": False})
+            for evaluator_id in rng.sample(range(1, user_count + 1), 3):
+                scores = {f"score_{i}": rng.randint(0, 10) for i in range(1, 8)}
+                peers.append({
+                    "project_id": project_id, "evaluator_id": evaluator_id,
+                    "evaluatee_id": user["id"], "evaluation_period": period_name, **scores,
+                })
+            pms.append({
+                "project_id": project_id, "evaluator_id": rng.randint(1, user_count),
+                "evaluatee_id": user["id"], "evaluation_period": period_name, "score": rng.randint(0, 100),
+            })
+        qualitatives.append({
+            "evaluator_id": rng.randint(1, user_count), "evaluatee_id": user["id"],
+            "evaluation_period": period_name, "qualitative_score": rng.randint(0, 20),
+            "department_contribution_score": rng.randint(0, 10),
+        })
+    db.execute(insert(models.ProjectMember), members)
+    db.execute(insert(models.PeerEvaluation), peers)
+    db.execute(insert(models.PmEvaluation), pms)
+    db.execute(insert(models.QualitativeEvaluation), qualitatives)
+    crud.peer_evaluation.peer_evaluation.refresh_score_aggregates(
+        db, keys={(peer["evaluatee_id"], peer["project_id"]) for peer in peers}, evaluation_period=period_name
+    )
+    db.commit()
+
+
+def main():
+    args = _parse_args()
+    workdir = tempfile.mkdtemp(prefix="score-benchmark-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import app.main  # noqa: F401  registers every model
+    from app import models
+    from app.core.database import Base, SessionLocal, engine
+    from app.crud import evaluation_calculator
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    period_name = "benchmark"
+    started = time.perf_counter()
+    _seed(
+        db, models, user_count=args.users, depts=args.depts, teams_per_dept=args.teams_per_dept,
+        period_name=period_name, rng=random.Random(args.seed),
+    )
+    print(f"seeded {args.users} users in {time.perf_counter() - started:.1f}s ({workdir})")
+
+    reference = None
+    baseline = None
+    for shard_count in args.shards:
+        started = time.perf_counter()
+        evaluation_calculator.calculate_scores_for_period(db, period_id=1, shard_count=shard_count)
+        elapsed = time.perf_counter() - started
+
+        scores = [
+            tuple(row) for row in db.query(
+                models.FinalEvaluation.evaluatee_id, models.FinalEvaluation.final_score
+            ).order_by(models.FinalEvaluation.evaluatee_id)
+        ]
+        if reference is None:
+            reference, baseline = scores, elapsed
+        status = "ok" if scores == reference else "MISMATCH"
+        print(
+            f"shards={shard_count:<3} {elapsed:7.2f}s  {args.users / elapsed:9.0f} users/s  "
+            f"speedup x{baseline / elapsed:4.2f}  {status}"
+        )
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -28,3 +28,157 @@ def test_login_for_access_token(client: TestClient, db: Session):
     token = response.json()
     assert "access_token" in token
     assert token["token_type"] == "bearer"
+
+
+def test_activation_token_sets_the_password_once(client: TestClient, db: Session, superuser_token_headers):
+    from app.core.security import UNUSABLE_PASSWORD
+    from tests.utils.user import create_random_user
+
+    user = create_random_user(db)
+    user.hashed_password = UNUSABLE_PASSWORD
+    db.commit()
+    assert client.post("/api/v1/auth/token", data={"username": user.username, "password": "password"}).status_code == 401
+
+    response = client.post(f"/api/v1/users/{user.id}/activation-token", headers=superuser_token_headers)
+    assert response.status_code == 200
+    token = response.json()["activation_token"]
+    db.refresh(user)
+    assert user.activation_token_hash and token not in user.activation_token_hash
+
+    activation = {"token": token, "password": "chosenpassword"}
+    assert client.post("/api/v1/auth/activate", json=activation).status_code == 204
+    db.refresh(user)
+    assert user.hashed_password.startswith("$2b$")
+    assert user.activation_token_hash is None
+    assert client.post("/api/v1/auth/token", data={"username": user.username, "password": "chosenpassword"}).status_code == 200
+    assert client.post("/api/v1/auth/activate", json={**activation, "password": "other"}).status_code == 400
+
+
+def test_pool_provisioning_keeps_order_and_hashes_small_batches_inline(monkeypatch):
+    import random
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from app.core import security
+
+    pools = []
+
+    def fake_pool():
+        pools.append(ThreadPoolExecutor(max_workers=4))
+        return pools[-1]
+
+    def slow_hash(password):
+        time.sleep(random.random() / 100)
+        return f"hashed:{password}"
+
+    monkeypatch.setattr(settings, "PASSWORD_PROVISIONING_MODE", "pool")
+    monkeypatch.setattr(security, "_get_hash_pool", fake_pool)
+    monkeypatch.setattr(security, "get_password_hash", slow_hash)
+
+    assert security.hash_provisioned_passwords(["only"]) == ["hashed:only"]
+    assert pools == []
+
+    passwords = [f"password-{i}" for i in range(security.POOL_MIN_BATCH_SIZE * 4)]
+    assert security.hash_provisioned_passwords(passwords) == [f"hashed:{p}" for p in passwords]
+    assert len(pools) == 1
+    pools[0].shutdown()
+
+
+def test_principal_cache_skips_the_user_lookup_until_the_user_changes(client: TestClient, db: Session):
+    from sqlalchemy import event
+    from tests.utils.user import authentication_token_from_username, create_random_user
+
+    user = create_random_user(db, role=UserRole.EMPLOYEE)
+    headers = authentication_token_from_username(client=client, username=user.username, db=db)
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        response = client.get("/api/v1/users/me", headers=headers)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+    assert response.json()["id"] == user.id
+    assert not [s for s in statements if "FROM users" in s]
+
+    crud_user.update(db, db_obj=user, obj_in={"role": UserRole.TEAM_LEAD})
+    assert client.get("/api/v1/users/me", headers=headers).json()["role"] == UserRole.TEAM_LEAD.value
+
+    crud_user.remove(db, id=user.id)
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 401
+
+
+def test_claims_fast_path_authorizes_without_queries_until_the_token_version_changes(
+    client: TestClient, db: Session, monkeypatch
+):
+    from sqlalchemy import event
+    from tests.utils.user import authentication_token_from_username, create_random_user
+
+    monkeypatch.setattr(settings, "AUTH_CLAIMS_FAST_PATH", True)
+    admin = create_random_user(db, role=UserRole.ADMIN)
+    headers = authentication_token_from_username(client=client, username=admin.username, db=db)
+    assert client.get("/api/v1/auth/login-metrics", headers=headers).status_code == 200
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        response = client.get("/api/v1/auth/login-metrics", headers=headers)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+    assert response.status_code == 200
+    assert statements == []
+
+    crud_user.update(db, db_obj=admin, obj_in={"role": UserRole.EMPLOYEE})
+    assert admin.token_version == 1
+    assert client.get("/api/v1/auth/login-metrics", headers=headers).status_code == 401
+
+    headers = authentication_token_from_username(client=client, username=admin.username, db=db)
+    assert client.get("/api/v1/auth/login-metrics", headers=headers).status_code == 403
+    assert client.get("/api/v1/users/me", headers=headers).json()["email"] == admin.email
+
+
+def test_login_is_rejected_with_retry_after_when_verification_is_saturated(client: TestClient, db: Session, monkeypatch):
+    from app.core.password_verification import password_verifier
+    from tests.utils.user import authentication_token_from_username, create_random_user
+
+    admin = create_random_user(db, role=UserRole.ADMIN)
+    admin_headers = authentication_token_from_username(client=client, username=admin.username, db=db)
+
+    monkeypatch.setattr(password_verifier, "max_pending", 0)
+    response = client.post("/api/v1/auth/token", data={"username": admin.username, "password": "password"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(settings.LOGIN_RETRY_AFTER_SECONDS)
+
+    metrics = client.get("/api/v1/auth/login-metrics", headers=admin_headers).json()
+    assert metrics["requests"]["rejected"] >= 1
+    assert metrics["requests"]["success"] >= 1
+    assert metrics["latency_ms"]["max"] is not None
+
+
+def test_password_verifier_rejects_without_queueing_past_its_limit():
+    import asyncio
+    import threading
+
+    import pytest
+
+    from app.core.password_verification import PasswordVerifier, PasswordVerifierSaturated
+
+    release = threading.Event()
+
+    def slow_verify(plain, hashed):
+        release.wait(5)
+        return plain == hashed, None
+
+    verifier = PasswordVerifier(workers=1, max_pending=1, verify=slow_verify)
+
+    async def scenario():
+        first = asyncio.ensure_future(verifier.verify_and_update("secret", "secret"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(PasswordVerifierSaturated):
+            await verifier.verify_and_update("secret", "secret")
+        release.set()
+        assert await first == (True, None)
+        assert verifier.pending == 0
+
+    asyncio.run(scenario())
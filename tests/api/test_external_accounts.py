@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.models.external_account import Provider
+from app.models.user import UserRole
 from tests.utils.user import create_random_user, authentication_token_from_username
 
 def test_create_external_account(client: TestClient, db: Session) -> None:
@@ -89,3 +90,30 @@ def test_delete_other_user_account_fails(client: TestClient, db: Session) -> Non
     delete_response = client.delete(f"{settings.API_V1_STR}/external-accounts/{account_id}", headers=headers2)
     
     assert delete_response.status_code == 403 # Forbidden
+
+def test_rotate_credentials_re_encrypts_with_the_primary_key(client: TestClient, db: Session, monkeypatch) -> None:
+    from cryptography.fernet import Fernet, MultiFernet
+    from app.core import security
+    from app.models.external_account import ExternalAccount
+
+    user = create_random_user(db)
+    headers = authentication_token_from_username(client=client, username=user.username, db=db)
+    for token in ("token1", "token2", "token3"):
+        client.post(f"{settings.API_V1_STR}/external-accounts", headers=headers, json={
+            "provider": "jira", "account_id": f"{token}@test.com", "credentials": token
+        })
+
+    old_key, new_key = security.fernet._fernets[0], Fernet(Fernet.generate_key())
+    monkeypatch.setattr(security, "fernet", MultiFernet([new_key, old_key]))
+    admin = create_random_user(db, role=UserRole.ADMIN)
+    admin_headers = authentication_token_from_username(client=client, username=admin.username, db=db)
+
+    assert client.post(f"{settings.API_V1_STR}/external-accounts/rotate-credentials", headers=headers).status_code == 403
+    monkeypatch.setattr(settings, "CREDENTIAL_ROTATION_BATCH_SIZE", 2)
+    response = client.post(f"{settings.API_V1_STR}/external-accounts/rotate-credentials", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json() == {"rotated": 3, "skipped": 0, "failed": 0}
+
+    db.expire_all()
+    accounts = db.query(ExternalAccount).filter(ExternalAccount.owner_id == user.id).order_by(ExternalAccount.id)
+    assert [new_key.decrypt(a.encrypted_credentials.encode()).decode() for a in accounts] == ["token1", "token2", "token3"]
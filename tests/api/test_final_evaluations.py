@@ -180,4 +180,40 @@ def test_calculate_final_evaluations_unauthorized(
 
     # 3. Assert
     assert response.status_code == 403
-    assert "Not enough privileges" in response.json()["detail"]
\ No newline at end of file
+    assert "Not enough privileges" in response.json()["detail"]
+
+def test_simulate_final_scores_for_period(
+    client: TestClient, db: Session, superuser_token_headers: Dict[str, str]
+) -> None:
+    period = create_random_evaluation_period(db)
+    body = {
+        "weight_sets": [{"name": "peer-heavy", "peer_weight": 80, "pm_weight": 20}],
+        "s_ratio": 10,
+        "a_ratio": 20,
+    }
+
+    response = client.post(
+        f"{settings.API_V1_STR}/evaluations/evaluation-periods/{period.id}/simulate",
+        headers=superuser_token_headers,
+        json=body,
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["evaluation_period"] == period.name
+    assert result["baseline"]["name"] == "current"
+    assert [scenario["name"] for scenario in result["scenarios"]] == ["peer-heavy"]
+    assert len(result["scenarios"][0]["users"]) == result["user_count"]
+
+    response = client.post(
+        f"{settings.API_V1_STR}/evaluations/evaluation-periods/{period.id}/simulate",
+        headers=superuser_token_headers,
+        json={**body, "s_ratio": 60, "a_ratio": 50},
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        f"{settings.API_V1_STR}/evaluations/evaluation-periods/{period.id + 999}/simulate",
+        headers=superuser_token_headers,
+        json=body,
+    )
+    assert response.status_code == 404
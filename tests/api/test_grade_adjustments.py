@@ -1,13 +1,14 @@
 from typing import List
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
-from app import crud
+from app import crud, models
 from app.core.config import settings
 from app.models.user import UserRole
 from tests.utils.user import create_random_user, authentication_token_from_username
 from tests.utils.organization import create_random_organization
-from tests.utils.evaluation import create_random_final_evaluation
+from tests.utils.evaluation import create_random_evaluation_period, create_random_final_evaluation
 
 def test_adjust_grades_as_dept_head_success(client: TestClient, db: Session) -> None:
     # 1. Create a department head and some users in their department
@@ -185,3 +186,148 @@ def test_adjust_grades_exceed_s_grade_to(client: TestClient, db: Session) -> Non
     # 6. Assert failure
     assert response.status_code == 400
     assert "Number of S grades (1) exceeds the limit (0)" in response.text
+
+def _graded_department(db: Session, *, grade: str, s_ratio: float, a_ratio: float, headcount: int):
+    period = create_random_evaluation_period(db)
+    org = create_random_organization(db, level=2)
+    crud.department_grade_ratio.create(db, obj_in={"department_grade": grade, "s_ratio": s_ratio, "a_ratio": a_ratio})
+    db.add(models.DepartmentEvaluation(department_id=org.id, grade=grade, evaluation_period_id=period.id))
+    db.commit()
+    dept_head = create_random_user(db, role=UserRole.DEPT_HEAD, organization_id=org.id)
+    members = [create_random_user(db, organization_id=org.id) for _ in range(headcount - 1)]
+    return period, org, dept_head, members
+
+def test_adjust_grades_writes_all_changes_in_one_update(client: TestClient, db: Session) -> None:
+    period, org, dept_head, members = _graded_department(db, grade="A", s_ratio=20.0, a_ratio=40.0, headcount=5)
+    evals = [
+        create_random_final_evaluation(db, evaluatee_id=m.id, evaluation_period=period.name, final_score=80.0, grade="B")
+        for m in members
+    ]
+    headers = authentication_token_from_username(client=client, username=dept_head.username, db=db)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        response = client.post(f"{settings.API_V1_STR}/evaluations/adjust-grades", headers=headers, json={
+            "evaluation_period": period.name,
+            "adjustments": [
+                {"user_id": members[0].id, "grade": "S"},
+                {"user_id": members[1].id, "grade": "A"},
+                {"user_id": members[2].id, "grade": "B+"},
+                {"user_id": members[3].id, "grade": "B-"},
+            ],
+        })
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    assert [item["grade"] for item in response.json()] == ["S", "A", "B+", "B-"]
+    assert len([s for s in statements if s.lstrip().upper().startswith("UPDATE FINAL_EVALUATIONS")]) == 1
+    for ev in evals:
+        db.refresh(ev)
+    assert [ev.grade for ev in evals] == ["S", "A", "B+", "B-"]
+
+    # A second S exceeds floor(5 * 20%) = 1 and leaves the grades untouched.
+    response = client.post(f"{settings.API_V1_STR}/evaluations/adjust-grades", headers=headers, json={
+        "evaluation_period": period.name,
+        "adjustments": [{"user_id": members[1].id, "grade": "S"}],
+    })
+    assert response.status_code == 400
+    assert "Number of S grades (2) exceeds the limit (1)" in response.text
+
+def test_read_grade_quotas(client: TestClient, db: Session, superuser_token_headers: dict) -> None:
+    period, org, dept_head, members = _graded_department(db, grade="A", s_ratio=20.0, a_ratio=40.0, headcount=5)
+    team = create_random_organization(db, level=3, parent_id=org.id)
+    members.append(create_random_user(db, organization_id=team.id))
+    for member, grade in zip(members, ["S", "A", "B+", "B-", "A"]):
+        create_random_final_evaluation(db, evaluatee_id=member.id, evaluation_period=period.name, final_score=80.0, grade=grade)
+
+    response = client.get(
+        f"{settings.API_V1_STR}/evaluations/grade-quotas",
+        headers=superuser_token_headers,
+        params={"evaluation_period_id": period.id},
+    )
+    assert response.status_code == 200
+    assert response.json() == [{
+        "department_id": org.id, "department_name": org.name, "department_grade": "A", "headcount": 6,
+        "s_to": 1, "a_to": 2, "s_count": 1, "a_count": 2, "b_plus_count": 1, "b_minus_count": 1,
+    }]
+
+    headers = authentication_token_from_username(client=client, username=members[0].username, db=db)
+    response = client.get(
+        f"{settings.API_V1_STR}/evaluations/grade-quotas", headers=headers, params={"evaluation_period_id": period.id}
+    )
+    assert response.status_code == 403
+
+def test_assign_grades_for_period(client: TestClient, db: Session, superuser_token_headers: dict) -> None:
+    # headcount 10 with S 20% / A 30% -> S TO 2, A TO 3; the head's own S uses one S.
+    period, org, dept_head, members = _graded_department(db, grade="S", s_ratio=20.0, a_ratio=30.0, headcount=10)
+    create_random_final_evaluation(db, evaluatee_id=dept_head.id, evaluation_period=period.name, final_score=50.0)
+    scores = [95.0, 90.0, 90.0, 85.0, 80.0, 75.0, 70.0, 65.0, 60.0]
+    evals = [
+        create_random_final_evaluation(db, evaluatee_id=m.id, evaluation_period=period.name, final_score=score)
+        for m, score in zip(members, scores)
+    ]
+
+    body = {"evaluation_period_id": period.id, "b_split_ratio": 25, "dry_run": True}
+    response = client.post(f"{settings.API_V1_STR}/evaluations/assign-grades", headers=superuser_token_headers, json=body)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["assigned_count"], data["dry_run"]) == (10, True)
+    assert [ev.grade for ev in evals] == [None] * 9
+
+    body["dry_run"] = False
+    response = client.post(f"{settings.API_V1_STR}/evaluations/assign-grades", headers=superuser_token_headers, json=body)
+    assert response.status_code == 200
+    quota = next(d for d in response.json()["departments"] if d["department_id"] == org.id)
+    assert (quota["s_to"], quota["a_to"], quota["s_count"], quota["a_count"]) == (2, 3, 2, 3)
+    for ev in evals:
+        db.refresh(ev)
+    # Tied 90s: the lower user id ranks first. Five B candidates, 25% -> one B+ and one B-.
+    assert [ev.grade for ev in evals] == ["S", "A", "A", "A", "B+", "B", "B", "B", "B-"]
+    head_eval = db.query(models.FinalEvaluation).filter(models.FinalEvaluation.evaluatee_id == dept_head.id).one()
+    assert head_eval.grade == "S"
+
+    headers = authentication_token_from_username(client=client, username=dept_head.username, db=db)
+    response = client.post(f"{settings.API_V1_STR}/evaluations/assign-grades", headers=headers, json=body)
+    assert response.status_code == 403
+
+def test_assign_grades_counts_nested_departments_against_the_outer_to(
+    client: TestClient, db: Session, superuser_token_headers: dict
+) -> None:
+    # Outer: 10 people in its subtree, S 20% / A 30% -> S TO 2, A TO 3; its head gets A.
+    period, org, dept_head, members = _graded_department(db, grade="A", s_ratio=20.0, a_ratio=30.0, headcount=5)
+    # Inner: 5 people, S 20% / A 40% -> S TO 1, A TO 2; its head gets S.
+    team = create_random_organization(db, level=3, parent_id=org.id)
+    crud.department_grade_ratio.create(db, obj_in={"department_grade": "S", "s_ratio": 20.0, "a_ratio": 40.0})
+    db.add(models.DepartmentEvaluation(department_id=team.id, grade="S", evaluation_period_id=period.id))
+    db.commit()
+    team_head = create_random_user(db, role=UserRole.DEPT_HEAD, organization_id=team.id)
+    team_members = [create_random_user(db, organization_id=team.id) for _ in range(4)]
+    for head in (dept_head, team_head):
+        create_random_final_evaluation(db, evaluatee_id=head.id, evaluation_period=period.name, final_score=50.0)
+    evals = [
+        create_random_final_evaluation(db, evaluatee_id=m.id, evaluation_period=period.name, final_score=score)
+        for m, score in zip(members + team_members, [95.0, 85.0, 75.0, 65.0, 90.0, 80.0, 70.0, 60.0])
+    ]
+
+    body = {"evaluation_period_id": period.id}
+    response = client.post(f"{settings.API_V1_STR}/evaluations/assign-grades", headers=superuser_token_headers, json=body)
+    assert response.status_code == 200
+    for ev in evals:
+        db.refresh(ev)
+    # The team's S (its head) and two As leave the outer department one S and no A.
+    assert [ev.grade for ev in evals] == ["S", "B", "B", "B", "A", "A", "B", "B"]
+
+    quotas = {d["department_id"]: d for d in response.json()["departments"]}
+    assert [(quotas[id]["s_to"], quotas[id]["a_to"], quotas[id]["s_count"], quotas[id]["a_count"]) for id in (org.id, team.id)] == [
+        (2, 3, 2, 3),
+        (1, 2, 1, 2),
+    ]
+    response = client.get(
+        f"{settings.API_V1_STR}/evaluations/grade-quotas",
+        headers=superuser_token_headers,
+        params={"evaluation_period_id": period.id},
+    )
+    assert {d["department_id"]: d for d in response.json()} == quotas
@@ -33,6 +33,29 @@ def test_read_organizations_by_any_user(client: TestClient, db: Session):
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
+def test_read_organizations_pages_by_name_within_a_subtree(client: TestClient, db: Session):
+    from tests.utils.organization import create_random_organization
+
+    user = create_random_user(db, role='employee')
+    user_token_headers = authentication_token_from_username(client=client, username=user.username, db=db)
+    root = create_random_organization(db, name="Root", level=1)
+    names = ["Delta", "Alpha", "Charlie", "Bravo"]
+    for name in names:
+        create_random_organization(db, name=name, level=2, parent_id=root.id)
+    create_random_organization(db, name="Alpha", level=2)  # outside the subtree
+
+    params = {"root_id": root.id, "level": 2, "limit": 3}
+    response = client.get("/api/v1/organizations/", headers=user_token_headers, params=params)
+    assert response.status_code == 200
+    assert [org["name"] for org in response.json()] == ["Alpha", "Bravo", "Charlie"]
+    assert response.headers["X-Total-Count"] == "4"
+
+    params["cursor"] = response.headers["X-Next-Cursor"]
+    response = client.get("/api/v1/organizations/", headers=user_token_headers, params=params)
+    assert [org["name"] for org in response.json()] == ["Delta"]
+    assert "X-Next-Cursor" not in response.headers
+    assert "X-Total-Count" not in response.headers
+
 def test_upload_organizations_by_admin(client: TestClient, db: Session):
     # 1. Create admin user and get token
     admin = create_random_user(db, role='admin')
@@ -228,4 +251,36 @@ def test_sync_org_chart_by_admin(client: TestClient, db: Session):
     # Verify organization assignment
     assert dept_head.organization.parent_id == center_head.organization.id
     assert team_lead.organization.parent_id == dept_head.organization.id
-    assert emp1.organization_id == team_lead.organization_id
\ No newline at end of file
+    assert emp1.organization_id == team_lead.organization_id
+
+
+def test_read_organization_tree_with_counts_and_depth(client: TestClient, db: Session):
+    from tests.utils.organization import create_random_organization
+
+    center = create_random_organization(db, name="Center", level=1)
+    dept = create_random_organization(db, name="Dept", level=2, parent_id=center.id)
+    team_b = create_random_organization(db, name="Team B", level=3, parent_id=dept.id)
+    team_a = create_random_organization(db, name="Team A", level=3, parent_id=dept.id)
+    user = create_random_user(db, role='employee', organization_id=center.id)
+    for org in (dept, team_a, team_a, team_b):
+        create_random_user(db, role='employee', organization_id=org.id)
+    user_token_headers = authentication_token_from_username(client=client, username=user.username, db=db)
+
+    response = client.get("/api/v1/organizations/tree", headers=user_token_headers)
+    assert response.status_code == 200
+    top = next(node for node in response.json() if node["id"] == center.id)
+    assert (top["member_count"], top["subtree_member_count"], top["child_count"]) == (1, 5, 1)
+    dept_node = top["children"][0]
+    assert [child["name"] for child in dept_node["children"]] == ["Team A", "Team B"]
+    assert [child["subtree_member_count"] for child in dept_node["children"]] == [2, 1]
+
+    response = client.get(
+        "/api/v1/organizations/tree", headers=user_token_headers, params={"root_id": dept.id, "depth": 0}
+    )
+    assert response.json() == [{
+        "id": dept.id, "name": "Dept", "level": 2, "parent_id": center.id,
+        "member_count": 1, "subtree_member_count": 4, "child_count": 2, "children": [],
+    }]
+
+    response = client.get("/api/v1/organizations/tree", headers=user_token_headers, params={"root_id": 999999})
+    assert response.status_code == 404
@@ -1,5 +1,7 @@
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.orm import Session
+from app import crud
 from app.core.config import settings
 import datetime
 from tests.utils.user import create_random_user, authentication_token_from_username
@@ -118,4 +120,42 @@ def test_create_pm_self_evaluation_not_admin(client: TestClient, db: Session) ->
     
     assert response.status_code == 403
     content = response.json()
-    assert content["detail"] == "The user doesn't have enough privileges"
\ No newline at end of file
+    assert content["detail"] == "The user doesn't have enough privileges"
+
+def test_pm_evaluation_submission_recalculates_scores_without_per_row_reloads(
+    client: TestClient, db: Session, monkeypatch
+) -> None:
+    monkeypatch.setattr(settings, "RECALCULATE_SCORES_ON_SUBMIT", True)
+    pm_user = create_random_user(db, password="password")
+    project = create_random_project(db, pm_id=pm_user.id)
+    create_project_member(db, project_id=project.id, user_id=pm_user.id, is_pm=True)
+    members = [create_random_user(db) for _ in range(12)]
+    for member in members:
+        create_project_member(db, project_id=project.id, user_id=member.id)
+    member_ids = [member.id for member in members]
+    headers = authentication_token_from_username(client=client, username=pm_user.username, db=db)
+    data = {
+        "evaluations": [
+            {"project_id": project.id, "evaluatee_id": member_id, "score": 80 + i}
+            for i, member_id in enumerate(member_ids)
+        ]
+    }
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        response = client.post(f"{settings.API_V1_STR}/evaluations/pm-evaluations/", headers=headers, json=data)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    assert [item["score"] for item in response.json()] == [80 + i for i in range(len(member_ids))]
+    # The submitted rows are loaded once, after the single commit that also
+    # refreshes the final scores, instead of one SELECT per expired row.
+    row_reads = [s for s in statements if "SELECT pm_evaluations.id AS" in s]
+    assert len(row_reads) == 1
+    assert "pm_evaluations.id IN" in row_reads[0]
+    assert len(statements) <= 15
+    period_name = response.json()[0]["evaluation_period"]
+    assert crud.final_evaluation.get_pending_recalculations(db, evaluation_period=period_name) == []
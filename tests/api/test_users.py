@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from app.core.config import settings
 from tests.utils.user import create_random_user, authentication_token_from_username
 from tests.utils.organization import create_random_organization
+from tests.utils.common import random_lower_string
 from tests.utils.project import create_random_project
 from tests.utils.project_member import create_project_member
 from tests.utils.evaluation import create_random_evaluation_period, create_random_final_evaluation
@@ -199,6 +200,26 @@ def test_read_my_subordinates_as_dept_head(client: TestClient, db: Session):
     assert employee_in_other_dept.id not in subordinate_ids
 
 
+def test_read_my_subordinates_pages_through_large_orgs_with_role_filter(client: TestClient, db: Session, monkeypatch):
+    from app.api import pagination
+
+    monkeypatch.setattr(pagination, "STREAM_PAGE_SIZE", 2)
+    dept = create_random_organization(db, level=2)
+    team = create_random_organization(db, level=3, parent_id=dept.id)
+    dept_head = create_random_user(db, role="dept_head", organization_id=dept.id)
+    team_leads = [create_random_user(db, role="team_lead", organization_id=team.id) for _ in range(3)]
+    employees = [create_random_user(db, role="employee", organization_id=team.id) for _ in range(2)]
+    dept_head_token = authentication_token_from_username(client=client, username=dept_head.username, db=db)
+
+    response = client.get("/api/v1/users/me/subordinates", headers=dept_head_token)
+    assert response.status_code == 200
+    assert [s["id"] for s in response.json()] == sorted(u.id for u in team_leads + employees)
+    assert response.headers["X-Total-Count"] == "5"
+
+    response = client.get("/api/v1/users/me/subordinates?role=team_lead", headers=dept_head_token)
+    assert [s["id"] for s in response.json()] == [u.id for u in team_leads]
+
+
 def test_read_my_subordinates_as_team_lead(client: TestClient, db: Session):
     # 1. Setup organization hierarchy
     center = create_random_organization(db, name="Center2", level=1)
@@ -412,4 +433,43 @@ def test_read_users_by_team_lead_forbidden(client: TestClient, db: Session):
     response = client.get("/api/v1/users/", headers=team_lead_token_headers)
 
     # Assert
-    assert response.status_code == 403
\ No newline at end of file
+    assert response.status_code == 403
+
+def test_read_users_pages_by_cursor_with_filters(client: TestClient, db: Session):
+    admin = create_random_user(db, role="admin")
+    admin_token = authentication_token_from_username(client=client, username=admin.username, db=db)
+    dept = create_random_organization(db, level=2)
+    team = create_random_organization(db, level=3, parent_id=dept.id)
+    prefix = random_lower_string(8)
+    members = [create_random_user(db, role="employee", organization_id=team.id) for _ in range(4)]
+    members.append(create_random_user(db, role="team_lead", organization_id=dept.id))
+    for i, member in enumerate(members):
+        member.full_name = f"{prefix} {i}"
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {"org_id": dept.id, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/users/", headers=admin_token, params=params)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        if cursor is None:
+            assert response.headers["X-Total-Count"] == "5"
+        seen.extend(u["id"] for u in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == sorted(m.id for m in members)
+
+    response = client.get(
+        "/api/v1/users/", headers=admin_token,
+        params={"name_prefix": prefix, "role": "employee", "limit": 10},
+    )
+    assert [u["id"] for u in response.json()] == [m.id for m in members[:4]]
+    assert response.headers["X-Total-Count"] == "4"
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/api/v1/users/", headers=admin_token, params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
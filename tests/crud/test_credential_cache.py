@@ -0,0 +1,53 @@
+import time
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core import credential_cache as credential_cache_module
+from app.core.credential_cache import CredentialCache, decrypt_credentials
+from app.core.security import decrypt_data, encrypt_data
+from app.models.external_account import Provider
+from app.schemas.external_account import ExternalAccountCreate
+from tests.utils.user import create_random_user
+
+
+def test_credentials_are_decrypted_once_and_zeroed_when_the_account_is_deleted(db: Session, monkeypatch) -> None:
+    cache = credential_cache_module.credential_cache
+    monkeypatch.setattr(cache, "ttl_seconds", 60)
+    cache.invalidate()
+    decrypted = []
+    monkeypatch.setattr(credential_cache_module, "decrypt_data", lambda data: decrypted.append(data) or decrypt_data(data))
+
+    user = create_random_user(db)
+    account = crud.external_account.create_with_owner(
+        db, obj_in=ExternalAccountCreate(provider=Provider.JIRA, account_id="cached@test.com", credentials="secret"),
+        owner_id=user.id,
+    )
+    assert decrypt_credentials(account.id, account.encrypted_credentials) == "secret"
+    assert decrypt_credentials(account.id, account.encrypted_credentials) == "secret"
+    assert len(decrypted) == 1
+
+    # New ciphertext for the same account is decrypted again.
+    assert decrypt_credentials(account.id, encrypt_data("replaced")) == "replaced"
+    assert len(decrypted) == 2
+
+    buffer = cache._entries[account.id][2]
+    crud.external_account.remove(db, id=account.id)
+    assert len(cache) == 0
+    assert buffer == bytearray(len("replaced"))
+
+
+def test_evicted_and_expired_credentials_are_zeroed() -> None:
+    cache = CredentialCache(ttl_seconds=60, maxsize=1)
+    cache.set(1, "cipher-1", "first")
+    first = cache._entries[1][2]
+    cache.set(2, "cipher-2", "second")
+    assert first == bytearray(5)
+    assert cache.get(1, "cipher-1") is None
+
+    cache.ttl_seconds = 0.01
+    cache.set(3, "cipher-3", "third")
+    third = cache._entries[3][2]
+    time.sleep(0.02)
+    assert cache.get(3, "cipher-3") is None
+    assert third == bytearray(5)
@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+from app.core import database
+
+
+def test_engine_factory_applies_dialect_specific_options(monkeypatch) -> None:
+    calls = []
+    monkeypatch.setattr(database, "create_engine", lambda url, **kwargs: calls.append((url, kwargs)) or object())
+    monkeypatch.setattr(database.settings, "DB_POOL_SIZE", 20)
+
+    database.create_db_engine("sqlite:///./other.db", statement_timeout_ms=5000)
+    database.create_db_engine("postgresql+psycopg2://app@db/growth_wave", statement_timeout_ms=5000)
+
+    (_, sqlite_kwargs), (_, postgres_kwargs) = calls
+    assert sqlite_kwargs == {"connect_args": {"check_same_thread": False}}
+    assert postgres_kwargs["connect_args"] == {"options": "-c statement_timeout=5000"}
+    assert postgres_kwargs["pool_size"] == 20
+    assert postgres_kwargs["pool_pre_ping"] is True
+
+
+def test_get_db_routes_reads_to_the_replica(monkeypatch) -> None:
+    monkeypatch.setattr(database, "SessionLocal", lambda: SimpleNamespace(bind="primary", close=lambda: None))
+    monkeypatch.setattr(database, "ReadSessionLocal", lambda: SimpleNamespace(bind="replica", close=lambda: None))
+
+    def session_for(method: str):
+        return next(database.get_db(SimpleNamespace(method=method))).bind
+
+    assert session_for("GET") == "replica"
+    assert [session_for(method) for method in ("POST", "PUT", "PATCH", "DELETE")] == ["primary"] * 4
@@ -0,0 +1,268 @@
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.crud import evaluation_calculator
+from app.models.user import UserRole
+from app.schemas.evaluation import (
+    EvaluationPeriodCreate,
+    PeerEvaluationBase,
+    PmEvaluationBase,
+    QualitativeEvaluationBase,
+)
+from tests.utils.user import create_random_user
+from tests.utils.project import create_random_project
+from tests.utils.project_member import create_project_member
+from tests.utils.common import random_lower_string
+
+
+def _peer(db: Session, *, evaluator_id: int, evaluatee_id: int, project_id: int, scores: list, period: str) -> None:
+    crud.peer_evaluation.peer_evaluation.upsert_multi(
+        db,
+        evaluations=[PeerEvaluationBase(project_id=project_id, evaluatee_id=evaluatee_id, scores=scores)],
+        evaluator_id=evaluator_id,
+        evaluation_period=period,
+    )
+
+
+def _pm(db: Session, *, evaluator_id: int, evaluatee_id: int, project_id: int, score: int, period: str) -> None:
+    crud.pm_evaluation.pm_evaluation.upsert_multi(
+        db,
+        evaluations=[PmEvaluationBase(project_id=project_id, evaluatee_id=evaluatee_id, score=score)],
+        evaluator_id=evaluator_id,
+        evaluation_period=period,
+    )
+
+
+def _qualitative(db: Session, *, evaluator_id: int, evaluatee_id: int, score: int, contribution: int, period: str) -> None:
+    crud.qualitative_evaluation.qualitative_evaluation.upsert_multi(
+        db,
+        evaluations=[
+            QualitativeEvaluationBase(
+                evaluatee_id=evaluatee_id,
+                qualitative_score=score,
+                department_contribution_score=contribution,
+            )
+        ],
+        evaluator_id=evaluator_id,
+        evaluation_period=period,
+    )
+
+
+def _setup_period_data(db: Session):
+    period = crud.evaluation_period.create(
+        db,
+        obj_in=EvaluationPeriodCreate(
+            name=f"calc-{random_lower_string(8)}", start_date=date(2025, 1, 1), end_date=date(2025, 6, 30)
+        ),
+    )
+    lead = create_random_user(db, role=UserRole.TEAM_LEAD)
+    head = create_random_user(db, role=UserRole.DEPT_HEAD)
+    emp1 = create_random_user(db)
+    emp2 = create_random_user(db)
+    emp3 = create_random_user(db)  # no evaluations at all
+
+    project1 = create_random_project(db, pm_id=lead.id, evaluation_period_id=period.id)
+    project2 = create_random_project(db, pm_id=lead.id, evaluation_period_id=period.id)
+
+    create_project_member(db, project_id=project1.id, user_id=lead.id, is_pm=True, participation_weight=100)
+    create_project_member(db, project_id=project1.id, user_id=emp1.id, participation_weight=33)
+    create_project_member(db, project_id=project2.id, user_id=emp1.id, participation_weight=67)
+    create_project_member(db, project_id=project1.id, user_id=emp2.id, participation_weight=100)
+    create_project_member(db, project_id=project2.id, user_id=emp3.id, participation_weight=100)
+
+    _peer(db, evaluator_id=emp2.id, evaluatee_id=emp1.id, project_id=project1.id, scores=[15, 13, 7, 9, 6, 8, 17], period=period.name)
+    _peer(db, evaluator_id=lead.id, evaluatee_id=emp1.id, project_id=project1.id, scores=[11, 19, 5, 4, 9, 3, 12], period=period.name)
+    _peer(db, evaluator_id=emp3.id, evaluatee_id=emp1.id, project_id=project2.id, scores=[7, 7, 7, 7, 7, 7, 7], period=period.name)
+    _peer(db, evaluator_id=emp1.id, evaluatee_id=lead.id, project_id=project1.id, scores=[20, 18, 10, 9, 9, 10, 19], period=period.name)
+    _peer(db, evaluator_id=emp1.id, evaluatee_id=emp2.id, project_id=project1.id, scores=[0, 0, 0, 0, 0, 0, 0], period=period.name)
+
+    _pm(db, evaluator_id=lead.id, evaluatee_id=emp1.id, project_id=project1.id, score=91, period=period.name)
+    _pm(db, evaluator_id=lead.id, evaluatee_id=emp1.id, project_id=project2.id, score=77, period=period.name)
+    _pm(db, evaluator_id=lead.id, evaluatee_id=emp2.id, project_id=project1.id, score=64, period=period.name)
+    _pm(db, evaluator_id=head.id, evaluatee_id=lead.id, project_id=project1.id, score=88, period=period.name)
+
+    _qualitative(db, evaluator_id=lead.id, evaluatee_id=emp1.id, score=17, contribution=7, period=period.name)
+    _qualitative(db, evaluator_id=head.id, evaluatee_id=lead.id, score=19, contribution=9, period=period.name)
+
+    return period, [lead, head, emp1, emp2, emp3]
+
+
+def test_bulk_calculation_matches_per_user_path(db: Session) -> None:
+    period, users = _setup_period_data(db)
+    user_ids = [u.id for u in users]
+
+    expected = {}
+    for user in users:
+        final_eval = evaluation_calculator.calculate_and_store_final_scores(
+            db, evaluatee=user, evaluation_period=period.name
+        )
+        expected[user.id] = (
+            final_eval.peer_score, final_eval.pm_score, final_eval.qualitative_score, final_eval.final_score
+        )
+
+    data = evaluation_calculator.load_period_evaluation_data(
+        db, evaluation_period=period.name, user_ids=user_ids
+    )
+    results = evaluation_calculator.compute_final_scores(data)
+
+    assert len(results) == len(users)
+    for result in results:
+        assert (
+            result["peer_score"], result["pm_score"], result["qualitative_score"], result["final_score"]
+        ) == expected[result["evaluatee_id"]]
+
+
+def test_calculate_scores_for_period_upserts_and_keeps_grades(db: Session) -> None:
+    period, users = _setup_period_data(db)
+    lead, head, emp1, emp2, emp3 = users
+
+    # emp1 already has a graded record; it must be updated in place.
+    existing = models.FinalEvaluation(
+        evaluatee_id=emp1.id, evaluation_period=period.name, final_score=0, grade="A"
+    )
+    db.add(existing)
+    db.commit()
+
+    assert evaluation_calculator.calculate_scores_for_period(db, period_id=period.id) is True
+    db.expire_all()
+
+    rows = (
+        db.query(models.FinalEvaluation)
+        .filter(
+            models.FinalEvaluation.evaluation_period == period.name,
+            models.FinalEvaluation.evaluatee_id.in_([u.id for u in users]),
+        )
+        .all()
+    )
+    by_user = {row.evaluatee_id: row for row in rows}
+    assert len(rows) == len(users)
+    assert by_user[emp1.id].id == existing.id
+    assert by_user[emp1.id].grade == "A"
+    assert by_user[emp1.id].final_score > 0
+    assert by_user[emp3.id].final_score == 0
+
+    assert evaluation_calculator.calculate_scores_for_period(db, period_id=period.id + 999) is False
+
+
+def test_recalculate_pending_scores_refreshes_only_marked_users(db: Session) -> None:
+    period, users = _setup_period_data(db)
+    lead, head, emp1, emp2, emp3 = users
+
+    assert evaluation_calculator.calculate_scores_for_period(db, period_id=period.id) is True
+    assert crud.final_evaluation.get_pending_recalculations(db, evaluation_period=period.name) == []
+    db.expire_all()
+    before = {
+        row.evaluatee_id: row.final_score
+        for row in db.query(models.FinalEvaluation).filter(
+            models.FinalEvaluation.evaluation_period == period.name
+        )
+    }
+
+    # A new qualitative evaluation of emp2 marks only emp2 stale.
+    _qualitative(db, evaluator_id=lead.id, evaluatee_id=emp2.id, score=20, contribution=10, period=period.name)
+    pending = crud.final_evaluation.get_pending_recalculations(db, evaluation_period=period.name)
+    assert [mark.evaluatee_id for mark in pending] == [emp2.id]
+
+    refreshed = evaluation_calculator.recalculate_pending_scores(db, evaluation_period=period.name)
+
+    assert [row.evaluatee_id for row in refreshed] == [emp2.id]
+    assert refreshed[0].final_score > before[emp2.id]
+    assert crud.final_evaluation.get_pending_recalculations(db, evaluation_period=period.name) == []
+
+    expected = evaluation_calculator.compute_final_scores(
+        evaluation_calculator.load_period_evaluation_data(
+            db, evaluation_period=period.name, user_ids=[emp2.id]
+        )
+    )[0]
+    assert refreshed[0].final_score == expected["final_score"]
+    assert refreshed[0].qualitative_score == expected["qualitative_score"] == 30
+
+    assert evaluation_calculator.recalculate_pending_scores(db, evaluation_period=period.name) == []
+
+
+def test_recalculate_pending_scores_creates_missing_final_rows(db: Session) -> None:
+    period, users = _setup_period_data(db)
+    lead, head, emp1, emp2, emp3 = users
+    final_rows = db.query(models.FinalEvaluation).filter(models.FinalEvaluation.evaluation_period == period.name)
+    assert final_rows.count() == 0
+
+    _qualitative(db, evaluator_id=lead.id, evaluatee_id=emp3.id, score=20, contribution=10, period=period.name)
+    pending_ids = [mark.evaluatee_id for mark in crud.final_evaluation.get_pending_recalculations(
+        db, evaluation_period=period.name
+    )]
+    assert emp3.id in pending_ids
+    refreshed = evaluation_calculator.recalculate_pending_scores(db, evaluation_period=period.name)
+
+    assert [row.evaluatee_id for row in refreshed] == sorted(pending_ids)
+    assert final_rows.count() == len(pending_ids)
+    assert next(row for row in refreshed if row.evaluatee_id == emp3.id).qualitative_score == 30
+    assert crud.final_evaluation.get_pending_recalculations(db, evaluation_period=period.name) == []
+
+
+def test_mark_for_recalculation_bumps_existing_marks_without_reading_first(db: Session) -> None:
+    from sqlalchemy import event
+
+    period, users = _setup_period_data(db)
+    period_name, emp1_id, emp2_id = period.name, users[2].id, users[3].id
+    crud.final_evaluation.mark_for_recalculation(db, evaluatee_ids=[emp1_id], evaluation_period=period_name)
+    before = {
+        mark.evaluatee_id: mark.version
+        for mark in crud.final_evaluation.get_pending_recalculations(db, evaluation_period=period_name)
+    }
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        crud.final_evaluation.mark_for_recalculation(
+            db, evaluatee_ids=[emp1_id, emp2_id], evaluation_period=period_name
+        )
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+    assert len(statements) == 1 and "ON CONFLICT" in statements[0]
+
+    versions = {
+        mark.evaluatee_id: mark.version
+        for mark in crud.final_evaluation.get_pending_recalculations(db, evaluation_period=period_name)
+    }
+    assert versions[emp1_id] == before[emp1_id] + 1
+    assert versions[emp2_id] == before.get(emp2_id, 0) + 1
+
+
+def test_simulate_final_scores_reuses_components_and_writes_nothing(db: Session) -> None:
+    period, users = _setup_period_data(db)
+    peer_only = evaluation_calculator.ScoreWeights(peer_weight=100, pm_weight=0)
+
+    result = evaluation_calculator.simulate_final_scores(
+        db,
+        evaluation_period=period.name,
+        weight_sets=[("same", evaluation_calculator.DEFAULT_SCORE_WEIGHTS), ("peer-only", peer_only)],
+        s_ratio=20,
+        a_ratio=40,
+    )
+
+    assert db.query(models.FinalEvaluation).filter(
+        models.FinalEvaluation.evaluation_period == period.name
+    ).count() == 0
+
+    data = evaluation_calculator.load_period_evaluation_data(db, evaluation_period=period.name)
+    expected_default = {r["evaluatee_id"]: r["final_score"] for r in evaluation_calculator.compute_final_scores(data)}
+    expected_peer_only = {
+        r["evaluatee_id"]: r["final_score"] for r in evaluation_calculator.compute_final_scores(data, peer_only)
+    }
+
+    baseline, same, simulated = result["baseline"], *result["scenarios"]
+    assert result["user_count"] == len(expected_default)
+    assert {u["evaluatee_id"]: u["simulated_score"] for u in baseline["users"]} == expected_default
+    assert all(u["delta"] == 0 for u in same["users"])
+    assert same["boundary_shift"] == {"s_min_score": 0, "a_min_score": 0}
+
+    by_user = {u["evaluatee_id"]: u for u in simulated["users"]}
+    for user in users:
+        assert by_user[user.id]["simulated_score"] == expected_peer_only[user.id]
+        assert by_user[user.id]["delta"] == expected_peer_only[user.id] - expected_default[user.id]
+    assert simulated["boundary_shift"]["s_min_score"] == (
+        simulated["boundaries"]["s_min_score"] - baseline["boundaries"]["s_min_score"]
+    )
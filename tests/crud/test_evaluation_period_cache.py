@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.core.cache import TTLCache
+from app.schemas.evaluation import EvaluationPeriodCreate, EvaluationPeriodUpdate, QualitativeEvaluationBase
+from tests.utils.common import random_lower_string
+from tests.utils.user import create_random_user
+
+
+class _QueryCounter:
+    def __init__(self, db: Session):
+        self.engine = db.get_bind().engine
+        self.count = 0
+
+    def _count(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+
+def test_period_lookups_are_served_from_cache(db: Session) -> None:
+    period = crud.evaluation_period.create(
+        db,
+        obj_in=EvaluationPeriodCreate(
+            name=f"cache-{random_lower_string(8)}",
+            start_date=date.today() - timedelta(days=1),
+            end_date=date.today() + timedelta(days=1),
+        ),
+    )
+    crud.evaluation_period.get_snapshot(db, id=period.id)
+
+    with _QueryCounter(db) as counter:
+        for _ in range(20):
+            assert crud.evaluation_period.get_name(db, id=period.id) == period.name
+            assert crud.evaluation_period.get_by_name(db, name=period.name).id == period.id
+            assert crud.evaluation_period.get_active_period(db).id == period.id
+    assert counter.count == 0
+
+
+def test_period_writes_invalidate_the_cache(db: Session) -> None:
+    old_name = f"cache-{random_lower_string(8)}"
+    period = crud.evaluation_period.create(
+        db, obj_in=EvaluationPeriodCreate(name=old_name, start_date=date(2024, 1, 1), end_date=date(2024, 6, 30))
+    )
+    assert crud.evaluation_period.get_by_name(db, name=old_name).id == period.id
+
+    new_name = f"cache-{random_lower_string(8)}"
+    crud.evaluation_period.update(
+        db,
+        db_obj=period,
+        obj_in=EvaluationPeriodUpdate(name=new_name, start_date=date(2024, 1, 1), end_date=date(2024, 6, 30)),
+    )
+    assert crud.evaluation_period.get_by_name(db, name=old_name) is None
+    assert crud.evaluation_period.get_name(db, id=period.id) == new_name
+
+    crud.evaluation_period.remove(db, id=period.id)
+    assert crud.evaluation_period.get_snapshot(db, id=period.id) is None
+
+
+def test_ttl_cache_does_not_store_loads_that_raced_an_invalidation() -> None:
+    cache = TTLCache(ttl_seconds=60)
+
+    def racing_loader():
+        cache.invalidate()
+        return "stale"
+
+    assert cache.get_or_load("key", racing_loader) == "stale"
+    assert cache.get("key") is None
+    assert cache.get_or_load("key", lambda: "fresh") == "fresh"
+    assert cache.get("key") == "fresh"
+
+    expired = TTLCache(ttl_seconds=-1)
+    expired.set("key", "value")
+    assert expired.get("key") is None
+
+
+def test_qualitative_evaluations_are_unique_per_evaluator_evaluatee_and_period(db: Session) -> None:
+    period = crud.evaluation_period.create(
+        db,
+        obj_in=EvaluationPeriodCreate(
+            name=f"cache-{random_lower_string(8)}", start_date=date(2024, 7, 1), end_date=date(2024, 12, 31)
+        ),
+    )
+    evaluator = create_random_user(db)
+    evaluatee = create_random_user(db)
+
+    [qualitative] = crud.qualitative_evaluation.qualitative_evaluation.upsert_multi(
+        db,
+        evaluations=[QualitativeEvaluationBase(evaluatee_id=evaluatee.id, qualitative_score=10, department_contribution_score=5)],
+        evaluator_id=evaluator.id,
+        evaluation_period=period.name,
+    )
+    assert qualitative.evaluation_period == period.name
+
+    # A second row for the same evaluator/evaluatee/period violates the unique constraint.
+    db.add(
+        models.QualitativeEvaluation(
+            evaluator_id=evaluator.id,
+            evaluatee_id=evaluatee.id,
+            evaluation_period=period.name,
+            qualitative_score=1,
+            department_contribution_score=1,
+        )
+    )
+    with pytest.raises(IntegrityError):
+        db.flush()
+    db.rollback()
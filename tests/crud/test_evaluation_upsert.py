@@ -0,0 +1,199 @@
+import sys
+import threading
+from datetime import date
+
+import pytest
+from sqlalchemy import delete, event
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.crud import upsert
+from app.schemas.evaluation import EvaluationPeriodCreate, PeerEvaluationBase, PmEvaluationBase
+from tests.utils.common import random_lower_string
+from tests.utils.project import create_random_project
+from tests.utils.user import create_random_user
+
+
+def _setup(db: Session):
+    period = crud.evaluation_period.create(
+        db,
+        obj_in=EvaluationPeriodCreate(
+            name=f"upsert-{random_lower_string(8)}", start_date=date(2024, 1, 1), end_date=date(2024, 6, 30)
+        ),
+    )
+    pm = create_random_user(db)
+    members = [create_random_user(db) for _ in range(3)]
+    project = create_random_project(db, pm_id=pm.id, evaluation_period_id=period.id)
+    return period, pm, members, project
+
+
+def _submit(db: Session, *, period, pm, project, scores):
+    return crud.pm_evaluation.pm_evaluation.upsert_multi(
+        db,
+        evaluations=[
+            PmEvaluationBase(project_id=project.id, evaluatee_id=evaluatee_id, score=score)
+            for evaluatee_id, score in scores
+        ],
+        evaluator_id=pm.id,
+        evaluation_period=period.name,
+    )
+
+
+@pytest.mark.parametrize("native", [True, False])
+def test_pm_upsert_multi_inserts_updates_and_keeps_order(db: Session, monkeypatch, native: bool) -> None:
+    if not native:
+        monkeypatch.setattr(upsert, "supports_native_upsert", lambda db: False)
+    period, pm, (a, b, c), project = _setup(db)
+
+    first = _submit(db, period=period, pm=pm, project=project, scores=[(a.id, 10), (b.id, 20)])
+    assert [(e.evaluatee_id, e.score) for e in first] == [(a.id, 10), (b.id, 20)]
+
+    second = _submit(db, period=period, pm=pm, project=project, scores=[(c.id, 30), (a.id, 15)])
+    assert [(e.evaluatee_id, e.score) for e in second] == [(c.id, 30), (a.id, 15)]
+    assert second[1].id == first[0].id
+
+    rows = (
+        db.query(models.PmEvaluation)
+        .filter(models.PmEvaluation.evaluation_period == period.name)
+        .order_by(models.PmEvaluation.evaluatee_id)
+        .all()
+    )
+    assert [(r.evaluatee_id, r.score) for r in rows] == [(a.id, 15), (b.id, 20), (c.id, 30)]
+    pending = crud.final_evaluation.get_pending_recalculations(db, evaluation_period=period.name)
+    assert sorted(mark.evaluatee_id for mark in pending) == [a.id, b.id, c.id]
+
+
+def test_native_upsert_resolves_repeated_keys_to_the_last_row(db: Session) -> None:
+    period, pm, (a, b, _), project = _setup(db)
+
+    result = _submit(db, period=period, pm=pm, project=project, scores=[(a.id, 10), (b.id, 20), (a.id, 99)])
+
+    assert [e.score for e in result] == [99, 20, 99]
+    assert result[0] is result[2]
+
+
+def test_native_upsert_does_not_query_per_row(db: Session) -> None:
+    period, pm, members, project = _setup(db)
+    members += [create_random_user(db) for _ in range(17)]
+    member_ids = [m.id for m in members]
+    _submit(db, period=period, pm=pm, project=project, scores=[(id, 50) for id in member_ids[:10]])
+    evaluations = [PmEvaluationBase(project_id=project.id, evaluatee_id=id, score=60) for id in member_ids]
+    pm_id, period_name = pm.id, period.name
+
+    statements = []
+    engine = db.get_bind().engine
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        crud.pm_evaluation.pm_evaluation.upsert_multi(
+            db, evaluations=evaluations, evaluator_id=pm_id, evaluation_period=period_name
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    # evaluation upsert, recalculation mark upsert, reload
+    assert len(statements) == 3
+
+
+@pytest.mark.parametrize("native, on_conflict", [(True, True), (False, True), (False, False)])
+def test_peer_upsert_multi_maintains_score_aggregates(
+    db: Session, monkeypatch, native: bool, on_conflict: bool
+) -> None:
+    if not native:
+        monkeypatch.setattr(upsert, "supports_native_upsert", lambda db: False)
+    if not on_conflict:
+        monkeypatch.setattr(sys.modules["app.crud.peer_evaluation"], "conflict_insert", lambda db: None)
+    period, pm, (a, b, evaluatee), project = _setup(db)
+
+    def submit(evaluator, scores):
+        crud.peer_evaluation.peer_evaluation.upsert_multi(
+            db,
+            evaluations=[PeerEvaluationBase(project_id=project.id, evaluatee_id=evaluatee.id, scores=scores)],
+            evaluator_id=evaluator.id,
+            evaluation_period=period.name,
+        )
+
+    submit(a, [10, 10, 10, 10, 10, 10, 10])
+    submit(b, [20, 18, 12, 10, 10, 8, 7])
+    # Re-submitting replaces the evaluator's earlier scores in the totals.
+    submit(a, [16, 14, 10, 10, 10, 6, 5])
+
+    peer_crud = crud.peer_evaluation.peer_evaluation
+    keys = dict(evaluatee_id=evaluatee.id, project_id=project.id, period_id=period.id)
+    aggregate = peer_crud.get_score_aggregate(db, **keys)
+    assert (aggregate.eval_count, aggregate.score_sum) == (2, 156)
+    assert peer_crud.get_average_score_for_evaluatee(db, **keys) == 78.0
+    assert peer_crud.get_count_for_evaluatee(db, **keys) == 2
+    assert peer_crud.get_criterion_averages_for_evaluatee(db, **keys) == [18.0, 16.0, 11.0, 10.0, 10.0, 7.0, 6.0]
+    assert peer_crud.get_average_score_for_evaluatee(db, **{**keys, "evaluatee_id": a.id}) is None
+
+
+def test_concurrent_peer_submissions_add_to_the_same_aggregate(db: Session) -> None:
+    # Two sessions on their own connections, as two concurrent requests.
+    engine = db.get_bind().engine
+    setup = Session(bind=engine)
+    period = crud.evaluation_period.create(
+        setup,
+        obj_in=EvaluationPeriodCreate(
+            name=f"upsert-{random_lower_string(8)}", start_date=date(2024, 1, 1), end_date=date(2024, 6, 30)
+        ),
+    )
+    evaluators = [create_random_user(setup) for _ in range(2)]
+    evaluatee = create_random_user(setup)
+    project = create_random_project(setup, pm_id=evaluatee.id, evaluation_period_id=period.id)
+    evaluator_ids = [evaluator.id for evaluator in evaluators]
+    user_ids = [*evaluator_ids, evaluatee.id]
+    period_id, period_name, project_id, evaluatee_id = period.id, period.name, project.id, evaluatee.id
+    setup.close()
+
+    start = threading.Barrier(2)
+    errors = []
+
+    def submit(evaluator_id: int, score: int) -> None:
+        session = Session(bind=engine)
+        try:
+            start.wait(5)
+            crud.peer_evaluation.peer_evaluation.upsert_multi(
+                session,
+                evaluations=[PeerEvaluationBase(project_id=project_id, evaluatee_id=evaluatee_id, scores=[score] * 7)],
+                evaluator_id=evaluator_id,
+                evaluation_period=period_name,
+            )
+        except Exception as exc:  # surfaced by the assertion below
+            errors.append(exc)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=submit, args=(id, score)) for id, score in zip(evaluator_ids, (10, 20))]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+        assert errors == []
+        check = Session(bind=engine)
+        try:
+            aggregate = crud.peer_evaluation.peer_evaluation.get_score_aggregate(
+                check, evaluatee_id=evaluatee_id, project_id=project_id, period_id=period_id
+            )
+            assert (aggregate.eval_count, aggregate.score_sum) == (2, 210)
+            assert aggregate.criterion_averages == [15.0] * 7
+        finally:
+            check.close()
+    finally:
+        cleanup = Session(bind=engine)
+        for model, condition in (
+            (models.PeerEvaluation, models.PeerEvaluation.evaluation_period == period_name),
+            (models.PeerScoreAggregate, models.PeerScoreAggregate.evaluation_period == period_name),
+            (models.PendingScoreRecalculation, models.PendingScoreRecalculation.evaluation_period == period_name),
+            (models.Project, models.Project.id == project_id),
+            (models.User, models.User.id.in_(user_ids)),
+        ):
+            cleanup.execute(delete(model).where(condition))
+        cleanup.commit()
+        crud.evaluation_period.remove(cleanup, id=period_id)
+        cleanup.close()
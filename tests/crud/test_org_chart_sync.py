@@ -0,0 +1,182 @@
+import io
+import json
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.core.config import settings
+from app.models.user import UserRole
+from app.schemas.organization import OrganizationCreate
+from tests.utils.common import random_lower_string
+
+
+def _chart_file(chart_data) -> UploadFile:
+    return UploadFile(file=io.BytesIO(json.dumps(chart_data).encode("utf-8")), filename="chart.json")
+
+
+def _person(name: str, email: str, title: str = "Staff") -> dict:
+    return {"name": name, "email": email, "title": title}
+
+
+def test_chart_sync_is_idempotent_and_keeps_the_last_listing(db: Session) -> None:
+    prefix = random_lower_string(8)
+    lead = _person("Lead", f"{prefix}.lead@test.com", "Team Leader")
+    moved = _person("Moved", f"{prefix}.moved@test.com")
+    chart = [
+        {
+            "name": f"{prefix}-center",
+            "leader": _person("Head", f"{prefix}.head@test.com"),
+            "members": [moved],
+            "sub_organizations": [
+                {"name": f"{prefix}-team", "leader": lead, "members": [moved], "sub_organizations": []},
+            ],
+        }
+    ]
+
+    stats = crud.organization.sync_organizations_and_users_from_json(db, _chart_file(chart))
+    assert {k: stats[k] for k in ("orgs_created", "orgs_updated", "users_created", "users_updated")} == {
+        "orgs_created": 2, "orgs_updated": 0, "users_created": 3, "users_updated": 1,
+    }
+    assert stats["timing"]["total"] >= 0
+
+    team = db.query(models.Organization).filter(models.Organization.name == f"{prefix}-team").one()
+    assert team.level == 2
+    moved_user = crud.user.user.get_by_email(db, email=moved["email"])
+    assert moved_user.organization_id == team.id
+    assert crud.user.user.get_by_email(db, email=lead["email"]).role == UserRole.TEAM_LEAD
+    assert crud.organization.is_descendant_org(db, ancestor_id=team.parent_id, descendant_id=team.id)
+
+    stats = crud.organization.sync_organizations_and_users_from_json(db, _chart_file(chart))
+    assert (stats["orgs_created"], stats["orgs_updated"], stats["users_created"], stats["users_updated"]) == (0, 2, 0, 4)
+    assert db.query(models.Organization).filter(models.Organization.name.like(f"{prefix}-%")).count() == 2
+
+
+def test_chart_sync_bumps_token_version_only_when_role_or_organization_changes(db: Session) -> None:
+    prefix = random_lower_string(8)
+    member = _person("Member", f"{prefix}.member@test.com")
+    stayer = _person("Stayer", f"{prefix}.stayer@test.com")
+    team = {"name": f"{prefix}-team", "leader": None, "members": [member, stayer], "sub_organizations": []}
+    chart = [{"name": f"{prefix}-center", "leader": None, "members": [], "sub_organizations": [team]}]
+    crud.organization.sync_organizations_and_users_from_json(db, _chart_file(chart))
+
+    chart[0]["members"] = [member]
+    team["members"] = [stayer]
+    crud.organization.sync_organizations_and_users_from_json(db, _chart_file(chart))
+    db.expire_all()
+
+    assert crud.user.user.get_by_email(db, email=member["email"]).token_version == 1
+    assert crud.user.user.get_by_email(db, email=stayer["email"]).token_version == 0
+
+
+def _small_chart(prefix: str, size: int) -> list:
+    members = [_person(f"Member {i}", f"{prefix}.member{i}@test.com") for i in range(size)]
+    return [{"name": f"{prefix}-team", "leader": None, "members": members, "sub_organizations": []}]
+
+
+def test_pooled_chart_sync_hashes_new_users_in_one_batch(db: Session, monkeypatch) -> None:
+
+    batches = []
+    monkeypatch.setattr(settings, "PASSWORD_PROVISIONING_MODE", "pool")
+    monkeypatch.setattr(
+        "app.crud.organization.hash_provisioned_passwords",
+        lambda passwords: batches.append(list(passwords)) or [f"hashed:{p}" for p in passwords],
+    )
+    prefix = random_lower_string(8)
+    crud.organization.sync_organizations_and_users_from_json(db, _chart_file(_small_chart(prefix, 3)))
+
+    assert batches == [[f"{prefix}.member{i}" for i in range(3)]]
+    member = crud.user.user.get_by_email(db, email=f"{prefix}.member1@test.com")
+    assert member.hashed_password == f"hashed:{prefix}.member1"
+
+
+def test_pending_chart_sync_creates_accounts_awaiting_activation(db: Session, monkeypatch) -> None:
+    from app.core.security import UNUSABLE_PASSWORD, hash_activation_token
+
+    monkeypatch.setattr(settings, "PASSWORD_PROVISIONING_MODE", "pending")
+    prefix = random_lower_string(8)
+    stats = crud.organization.sync_organizations_and_users_from_json(db, _chart_file(_small_chart(prefix, 2)))
+
+    activations = {a["username"]: a["activation_token"] for a in stats["activations"]}
+    assert set(activations) == {f"{prefix}.member0", f"{prefix}.member1"}
+    member = crud.user.user.get_by_username(db, username=f"{prefix}.member0")
+    assert member.hashed_password == UNUSABLE_PASSWORD
+    assert member.activation_token_hash == hash_activation_token(activations[member.username])
+    assert crud.user.user.authenticate(db, username=member.username, password=member.username) is None
+
+    assert crud.user.user.activate(db, token=activations[member.username], password="chosen") is not None
+    assert crud.user.user.authenticate(db, username=member.username, password="chosen") is not None
+    assert crud.user.user.activate(db, token=activations[member.username], password="again") is None
+
+
+def test_failed_chart_sync_leaves_nothing_behind(db: Session) -> None:
+    prefix = random_lower_string(8)
+    # Both emails derive the same username, which must be unique.
+    chart = [
+        {
+            "name": f"{prefix}-team",
+            "leader": _person("A", f"{prefix}@a.com"),
+            "members": [_person("B", f"{prefix}@b.com")],
+            "sub_organizations": [],
+        }
+    ]
+
+    with pytest.raises(IntegrityError):
+        crud.organization.sync_organizations_and_users_from_json(db, _chart_file(chart))
+
+    assert db.query(models.Organization).filter(models.Organization.name == f"{prefix}-team").count() == 0
+
+
+def _upload(filename: str, content: str) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content.encode("utf-8")), filename=filename)
+
+
+def test_csv_import_applies_valid_rows_and_reports_bad_ones(db: Session, monkeypatch) -> None:
+    monkeypatch.setattr(crud.organization, "ORG_IMPORT_BATCH_SIZE", 2)
+    old = crud.organization.create_organization(db, OrganizationCreate(name="Old Office", level=2))
+    csv_content = "\n".join([
+        "name,level,parent_name",
+        "Team A,3,Office",      # parent comes later in the file
+        "Office,2,Center",
+        "Center,1,",
+        ",3,Office",            # missing name
+        "Team B,three,Office",  # bad level
+        "Team C,3,Nowhere",     # unknown parent
+        "Team A,3,Center",      # duplicate
+    ])
+
+    result = crud.organization.sync_organizations_from_file(db, _upload("orgs.csv", csv_content))
+
+    assert (result["created"], result["updated"], result["deleted"]) == (4, 0, 1)
+    assert [(e["row"], e["name"]) for e in result["errors"]] == [
+        (5, ""), (6, "Team B"), (8, "Team A"), (7, "Team C"),
+    ]
+    orgs = {org.name: org for org in crud.organization.get_organizations(db)}
+    assert orgs["Team A"].parent_id == orgs["Office"].id
+    assert orgs["Office"].parent_id == orgs["Center"].id
+    assert orgs["Team C"].parent_id is None
+    assert "Team B" not in orgs and old.id not in {org.id for org in orgs.values()}
+    assert crud.organization.get_descendant_org_ids(db, orgs["Center"].id) == [
+        orgs["Center"].id, orgs["Office"].id, orgs["Team A"].id,
+    ]
+
+
+def test_ndjson_import_rejects_cycles_and_malformed_lines(db: Session) -> None:
+    crud.organization.sync_organizations_from_file(db, _upload("orgs.ndjson", "\n".join([
+        json.dumps({"name": "Center", "level": 1}),
+        json.dumps({"name": "Office", "level": 2, "parent_name": "Center"}),
+    ])))
+
+    result = crud.organization.sync_organizations_from_file(db, _upload("orgs.ndjson", "\n".join([
+        json.dumps({"name": "Center", "level": 1, "parent_name": "Office"}),
+        "{not json",
+        json.dumps({"name": "Office", "parent_name": "Center"}),
+    ])))
+
+    assert (result["created"], result["updated"], result["deleted"]) == (0, 2, 0)
+    assert [(e["row"], e["name"]) for e in result["errors"]] == [(2, None), (1, "Center")]
+    orgs = {org.name: org for org in crud.organization.get_organizations(db)}
+    assert orgs["Office"].parent_id == orgs["Center"].id
+    assert orgs["Office"].level == 2
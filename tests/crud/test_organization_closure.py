@@ -0,0 +1,110 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.models.user import UserRole
+from app.schemas.organization import OrganizationUpdate
+from tests.utils.organization import create_random_organization
+from tests.utils.user import create_random_user
+
+
+def _closure_rows(db: Session, org_ids) -> set:
+    return {
+        (row.ancestor_id, row.descendant_id, row.depth)
+        for row in db.query(models.OrganizationClosure).filter(
+            models.OrganizationClosure.descendant_id.in_(org_ids)
+        )
+    }
+
+
+def test_closure_follows_create_reparent_and_delete(db: Session) -> None:
+    center = create_random_organization(db, level=1)
+    dept = create_random_organization(db, level=2, parent_id=center.id)
+    team = create_random_organization(db, level=3, parent_id=dept.id)
+    other = create_random_organization(db, level=2, parent_id=center.id)
+
+    assert [org.id for org in crud.organization.get_all_descendant_orgs(db, center.id)] == [dept.id, other.id, team.id]
+    assert [org.id for org in crud.organization.get_ancestor_orgs(db, team.id)] == [dept.id, center.id]
+
+    # Moving a department carries its teams along.
+    crud.organization.update_organization(db, db_org=dept, org_in=OrganizationUpdate(parent_id=other.id))
+    assert [org.id for org in crud.organization.get_ancestor_orgs(db, team.id)] == [dept.id, other.id, center.id]
+    assert crud.organization.is_descendant_org(db, ancestor_id=other.id, descendant_id=team.id)
+
+    org_ids = [center.id, dept.id, team.id, other.id]
+    maintained = _closure_rows(db, org_ids)
+    crud.organization.rebuild_organization_closure(db)
+    assert _closure_rows(db, org_ids) == maintained
+
+    crud.organization.delete_organization(db, org_id=other.id)
+    assert crud.organization.get_descendant_org_ids(db, center.id) == [center.id]
+    assert crud.organization.get_descendant_org_ids(db, dept.id, include_self=False) == [team.id]
+
+
+def test_reparenting_under_a_descendant_is_rejected(db: Session) -> None:
+    dept = create_random_organization(db, level=2)
+    team = create_random_organization(db, level=3, parent_id=dept.id)
+
+    with pytest.raises(ValueError):
+        crud.organization.update_organization(db, db_org=dept, org_in=OrganizationUpdate(parent_id=team.id))
+
+
+def test_subordinates_come_from_the_closure(db: Session) -> None:
+    dept = create_random_organization(db, level=2)
+    team = create_random_organization(db, level=3, parent_id=dept.id)
+    outside = create_random_organization(db, level=3)
+    head = create_random_user(db, organization_id=dept.id)
+    member = create_random_user(db, organization_id=team.id)
+    stranger = create_random_user(db, organization_id=outside.id)
+
+    assert {u.id for u in crud.user.user.get_subordinates(db, user_id=head.id)} == {member.id}
+    assert crud.user.user.is_subordinate(db, manager=head, user=member)
+    assert not crud.user.user.is_subordinate(db, manager=head, user=stranger)
+    assert not crud.user.user.is_subordinate(db, manager=head, user=head)
+
+
+def test_org_tree_is_cached_until_the_hierarchy_changes(db: Session) -> None:
+    dept = create_random_organization(db, level=2)
+    team = create_random_organization(db, level=3, parent_id=dept.id)
+    head = create_random_user(db, organization_id=dept.id)
+    member = create_random_user(db, organization_id=team.id)
+    db.commit()
+
+    tree = crud.organization.get_org_tree(db)
+    assert crud.organization.get_org_tree(db) is tree
+    assert crud.user.user.is_subordinate(db, manager=head, user=member)
+
+    crud.user.user.update(db, db_obj=member, obj_in={"organization_id": None})
+    assert crud.organization.get_org_tree(db) is not tree
+    assert not crud.user.user.is_subordinate(db, manager=head, user=member)
+
+
+def test_subordinate_ids_are_cached_per_manager(db: Session) -> None:
+    dept = create_random_organization(db, level=2)
+    team = create_random_organization(db, level=3, parent_id=dept.id)
+    head = create_random_user(db, role=UserRole.DEPT_HEAD, organization_id=dept.id)
+    member = create_random_user(db, organization_id=team.id)
+    db.commit()
+
+    subordinate_ids = crud.user.user.get_subordinate_ids(db, user_id=head.id)
+    assert subordinate_ids == {u.id for u in crud.user.user.get_subordinates(db, user_id=head.id)} == {member.id}
+    assert crud.user.user.get_subordinate_ids(db, user_id=head.id) is subordinate_ids
+    assert crud.user.user.get_subordinate_ids(db, user_id=head.id, include_self=True) == {head.id, member.id}
+
+    crud.user.user.update(db, db_obj=member, obj_in={"role": UserRole.TEAM_LEAD})
+    assert crud.user.user.get_subordinate_ids(db, user_id=head.id) is not subordinate_ids
+
+
+def test_iter_subordinates_pages_match_the_single_query(db: Session) -> None:
+    dept = create_random_organization(db, level=2)
+    team = create_random_organization(db, level=3, parent_id=dept.id)
+    head = create_random_user(db, role=UserRole.DEPT_HEAD, organization_id=dept.id)
+    leads = [create_random_user(db, role=UserRole.TEAM_LEAD, organization_id=team.id) for _ in range(2)]
+    members = [create_random_user(db, organization_id=team.id) for _ in range(3)]
+
+    everyone = crud.user.user.get_subordinates(db, user_id=head.id)
+    assert [u.id for u in everyone] == sorted(u.id for u in leads + members)
+    assert list(crud.user.user.iter_subordinates(db, user_id=head.id, page_size=2)) == everyone
+    assert [u.id for u in crud.user.user.iter_subordinates(
+        db, user_id=head.id, roles=[UserRole.TEAM_LEAD], page_size=1
+    )] == [u.id for u in leads]
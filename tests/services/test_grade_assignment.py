@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+
+from app.services.grade_assignment import GRADE_LABELS, assign_grade_codes
+
+
+def _grades(dept_index, scores, tie_keys, s_caps, a_caps, b_split_ratio=0.0):
+    codes = assign_grade_codes(
+        np.array(dept_index), np.array(scores, dtype=float), np.array(tie_keys), np.array(s_caps), np.array(a_caps),
+        b_split_ratio,
+    )
+    return GRADE_LABELS[codes].tolist()
+
+
+def test_grades_follow_score_rank_within_each_department() -> None:
+    grades = _grades(
+        dept_index=[0, 1, 0, 0, 1, 0],
+        scores=[70, 90, 95, 80, 60, 60],
+        tie_keys=[1, 2, 3, 4, 5, 6],
+        s_caps=[1, 0],
+        a_caps=[1, 5],
+    )
+    assert grades == ["B", "A", "S", "A", "A", "B"]
+
+
+def test_ties_are_broken_by_the_lower_key_regardless_of_row_order() -> None:
+    grades = _grades(dept_index=[0, 0, 0], scores=[80, 80, 80], tie_keys=[30, 10, 20], s_caps=[1], a_caps=[1])
+    assert grades == ["B", "S", "A"]
+
+
+def test_b_split_is_balanced_and_caps_larger_than_the_department_are_clamped() -> None:
+    grades = _grades(
+        dept_index=[0] * 7 + [1],
+        scores=[100, 90, 80, 70, 60, 50, 40, 10],
+        tie_keys=list(range(8)),
+        s_caps=[1, 3],
+        a_caps=[1, 3],
+        b_split_ratio=40,
+    )
+    # Five B candidates, 40% -> two B+ and two B-.
+    assert grades == ["S", "A", "B+", "B+", "B", "B-", "B-", "S"]
+
+
+def test_company_wide_assignment_is_fast() -> None:
+    rng = np.random.default_rng(3)
+    rows, departments = 200_000, 500
+    dept_index = rng.integers(0, departments, rows)
+    scores = rng.integers(0, 40, rows).astype(float)  # plenty of ties
+    caps = np.full(departments, 40)
+
+    started = time.perf_counter()
+    codes = assign_grade_codes(dept_index, scores, np.arange(rows), caps, caps, 10)
+    assert time.perf_counter() - started < 5
+
+    per_department = np.bincount(dept_index * len(GRADE_LABELS) + codes).reshape(departments, len(GRADE_LABELS))
+    assert (per_department[:, 0] <= 40).all()
+    assert (per_department[:, 2] == per_department[:, 4]).all()
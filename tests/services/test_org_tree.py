@@ -0,0 +1,61 @@
+import random
+
+from app.services.org_tree import OrgTree
+
+
+# center(1) -> dept(2) -> teams(3, 4); dept(5) -> team(6); separate center(7)
+ORGANIZATIONS = [(1, None), (2, 1), (3, 2), (4, 2), (5, 1), (6, 5), (7, None)]
+USERS = [(10, 1), (11, 2), (12, 3), (13, 3), (14, 4), (15, 6), (16, 7), (17, None), (18, 99)]
+
+
+def test_descendant_checks_follow_the_hierarchy() -> None:
+    tree = OrgTree(ORGANIZATIONS, USERS)
+
+    assert tree.is_descendant(1, 1)
+    assert tree.is_descendant(1, 6)
+    assert tree.is_descendant(2, 4)
+    assert not tree.is_descendant(2, 6)
+    assert not tree.is_descendant(3, 2)
+    assert not tree.is_descendant(7, 1)
+    assert not tree.is_descendant(1, 99)
+    assert not tree.is_descendant(None, 1)
+    assert tree.parent_of(6) == 5
+    assert tree.parent_of(1) is None
+
+
+def test_subtrees_list_orgs_and_users() -> None:
+    tree = OrgTree(ORGANIZATIONS, USERS)
+
+    assert sorted(tree.subtree_org_ids(2)) == [2, 3, 4]
+    assert tree.subtree_org_ids(2)[0] == 2
+    assert sorted(tree.subtree_user_ids(2)) == [11, 12, 13, 14]
+    assert sorted(tree.subtree_user_ids(1)) == [10, 11, 12, 13, 14, 15]
+    assert tree.subtree_user_ids(99) == []
+    assert tree.is_member_of_subtree(15, 5)
+    assert not tree.is_member_of_subtree(16, 1)
+    # Users without a (known) organization belong to no subtree.
+    assert tree.org_of(17) is None
+    assert tree.org_of(18) is None
+
+
+def test_dangling_parents_and_cycles_do_not_break_the_walk() -> None:
+    tree = OrgTree([(1, 50), (2, 1), (3, 4), (4, 3)], [])
+
+    assert len(tree) == 4
+    assert tree.is_descendant(1, 2)
+    assert tree.is_descendant(3, 4) != tree.is_descendant(4, 3)
+
+
+def test_five_thousand_node_tree_stays_compact() -> None:
+    rng = random.Random(7)
+    organizations = [(1, None)] + [(org_id, rng.randint(1, org_id - 1)) for org_id in range(2, 5001)]
+    users = [(user_id, rng.randint(1, 5000)) for user_id in range(1, 20001)]
+    tree = OrgTree(organizations, users)
+
+    assert tree.nbytes < 300 * 1024
+    parents = dict(organizations)
+    for org_id in rng.sample(range(1, 5001), 50):
+        ancestor = org_id
+        while ancestor is not None:
+            assert tree.is_descendant(ancestor, org_id)
+            ancestor = parents[ancestor]
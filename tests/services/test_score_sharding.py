@@ -0,0 +1,55 @@
+from app.services.score_sharding import partition_users_by_organization
+
+
+# center(1) -> dept(2) -> teams(3, 4); dept(5) -> team(6); separate center(7)
+ORGANIZATIONS = [(1, None), (2, 1), (3, 2), (4, 2), (5, 1), (6, 5), (7, None)]
+
+
+def _users():
+    users = []
+    next_id = 1
+    for org_id, count in [(1, 1), (2, 1), (3, 6), (4, 6), (5, 1), (6, 4), (7, 5), (None, 2)]:
+        for _ in range(count):
+            users.append((next_id, org_id))
+            next_id += 1
+    return users
+
+
+def test_every_user_is_in_exactly_one_shard() -> None:
+    users = _users()
+    for shard_count in (1, 2, 3, 4, 8, 50):
+        shards = partition_users_by_organization(ORGANIZATIONS, users, shard_count)
+        assert len(shards) <= shard_count
+        flattened = [user_id for shard in shards for user_id in shard]
+        assert sorted(flattened) == [user_id for user_id, _ in users]
+
+
+def test_single_shard_keeps_everyone_together() -> None:
+    users = _users()
+    assert partition_users_by_organization(ORGANIZATIONS, users, 1) == [[u for u, _ in users]]
+
+
+def test_shards_follow_subtrees_and_are_balanced() -> None:
+    users = _users()
+    org_of = dict(users)
+    shards = partition_users_by_organization(ORGANIZATIONS, users, 4)
+
+    assert len(shards) == 4
+    sizes = sorted(len(shard) for shard in shards)
+    assert sizes[-1] - sizes[0] <= 3
+
+    # Teams are never split across shards.
+    for team_id in (3, 4, 6, 7):
+        holding = [i for i, shard in enumerate(shards) if any(org_of[u] == team_id for u in shard)]
+        assert len(holding) == 1
+
+
+def test_cyclic_or_dangling_organizations_do_not_drop_users() -> None:
+    organizations = [(1, 2), (2, 1), (3, 99)]
+    users = [(1, 1), (2, 2), (3, 3), (4, None)]
+    shards = partition_users_by_organization(organizations, users, 2)
+    assert sorted(u for shard in shards for u in shard) == [1, 2, 3, 4]
+
+
+def test_no_users() -> None:
+    assert partition_users_by_organization(ORGANIZATIONS, [], 4) == []
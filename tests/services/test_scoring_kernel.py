@@ -0,0 +1,100 @@
+import random
+
+import numpy as np
+
+from app.crud.evaluation_calculator import (
+    PM_ROLES,
+    PeriodEvaluationData,
+    build_score_columns,
+    compute_final_scores,
+)
+from app.models.user import UserRole
+from app.services.scoring_kernel import ScoreWeights, combine_components, compute_scores, grade_boundaries
+
+
+def _random_period_data(seed: int, user_count: int = 300) -> PeriodEvaluationData:
+    rng = random.Random(seed)
+    data = PeriodEvaluationData(evaluation_period="2025-H1")
+    roles = list(UserRole)
+    for user_id in range(1, user_count + 1):
+        data.users.append((user_id, rng.choice(roles)))
+        projects = rng.sample(range(1, 40), rng.randint(0, 4))
+        for project_id in projects:
+            data.memberships.setdefault(user_id, []).append((project_id, rng.randint(0, 100)))
+            if rng.random() < 0.8:
+                # Averages of 7-criteria totals, e.g. 331 / 6
+                data.peer_averages[(user_id, project_id)] = rng.randint(0, 700) / rng.randint(1, 10)
+            if rng.random() < 0.7:
+                score = rng.randint(0, 100)
+                data.pm_scores[(user_id, project_id)] = score
+                data.first_pm_scores.setdefault(user_id, score)
+        if rng.random() < 0.6:
+            data.qualitative_scores[user_id] = rng.randint(0, 20) + rng.randint(0, 10)
+    return data
+
+
+def _scalar_scores(data: PeriodEvaluationData, weights: ScoreWeights = ScoreWeights()) -> dict:
+    """Reference implementation following calculate_and_store_final_scores."""
+    expected = {}
+    for user_id, role in data.users:
+        total_weighted_peer_score = 0
+        total_weighted_pm_score = 0
+        is_pm_role = role in PM_ROLES
+        if is_pm_role:
+            total_weighted_pm_score = data.first_pm_scores.get(user_id, 0)
+        for project_id, participation_weight in data.memberships.get(user_id, []):
+            project_weight = participation_weight / 100.0
+            avg_peer_score = data.peer_averages.get((user_id, project_id))
+            if avg_peer_score:
+                total_weighted_peer_score += avg_peer_score * project_weight
+            if not is_pm_role and (user_id, project_id) in data.pm_scores:
+                total_weighted_pm_score += data.pm_scores[(user_id, project_id)] * project_weight
+        qualitative_combined_score = data.qualitative_scores.get(user_id, 0)
+        expected[user_id] = (
+            total_weighted_peer_score,
+            total_weighted_pm_score,
+            qualitative_combined_score,
+            combine_components(
+                total_weighted_peer_score, total_weighted_pm_score, qualitative_combined_score, weights
+            ),
+        )
+    return expected
+
+
+def test_kernel_matches_scalar_path_exactly() -> None:
+    for seed in range(5):
+        data = _random_period_data(seed)
+        expected = _scalar_scores(data)
+        for result in compute_final_scores(data):
+            assert (
+                result["peer_score"], result["pm_score"], result["qualitative_score"], result["final_score"]
+            ) == expected[result["evaluatee_id"]]
+
+
+def test_kernel_matches_scalar_path_with_custom_weights() -> None:
+    data = _random_period_data(42)
+    weights = ScoreWeights(peer_weight=30, pm_weight=70, project_ratio=0.6, qualitative_ratio=0.4)
+    expected = _scalar_scores(data, weights)
+    for result in compute_final_scores(data, weights):
+        assert result["final_score"] == expected[result["evaluatee_id"]][3]
+
+
+def test_kernel_handles_users_without_memberships() -> None:
+    data = PeriodEvaluationData(
+        evaluation_period="2025-H1",
+        users=[(1, UserRole.EMPLOYEE), (2, UserRole.TEAM_LEAD)],
+        first_pm_scores={2: 90},
+        qualitative_scores={1: 15},
+    )
+    scores = compute_scores(build_score_columns(data))
+    np.testing.assert_array_equal(scores.peer_score, [0.0, 0.0])
+    np.testing.assert_array_equal(scores.pm_score, [0.0, 90.0])
+    np.testing.assert_array_equal(scores.qualitative_score, [15.0, 0.0])
+    assert scores.final_score[0] == 15.0
+    assert scores.final_score[1] == 90 * 0.5 * 0.7
+
+
+def test_grade_boundaries_floor_slots_like_the_grade_to() -> None:
+    scores = np.array([50.0, 90.0, 70.0, 80.0, 60.0, 40.0, 30.0, 20.0, 10.0, 0.0])
+    assert grade_boundaries(scores, [10, 30, 5]) == [90.0, 70.0, None]
+    assert grade_boundaries(np.array([]), [10]) == [None]